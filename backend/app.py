@@ -1,9 +1,9 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from pymongo import MongoClient
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+import logging
 import os
 import re
 import json
@@ -12,18 +12,203 @@ import time
 # Load environment variables from .env file
 load_dotenv()
 
+# Local modules read their settings from the environment at import time
+from batch_mutations import (
+    MAX_BATCH_CARDS,
+    InvalidMutation,
+    parse_mutation,
+    plan_update,
+)
+from bulk_import import ImportProgress
+from card_parser import (
+    PARALLEL_BY_DEFAULT,
+    iter_bulk_cards,
+    iter_stream_lines,
+    parse_bulk_cards,
+    parse_bulk_cards_parallel,
+)
+from data_version import versioned
+from database import Database, client_options, masked_uri, read_only_preference
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from mongo_repository import MongoCardRepository
+from pagination import (
+    COUNT_MODES,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+)
+from repository import SORT_FIELDS, STORAGE_ENGINES, CardFilter
+from search_index import TrigramIndex
+from serialization import (
+    STREAM_FRAMING,
+    STREAM_MIMETYPES,
+    FastJSONProvider,
+    encode_card_chunk,
+    lean_cards,
+    stream_format,
+)
+from review_events import MAX_BATCH_SIZE as MAX_REVIEW_BATCH_SIZE
+from scheduler import InvalidGrade, parse_grade, schedule_to_dict
+from sqlite_repository import SQLiteCardRepository
+from structured_logging import (
+    REQUEST_ID_HEADER,
+    SampledLogger,
+    configure_logging,
+    install_request_ids,
+)
+from study_sessions import SessionNotFound, session_to_dict
+from sync import InvalidSyncToken
+from tag_stats import normalize_tags
+
+# Leveled JSON logs (LOG_LEVEL, LOG_FORMAT) written by a background thread
+configure_logging()
+logger = logging.getLogger("flashcards.api")
+# Per-chunk import logs are DEBUG and sampled, so large imports don't flood the log
+chunk_logger = SampledLogger(logger)
+
 app = Flask(__name__)
-CORS(app)
+# jsonify encodes with orjson when installed, and answers in MessagePack when Accept prefers it
+app.json = FastJSONProvider(app)
+CORS(app, expose_headers=[REQUEST_ID_HEADER])
+# Every log record of a request carries its X-Request-ID (generated when absent)
+install_request_ids(app)
+
+# Per-route latency, body sizes and in-flight requests, plus MongoDB command
+# timings, served in the Prometheus text format at /api/metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+metrics = Metrics()
+if METRICS_ENABLED:
+    metrics.instrument(app)
+
+# Development server settings (python app.py)
+PORT = int(os.getenv("PORT", "5000"))
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "false").lower() == "true"
+
+# Storage engine: "mongo" (default) or "sqlite" for an embedded, single-file database
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "mongo").lower()
 
 # MongoDB configuration
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "romanian_flashcards")
-COLLECTION_NAME = "cards"
 
-# Initialize MongoDB client
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
-cards_collection = db[COLLECTION_NAME]
+# SQLite configuration: database file, wait for a busy writer, page cache per connection
+SQLITE_PATH = os.getenv("SQLITE_PATH", "flashcards.db")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+
+# Cards fetched per cursor batch and serialized per chunk when streaming the whole deck
+CARDS_STREAM_BATCH_SIZE = int(os.getenv("CARDS_STREAM_BATCH_SIZE", "1000"))
+
+# Seconds a process may reuse its cached data version when MongoDB offers no
+# change stream to follow it with (a standalone server). Keep 0 (read it on every
+# validated request) whenever more than one process serves the app, or a worker
+# could answer 304 for a list another worker has just changed
+DATA_VERSION_CACHE_TTL = float(os.getenv("DATA_VERSION_CACHE_TTL", "0"))
+
+# Delta sync: how long deletions are remembered and how far tokens overlap
+SYNC_TOMBSTONE_RETENTION = timedelta(
+    days=float(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+)
+SYNC_OVERLAP = timedelta(seconds=float(os.getenv("SYNC_OVERLAP_SECONDS", "5")))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+
+# Shuffled study passes expire after STUDY_SESSION_TTL_HOURS without use
+STUDY_SESSION_TTL = timedelta(hours=float(os.getenv("STUDY_SESSION_TTL_HOURS", "24")))
+STUDY_BATCH_SIZE = int(os.getenv("STUDY_BATCH_SIZE", "20"))
+MAX_STUDY_BATCH_SIZE = 500
+
+# Read preference of the full-deck and tag reads (primary unless configured otherwise)
+READ_ONLY_PREFERENCE = read_only_preference()
+
+# In-memory n-gram index answering search-as-you-type without database queries
+card_index = TrigramIndex()
+
+
+def create_repository():
+    """The card repository for STORAGE_ENGINE"""
+    settings = {
+        "data_version_ttl": DATA_VERSION_CACHE_TTL,
+        "sync_retention": SYNC_TOMBSTONE_RETENTION,
+        "sync_overlap": SYNC_OVERLAP,
+        "session_ttl": STUDY_SESSION_TTL,
+    }
+    if STORAGE_ENGINE == "sqlite":
+        return SQLiteCardRepository(
+            SQLITE_PATH,
+            busy_timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            cache_size_mb=SQLITE_CACHE_SIZE_MB,
+            **settings,
+        )
+    if STORAGE_ENGINE == "mongo":
+        # Pool sizes and timeouts come from MONGO_* settings; the client itself is
+        # created lazily in each process, so forked workers never share it
+        options = client_options()
+        if METRICS_ENABLED:
+            options["event_listeners"] = [metrics.command_listener]
+        database = Database(MONGO_URI, DATABASE_NAME, **options)
+        return MongoCardRepository(
+            database, read_preference=READ_ONLY_PREFERENCE, **settings
+        )
+    raise ValueError(
+        f"Unknown STORAGE_ENGINE {STORAGE_ENGINE!r}; use one of {', '.join(STORAGE_ENGINES)}"
+    )
+
+
+# All routes read and write cards through the repository
+repository = create_repository()
+
+# Bumped by every card write; read endpoints derive their ETags from it
+data_version = repository.data_version
+
+
+def prepare_database(build_index=True):
+    """
+    Create the schema and indexes and bring older data up to date.
+
+    Pre-forking servers run this once before forking and pass
+    build_index=False, leaving the in-memory index and the data version
+    watch (a background thread) to each worker.
+    """
+    for note in repository.prepare():
+        logger.info(note)
+    if build_index:
+        data_version.watch()
+        card_index.build_in_background(repository)
+
+
+def parse_bulk_request(data):
+    """Parse the bulk text of an import request, in the process pool when asked to"""
+    if data.get("parallel", PARALLEL_BY_DEFAULT):
+        return parse_bulk_cards_parallel(data["text"])
+    return parse_bulk_cards(data["text"])
+
+
+# The repository keeps its own derived data (tag counts, tombstones) current;
+# these hooks update what lives in this process
+def on_cards_added(cards):
+    """Propagate newly inserted card documents to derived state"""
+    if not cards:
+        return
+    card_index.add_many(cards)
+    data_version.bump()
+
+
+def on_cards_updated(changes):
+    """Propagate (previous, updated) card document pairs to derived state"""
+    if not changes:
+        return
+    for _, card in changes:
+        card_index.add(card)
+    data_version.bump()
+
+
+def on_cards_deleted(cards):
+    """Propagate deleted card documents to derived state"""
+    if not cards:
+        return
+    for card in cards:
+        card_index.remove(card["_id"])
+    data_version.bump()
 
 
 def card_to_dict(card):
@@ -41,179 +226,26 @@ def card_to_dict(card):
     }
 
 
-def parse_bulk_cards(text):
-    """Parse bulk card text and extract Romanian:English pairs"""
-    cards = []
-    lines = text.strip().split("\n")
-
-    def is_separating_comma(romanian_text):
-        """
-        Determine if commas in the Romanian text are separating different words/phrases
-        or are part of the actual phrase (like in sentences or greetings).
-
-        Separating commas typically appear in vocabulary lists like:
-        - "doamnă, doamne: madam / lady"
-        - "domn, domni: sir / mister"
-
-        Non-separating commas appear in phrases/sentences like:
-        - "Bună dimineața, doamnă!: Good morning, madam!"
-        - "Bine, mulțumesc: Fine, thank you"
-        """
-        # If the text contains sentence punctuation (! ? .), treat commas as part of the phrase
-        if any(punct in romanian_text for punct in ["!", "?", "."]):
-            return False
-
-        # If the text has multiple words AND common greeting/phrase patterns, likely a sentence
-        words = romanian_text.strip().split()
-        if len(words) > 2:  # More than 2 words usually indicates a phrase/sentence
-            return False
-
-        # Check for common Romanian greeting/phrase patterns that shouldn't be split
-        phrase_patterns = [
-            "bună dimineața",
-            "bună ziua",
-            "bună seara",
-            "la revedere",
-            "ce mai",
-            "și eu",
-            "bine ați",
-            "mulțumesc",
-            "și tu",
-            "bună,",  # Greetings with names
-            "salut,",  # Greetings with names
-        ]
-
-        text_lower = romanian_text.lower()
-        for pattern in phrase_patterns:
-            if pattern in text_lower:
-                return False
-
-        # If we have exactly 2 words separated by comma, likely vocabulary variants
-        comma_parts = [part.strip() for part in romanian_text.split(",")]
-        if len(comma_parts) == 2:
-            # Check if second part starts with capital letter (likely a name)
-            if comma_parts[1] and comma_parts[1][0].isupper():
-                return False  # Likely "Greeting, Name" format
-
-            # Both parts should be relatively short (single words or short phrases)
-            # and both should be lowercase words (not names)
-            if all(len(part.split()) <= 2 for part in comma_parts):
-                # Additional check: if either part contains multiple words, less likely to be vocabulary variants
-                if any(len(part.split()) > 1 for part in comma_parts):
-                    return False
-                return True
-
-        # For lists of 3+ comma-separated items that are all short, likely vocabulary
-        if len(comma_parts) >= 3:
-            if all(len(part.split()) == 1 for part in comma_parts):  # All single words
-                return True
-
-        # Default: treat commas as part of phrase
-        return False
-
-    for line in lines:
-        line = line.strip()
-
-        # Skip empty lines
-        if not line:
-            continue
-
-        # Skip section headers (lines that don't contain ':' or are in parentheses)
-        if ":" not in line:
-            continue
-
-        # Skip lines that are just section titles (contain parentheses but no colon before them)
-        if "(" in line and ")" in line and line.find(":") == -1:
-            continue
-
-        # Split on the first colon
-        parts = line.split(":", 1)
-        if len(parts) != 2:
-            continue
-
-        romanian = parts[0].strip()
-        english = parts[1].strip()
-
-        # Skip if either part is empty
-        if not romanian or not english:
-            continue
-
-        # Store original for potential restoration
-        original_romanian = romanian
-        original_english = english
-
-        # Remove any trailing punctuation that might interfere with parsing
-        romanian = romanian.rstrip("!?.")
-        english = english.rstrip("!?.")
-
-        # Skip very short entries (likely parsing errors)
-        if len(romanian) < 2 or len(english) < 2:
-            continue
-
-        # Extract tags from English text if present (format: "text [tag1, tag2]")
-        tags = []
-        if "[" in english and "]" in english:
-            # Extract tags from square brackets
-            tag_start = english.rfind("[")
-            tag_end = english.rfind("]")
-            if tag_start < tag_end:
-                tag_text = english[tag_start + 1 : tag_end]
-                tags = [
-                    tag.strip().lower() for tag in tag_text.split(",") if tag.strip()
-                ]
-                # Remove tags from English text
-                english = english[:tag_start].strip()
-                original_english = english
-
-        # Handle slashes as alternative forms (takes priority over comma handling)
-        if "/" in romanian:
-            # Create card for the full form (original with punctuation restored)
-            cards.append(
-                {
-                    "romanian": original_romanian,
-                    "english": original_english,
-                    "tags": tags,
-                }
-            )
-
-            # Create individual cards for each alternative form
-            alternatives = [alt.strip() for alt in original_romanian.split("/")]
-            for alt in alternatives:
-                alt = alt.strip()
-                if alt and len(alt) >= 2:  # Skip empty or very short alternatives
-                    cards.append(
-                        {"romanian": alt, "english": original_english, "tags": tags}
-                    )
-        # Check if Romanian side has comma-separated vocabulary items vs phrases with commas
-        elif "," in romanian and is_separating_comma(romanian):
-            # Create card for the full form (original with punctuation restored)
-            cards.append(
-                {
-                    "romanian": original_romanian,
-                    "english": original_english,
-                    "tags": tags,
-                }
-            )
+def log_chunk(result):
+    chunk_logger.debug(
+        "Imported chunk",
+        extra={
+            "processed": result.processed,
+            "added": len(result.added_cards),
+            "skipped": result.skipped_count,
+        },
+    )
 
-            # Create individual cards for each vocabulary word/phrase
-            romanian_words = [word.strip() for word in romanian.split(",")]
-            for word in romanian_words:
-                word = word.strip()
-                if word and len(word) >= 2:  # Skip empty or very short words
-                    cards.append(
-                        {"romanian": word, "english": original_english, "tags": tags}
-                    )
-        else:
-            # Single phrase/sentence or phrase with non-separating commas - keep as one card
-            cards.append(
-                {
-                    "romanian": original_romanian,
-                    "english": original_english,
-                    "tags": tags,
-                }
-            )
 
-    return cards
+def log_import(added_count, skipped_count, started):
+    logger.info(
+        "Bulk import complete",
+        extra={
+            "added": added_count,
+            "skipped": skipped_count,
+            "seconds": round(time.perf_counter() - started, 3),
+        },
+    )
 
 
 # API Routes
@@ -222,78 +254,53 @@ def add_bulk_cards_with_progress():
     """Add multiple flashcards from bulk text with progress tracking"""
     try:
         data = request.get_json()
-        print(f"Received bulk import request with progress: {data}")  # Debug log
 
         if not data or "text" not in data:
             return jsonify({"error": "Bulk text is required"}), 400
 
         # Parse the bulk text
-        parsed_cards = parse_bulk_cards(data["text"])
-        print(f"Parsed {len(parsed_cards)} cards")  # Debug log
+        started = time.perf_counter()
+        parsed_cards = parse_bulk_request(data)
+        logger.info(
+            "Parsed bulk import",
+            extra={"text_length": len(data["text"]), "cards": len(parsed_cards)},
+        )
 
         if not parsed_cards:
             return jsonify({"error": "No valid card pairs found in text"}), 400
 
         # Check for duplicates (optional - skip existing cards)
         skip_duplicates = data.get("skip_duplicates", True)
-        added_cards = []
-        skipped_count = 0
+        chunk_size = data.get("chunk_size")
         total_cards = len(parsed_cards)
 
         def generate_progress():
-            """Generator function for progress updates"""
-            nonlocal added_cards, skipped_count
+            """Generator function for progress updates, coalesced by time or card count"""
+            progress = ImportProgress(
+                total=total_cards,
+                interval_ms=data.get("progress_interval_ms"),
+                every_cards=data.get("progress_every"),
+            )
 
             # Send initial progress
             yield f"data: {json.dumps({'type': 'progress', 'current': 0, 'total': total_cards, 'percentage': 0, 'status': 'Starting import...'})}\n\n"
 
-            batch_size = max(
-                1, total_cards // 20
-            )  # Process in batches for smooth progress
-
-            for i, card_data in enumerate(parsed_cards):
-                try:
-                    if skip_duplicates:
-                        # Check if card already exists (same Romanian text)
-                        existing = cards_collection.find_one(
-                            {"romanian": card_data["romanian"]}
-                        )
-                        if existing:
-                            skipped_count += 1
-                            continue
-
-                    # Add the card
-                    card = {
-                        "english": card_data["english"],
-                        "romanian": card_data["romanian"],
-                        "tags": card_data.get("tags", []),
-                        "created_at": datetime.utcnow(),
-                    }
-
-                    result = cards_collection.insert_one(card)
-                    card["_id"] = result.inserted_id
-                    added_cards.append(card_to_dict(card))
-
-                except Exception as card_error:
-                    print(f"Error processing individual card {i+1}: {card_error}")
-                    continue
-
-                # Send progress update
-                current = i + 1
-                percentage = int((current / total_cards) * 100)
-                status = f"Processing card {current}/{total_cards} - {card_data['romanian'][:30]}..."
-
-                yield f"data: {json.dumps({'type': 'progress', 'current': current, 'total': total_cards, 'percentage': percentage, 'status': status})}\n\n"
-
-                # Small delay to make progress visible
-                if i % batch_size == 0:
-                    time.sleep(0.05)
+            for result in repository.import_in_chunks(
+                parsed_cards, skip_duplicates, chunk_size
+            ):
+                on_cards_added(result.added_cards)
+                progress.record(result)
+                log_chunk(result)
+                if progress.due() and progress.current < total_cards:
+                    yield f"data: {json.dumps(progress.event())}\n\n"
+            log_import(progress.added_count, progress.skipped_count, started)
+
+            # Always report the final totals before completing
+            yield f"data: {json.dumps(progress.event())}\n\n"
 
             # Send completion message
-            final_message = (
-                f"Import complete: {len(added_cards)} added, {skipped_count} skipped"
-            )
-            yield f"data: {json.dumps({'type': 'complete', 'added_count': len(added_cards), 'skipped_count': skipped_count, 'total_parsed': total_cards, 'message': final_message})}\n\n"
+            final_message = f"Import complete: {progress.added_count} added, {progress.skipped_count} skipped"
+            yield f"data: {json.dumps({'type': 'complete', 'added_count': progress.added_count, 'skipped_count': progress.skipped_count, 'total_parsed': total_cards, 'message': final_message})}\n\n"
 
         return Response(
             generate_progress(),
@@ -307,7 +314,7 @@ def add_bulk_cards_with_progress():
         )
 
     except Exception as e:
-        print(f"Bulk import error: {str(e)}")
+        logger.exception("Bulk import failed")
         return jsonify({"error": f"Import failed: {str(e)}"}), 500
 
 
@@ -316,14 +323,17 @@ def add_bulk_cards():
     """Add multiple flashcards from bulk text (legacy endpoint)"""
     try:
         data = request.get_json()
-        print(f"Received bulk import request: {data}")  # Debug log
 
         if not data or "text" not in data:
             return jsonify({"error": "Bulk text is required"}), 400
 
         # Parse the bulk text
-        parsed_cards = parse_bulk_cards(data["text"])
-        print(f"Parsed {len(parsed_cards)} cards")  # Debug log
+        started = time.perf_counter()
+        parsed_cards = parse_bulk_request(data)
+        logger.info(
+            "Parsed bulk import",
+            extra={"text_length": len(data["text"]), "cards": len(parsed_cards)},
+        )
 
         if not parsed_cards:
             return jsonify({"error": "No valid card pairs found in text"}), 400
@@ -332,46 +342,15 @@ def add_bulk_cards():
         skip_duplicates = data.get("skip_duplicates", True)
         added_cards = []
         skipped_count = 0
+        for result in repository.import_in_chunks(
+            parsed_cards, skip_duplicates, data.get("chunk_size")
+        ):
+            on_cards_added(result.added_cards)
+            added_cards.extend(card_to_dict(card) for card in result.added_cards)
+            skipped_count += result.skipped_count
+            log_chunk(result)
 
-        for i, card_data in enumerate(parsed_cards):
-            try:
-                print(f"Processing card {i+1}: {card_data}")  # Debug log
-
-                if skip_duplicates:
-                    # Check if card already exists (same Romanian text)
-                    existing = cards_collection.find_one(
-                        {"romanian": card_data["romanian"]}
-                    )
-                    if existing:
-                        print(
-                            f"Skipping duplicate: {card_data['romanian']}"
-                        )  # Debug log
-                        skipped_count += 1
-                        continue
-
-                # Add the card
-                card = {
-                    "english": card_data["english"],
-                    "romanian": card_data["romanian"],
-                    "tags": card_data.get("tags", []),
-                    "created_at": datetime.utcnow(),
-                }
-
-                result = cards_collection.insert_one(card)
-                card["_id"] = result.inserted_id
-                added_cards.append(card_to_dict(card))
-                print(
-                    f"Added card: {card_data['romanian']} -> {card_data['english']}"
-                )  # Debug log
-
-            except Exception as card_error:
-                print(
-                    f"Error processing individual card {i+1}: {card_error}"
-                )  # Debug log
-                # Continue with other cards instead of failing completely
-                continue
-
-        print(f"Import complete: {len(added_cards)} added, {skipped_count} skipped")
+        log_import(len(added_cards), skipped_count, started)
 
         return (
             jsonify(
@@ -387,15 +366,58 @@ def add_bulk_cards():
         )
 
     except Exception as e:
-        print(f"Bulk import error: {str(e)}")  # Debug log
-        print(f"Error type: {type(e)}")  # Debug log
-        import traceback
+        logger.exception("Bulk import failed")
+        return jsonify({"error": f"Import failed: {str(e)}"}), 500
+
+
+@app.route("/api/cards/bulk/upload", methods=["POST"])
+def upload_bulk_cards():
+    """Stream a bulk import from a raw or multipart file upload"""
+    try:
+        # Multipart uploads are spooled to disk by Werkzeug; raw bodies are read directly
+        upload = request.files.get("file")
+        stream = upload.stream if upload else request.stream
+        options = request.form if upload else request.args
+
+        skip_duplicates = options.get("skip_duplicates", "true").lower() != "false"
+        chunk_size = options.get("chunk_size")
+
+        # Lines are parsed and written in bounded chunks as they arrive
+        cards = iter_bulk_cards(iter_stream_lines(stream))
+        started = time.perf_counter()
+        added_count = 0
+        skipped_count = 0
+        total_parsed = 0
+        for result in repository.import_in_chunks(cards, skip_duplicates, chunk_size):
+            on_cards_added(result.added_cards)
+            added_count += len(result.added_cards)
+            skipped_count += result.skipped_count
+            total_parsed += result.processed
+            log_chunk(result)
+        log_import(added_count, skipped_count, started)
+
+        if not total_parsed:
+            return jsonify({"error": "No valid card pairs found in upload"}), 400
 
-        traceback.print_exc()  # Full stack trace
+        return (
+            jsonify(
+                {
+                    "message": f"Successfully added {added_count} cards",
+                    "added_count": added_count,
+                    "skipped_count": skipped_count,
+                    "total_parsed": total_parsed,
+                }
+            ),
+            201,
+        )
+
+    except Exception as e:
+        logger.exception("Bulk upload failed")
         return jsonify({"error": f"Import failed: {str(e)}"}), 500
 
 
 @app.route("/api/cards", methods=["GET"])
+@versioned(data_version)
 def get_cards():
     """Get flashcards with optional pagination, sorting, and search"""
     try:
@@ -405,75 +427,216 @@ def get_cards():
         sort_by = request.args.get("sort_by", "created_at")
         sort_order = request.args.get("sort_order", "desc")
         search = request.args.get("search", "").strip()
+        cursor_token = request.args.get("cursor")
+        use_cursor = cursor_token is not None or request.args.get("paginate") == "cursor"
+        count_mode = request.args.get("count", "estimated" if use_cursor else "auto")
 
         # Validate parameters
         page = max(1, page)
         limit = min(100, max(1, limit))  # Cap at 100 items per page
+        if count_mode not in COUNT_MODES:
+            count_mode = "auto"
 
         # Valid sort fields
-        valid_sort_fields = ["created_at", "english", "romanian"]
-        if sort_by not in valid_sort_fields:
+        if sort_by not in SORT_FIELDS:
             sort_by = "created_at"
 
         # Sort order
         sort_direction = -1 if sort_order.lower() == "desc" else 1
 
-        # Build query
-        query = {}
-        if search:
-            # Case-insensitive search in english, romanian, and tags fields
-            query = {
-                "$or": [
-                    {"english": {"$regex": search, "$options": "i"}},
-                    {"romanian": {"$regex": search, "$options": "i"}},
-                    {"tags": {"$regex": search, "$options": "i"}},
-                ]
-            }
+        # Diacritic-insensitive prefix search over english, romanian, and tags tokens
+        card_filter = CardFilter(search=search)
+
+        filters = {
+            "search": search,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+        }
 
-        # Get total count for pagination
-        total_count = cards_collection.count_documents(query)
+        if use_cursor:
+            result = get_cards_page_by_cursor(
+                card_filter, cursor_token, sort_by, sort_direction, limit, count_mode
+            )
+            result["filters"] = filters
+            return jsonify(result)
+
+        # Get total count for pagination (estimated from metadata when unfiltered)
+        total_count = repository.count(card_filter, count_mode)
 
         # Calculate pagination
         skip = (page - 1) * limit
-        total_pages = (total_count + limit - 1) // limit
-
-        # Get cards with pagination and sorting
-        cards = list(
-            cards_collection.find(query)
-            .sort(sort_by, sort_direction)
-            .skip(skip)
-            .limit(limit)
+        total_pages = (
+            (total_count + limit - 1) // limit if total_count is not None else None
+        )
+
+        # Get cards with pagination and sorting (_id keeps equal sort keys in a stable order)
+        cards = repository.find(
+            card_filter, sort=(sort_by, sort_direction), skip=skip, limit=limit + 1
         )
+        has_next = len(cards) > limit
+        cards = cards[:limit]
 
         # Return paginated response
         return jsonify(
             {
-                "cards": [card_to_dict(card) for card in cards],
+                "cards": lean_cards(cards),
                 "pagination": {
                     "current_page": page,
                     "total_pages": total_pages,
                     "total_count": total_count,
                     "page_size": limit,
-                    "has_next": page < total_pages,
+                    "has_next": has_next,
                     "has_prev": page > 1,
                 },
-                "filters": {
-                    "search": search,
-                    "sort_by": sort_by,
-                    "sort_order": sort_order,
-                },
+                "filters": filters,
             }
         )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def get_cards_page_by_cursor(
+    card_filter, token, sort_by, sort_direction, limit, count_mode
+):
+    """Fetch one keyset page; deep pages cost the same as the first one"""
+    direction = "next"
+    after = None
+    if token:
+        cursor = decode_cursor(token, sort_by, sort_direction)
+        direction = cursor["direction"]
+        # Walking backwards means scanning the opposite way from the cursor
+        scan_direction = sort_direction if direction == "next" else -sort_direction
+        after = (cursor["value"], cursor["id"])
+    else:
+        scan_direction = sort_direction
+
+    cards = repository.find(
+        card_filter, sort=(sort_by, scan_direction), limit=limit + 1, after=after
+    )
+    has_more = len(cards) > limit
+    cards = cards[:limit]
+
+    if direction == "next":
+        has_next, has_prev = has_more, bool(token)
+    else:
+        cards.reverse()
+        has_next, has_prev = True, has_more
+
+    # Cursors are taken from the raw documents, before lean_cards renames _id
+    pagination = {
+        "page_size": limit,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": (
+            encode_cursor(cards[-1], sort_by, sort_direction, "next")
+            if has_next and cards
+            else None
+        ),
+        "prev_cursor": (
+            encode_cursor(cards[0], sort_by, sort_direction, "prev")
+            if has_prev and cards
+            else None
+        ),
+        "total_count": repository.count(card_filter, count_mode),
+        "count_mode": count_mode,
+    }
+    return {"cards": lean_cards(cards), "pagination": pagination}
+
+
+@app.route("/api/cards/suggest", methods=["GET"])
+@versioned(data_version)
+def suggest_cards():
+    """Ranked search-as-you-type results served from the in-memory index"""
+    try:
+        query = request.args.get("q", "").strip()
+        limit = min(50, max(1, int(request.args.get("limit", 10))))
+
+        if not query:
+            return jsonify({"cards": [], "source": "index"})
+
+        # Replays other workers' writes first; the version was just read by @versioned
+        if card_index.catch_up(repository, data_version.latest()):
+            return jsonify({"cards": card_index.search(query, limit), "source": "index"})
+
+        # Index still loading or catching up: fall back to the indexed token search
+        card_filter = CardFilter(search=query)
+        cards = [] if card_filter.is_empty() else repository.find(card_filter, limit=limit)
+        return jsonify({"cards": lean_cards(cards), "source": "database"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/cards/all", methods=["GET"])
+@versioned(data_version)
 def get_all_cards():
-    """Get all flashcards (for study mode)"""
+    """Get all flashcards (for study mode), streamed as a JSON array, NDJSON or MessagePack"""
     try:
-        cards = list(cards_collection.find().sort("created_at", -1))
-        return jsonify([card_to_dict(card) for card in cards])
+        fmt = stream_format(request.headers.get("Accept"), request.args.get("format"))
+
+        # Newest first, read off the (created_at, _id) index in batches.
+        # Routed by MONGO_READ_ONLY_PREFERENCE (the primary by default)
+        cursor = iter(repository.stream(CARDS_STREAM_BATCH_SIZE, read_only=True))
+        # Fetch the first batch up front so connection errors still return a 500
+        first_card = next(cursor, None)
+
+        return Response(
+            stream_cards(first_card, cursor, fmt), mimetype=STREAM_MIMETYPES[fmt]
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def stream_cards(first_card, cursor, fmt):
+    """Serialize cards straight from the cursor, one encoder call per batch written"""
+    opening, separator, closing = STREAM_FRAMING[fmt]
+    if first_card is None:
+        yield b"[]" if fmt == "json" else b""
+        return
+
+    prefix = opening
+    batch = [first_card]
+    for card in cursor:
+        batch.append(card)
+        if len(batch) >= CARDS_STREAM_BATCH_SIZE:
+            yield prefix + encode_card_chunk(lean_cards(batch), fmt)
+            prefix = separator
+            batch = []
+    if batch:
+        yield prefix + encode_card_chunk(lean_cards(batch), fmt)
+    yield closing
+
+
+@app.route("/api/cards/changes", methods=["GET"])
+def get_card_changes():
+    """
+    Cards upserted and deleted since a sync token. Not ETag-validated: the
+    time-based next_token changes even when the data version doesn't, and a
+    304 would leave the client polling the same window forever.
+    """
+    try:
+        since = request.args.get("since")
+        if not since:
+            # First sync: hand out a token, then the client loads /api/cards/all
+            return jsonify(
+                {
+                    "upserted": [],
+                    "deleted": [],
+                    "next_token": repository.start_token(),
+                    "has_more": False,
+                    "reset": True,
+                }
+            )
+        limit = max(1, min(int(request.args.get("limit", SYNC_PAGE_SIZE)), 10000))
+
+        changes = repository.changes(since, limit)
+        changes["upserted"] = [card_to_dict(card) for card in changes["upserted"]]
+        return jsonify(changes)
+    except InvalidSyncToken as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -487,30 +650,16 @@ def add_card():
         if not data or "english" not in data or "romanian" not in data:
             return jsonify({"error": "English and Romanian text are required"}), 400
 
-        # Process tags - ensure they're cleaned and unique
-        tags = []
-        if "tags" in data and data["tags"]:
-            if isinstance(data["tags"], list):
-                tags = [tag.strip().lower() for tag in data["tags"] if tag.strip()]
-            elif isinstance(data["tags"], str):
-                # Handle comma-separated tags from text input
-                tags = [
-                    tag.strip().lower()
-                    for tag in data["tags"].split(",")
-                    if tag.strip()
-                ]
-            # Remove duplicates while preserving order
-            tags = list(dict.fromkeys(tags))
-
-        card = {
-            "english": data["english"].strip(),
-            "romanian": data["romanian"].strip(),
-            "tags": tags,
-            "created_at": datetime.utcnow(),
-        }
-
-        result = cards_collection.insert_one(card)
-        card["_id"] = result.inserted_id
+        # Tags may be a list or comma-separated text; they are stored in canonical
+        # form, and new cards are due straight away
+        card = repository.insert(
+            {
+                "english": data["english"].strip(),
+                "romanian": data["romanian"].strip(),
+                "tags": normalize_tags(data.get("tags")),
+            }
+        )
+        on_cards_added([card])
 
         return jsonify(card_to_dict(card)), 201
     except Exception as e:
@@ -524,10 +673,11 @@ def delete_card(card_id):
         if not ObjectId.is_valid(card_id):
             return jsonify({"error": "Invalid card ID"}), 400
 
-        result = cards_collection.delete_one({"_id": ObjectId(card_id)})
+        deleted_card = repository.delete(ObjectId(card_id))
 
-        if result.deleted_count == 0:
+        if deleted_card is None:
             return jsonify({"error": "Card not found"}), 404
+        on_cards_deleted([deleted_card])
 
         return jsonify({"message": "Card deleted successfully"})
     except Exception as e:
@@ -552,155 +702,354 @@ def update_card(card_id):
         if "romanian" in data:
             update_data["romanian"] = data["romanian"].strip()
         if "tags" in data:
-            # Process tags - ensure they're cleaned and unique
-            tags = []
-            if data["tags"]:
-                if isinstance(data["tags"], list):
-                    tags = [tag.strip().lower() for tag in data["tags"] if tag.strip()]
-                elif isinstance(data["tags"], str):
-                    # Handle comma-separated tags from text input
-                    tags = [
-                        tag.strip().lower()
-                        for tag in data["tags"].split(",")
-                        if tag.strip()
-                    ]
-                # Remove duplicates while preserving order
-                tags = list(dict.fromkeys(tags))
-            update_data["tags"] = tags
+            update_data["tags"] = normalize_tags(data["tags"])
 
         if not update_data:
             return jsonify({"error": "No valid fields to update"}), 400
 
-        result = cards_collection.update_one(
-            {"_id": ObjectId(card_id)}, {"$set": update_data}
-        )
-
-        if result.matched_count == 0:
+        # The repository refreshes the search tokens and update time with the edit
+        result = repository.update(ObjectId(card_id), update_data)
+        if result is None:
             return jsonify({"error": "Card not found"}), 404
+        previous_card, updated_card = result
+
+        on_cards_updated([(previous_card, updated_card)])
 
-        updated_card = cards_collection.find_one({"_id": ObjectId(card_id)})
         return jsonify(card_to_dict(updated_card))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def batch_target(data):
+    """CardFilter selecting the cards of a batch request, by `ids` or by `filter`"""
+    if ("ids" in data) == ("filter" in data):
+        raise InvalidMutation("Provide either ids or filter")
+    if "ids" in data:
+        ids = data["ids"]
+        if not isinstance(ids, list) or not ids:
+            raise InvalidMutation("ids must be a non-empty list")
+        if not all(
+            isinstance(card_id, str) and ObjectId.is_valid(card_id) for card_id in ids
+        ):
+            raise InvalidMutation("ids must be card IDs")
+        return CardFilter(ids=[ObjectId(card_id) for card_id in ids])
+
+    criteria = data["filter"]
+    if not isinstance(criteria, dict):
+        raise InvalidMutation("filter must be an object")
+    card_filter = CardFilter(
+        criteria.get("search", ""), criteria.get("tags"), criteria.get("tag_mode", "any")
+    )
+    # Never let an empty filter turn into "every card"
+    if card_filter.is_empty():
+        raise InvalidMutation("filter must include tags or search")
+    return card_filter
+
+
+@app.route("/api/cards/batch", methods=["POST"])
+def mutate_cards():
+    """Delete, retag or patch many cards, selected by ids or a filter, in one bulk write"""
+    try:
+        data = request.get_json(silent=True) or {}
+        action, argument = parse_mutation(data)
+        card_filter = batch_target(data)
+        return_documents = bool(data.get("return_documents", False))
+
+        # The current documents drive tag counts, search tokens and the suggest index
+        cards = repository.find(card_filter, limit=MAX_BATCH_CARDS + 1)
+        if len(cards) > MAX_BATCH_CARDS:
+            return (
+                jsonify({"error": f"A batch may change at most {MAX_BATCH_CARDS} cards"}),
+                413,
+            )
+
+        if action == "delete":
+            deleted_cards = repository.delete_many(cards)
+            on_cards_deleted(deleted_cards)
+            result = {"matched": len(cards), "deleted": len(deleted_cards)}
+            if return_documents:
+                result["ids"] = [str(card["_id"]) for card in deleted_cards]
+            return jsonify(result)
+
+        changes = []
+        for card in cards:
+            update_data = plan_update(card, action, argument)
+            if update_data is not None:
+                changes.append((card, update_data))
+        # Like single edits, the new versions are the old documents with the update
+        # applied; cards changed or deleted since the read above are left out
+        updated_pairs = repository.update_many(changes) if changes else []
+        on_cards_updated(updated_pairs)
+
+        result = {"matched": len(cards), "modified": len(updated_pairs)}
+        if return_documents:
+            result["cards"] = [card_to_dict(updated) for _, updated in updated_pairs]
+        return jsonify(result)
+    except InvalidMutation as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/cards/random", methods=["GET"])
 def get_random_card():
     """Get a random flashcard for studying"""
     try:
-        # Use MongoDB's aggregation pipeline to get a random document
-        pipeline = [{"$sample": {"size": 1}}]
-        cards = list(cards_collection.aggregate(pipeline))
+        card = repository.random_card()
 
-        if not cards:
+        if card is None:
             return jsonify({"error": "No cards available"}), 404
 
-        return jsonify(card_to_dict(cards[0]))
+        return jsonify(card_to_dict(card))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+MAX_DUE_LIMIT = 500
+
+
+def scheduled_card_to_dict(card):
+    result = card_to_dict(card)
+    result["schedule"] = schedule_to_dict(card)
+    return result
+
+
+@app.route("/api/cards/due", methods=["GET"])
+def get_due_cards():
+    """The cards most overdue for review, oldest due first"""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), MAX_DUE_LIMIT))
+        tags = normalize_tags(request.args.getlist("tags"))
+        now = datetime.utcnow()
+
+        # Walks the (next_due, _id) index from its start, so the cost is the page size
+        cards = repository.due(now, tags, limit)
+        return jsonify(
+            {
+                "cards": [scheduled_card_to_dict(card) for card in cards],
+                "as_of": now.isoformat(),
+            }
+        )
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/cards/<card_id>/review", methods=["POST"])
+def review_card(card_id):
+    """Record an answer to a card and schedule its next review (SM-2)"""
+    try:
+        if not ObjectId.is_valid(card_id):
+            return jsonify({"error": "Invalid card ID"}), 400
+        data = request.get_json(silent=True) or {}
+        quality = parse_grade(data.get("grade"))
+
+        updated_card = repository.review(ObjectId(card_id), quality, datetime.utcnow())
+        if not updated_card:
+            return jsonify({"error": "Card not found"}), 404
+        return jsonify(scheduled_card_to_dict(updated_card))
+    except InvalidGrade as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/reviews/batch", methods=["POST"])
+def ingest_review_events():
+    """Record a batch of review answers and reschedule their cards in one bulk write"""
+    try:
+        data = request.get_json(silent=True) or {}
+        events = data.get("events")
+        if not isinstance(events, list):
+            return jsonify({"error": "events must be a list"}), 400
+        if len(events) > MAX_REVIEW_BATCH_SIZE:
+            return (
+                jsonify({"error": f"At most {MAX_REVIEW_BATCH_SIZE} events per batch"}),
+                413,
+            )
+
+        # Safe to resend: events whose key was already recorded are skipped
+        return jsonify(repository.ingest_reviews(events))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def study_batch_size(value):
+    """Requested batch size, clamped to 1..MAX_STUDY_BATCH_SIZE"""
+    count = int(value) if value is not None else STUDY_BATCH_SIZE
+    return max(1, min(count, MAX_STUDY_BATCH_SIZE))
+
+
+def parse_session_id(session_id):
+    if not ObjectId.is_valid(session_id):
+        raise SessionNotFound("Invalid study session ID")
+    return ObjectId(session_id)
+
+
+@app.route("/api/study/sessions", methods=["POST"])
+def create_study_session():
+    """Start a shuffled pass over the deck (optionally only some tags) and return its first batch"""
+    try:
+        data = request.get_json(silent=True) or {}
+        count = study_batch_size(data.get("count"))
+        card_filter = CardFilter(tags=data.get("tags"), tag_mode=data.get("tag_mode"))
+
+        session = repository.create_session(card_filter)
+        session, cards = repository.next_in_session(session["_id"], count)
+        result = session_to_dict(session)
+        result["cards"] = [card_to_dict(card) for card in cards]
+        return jsonify(result), 201
+    except ValueError:
+        return jsonify({"error": "count must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/study/sessions/<session_id>", methods=["GET"])
+def get_study_session(session_id):
+    """Progress of a study session, for resuming it"""
+    try:
+        return jsonify(session_to_dict(repository.get_session(parse_session_id(session_id))))
+    except SessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/study/sessions/<session_id>/next", methods=["POST"])
+def next_study_cards(session_id):
+    """Claim the next batch of cards of a study session"""
+    try:
+        data = request.get_json(silent=True) or {}
+        count = study_batch_size(data.get("count", request.args.get("count")))
+        session, cards = repository.next_in_session(parse_session_id(session_id), count)
+        result = session_to_dict(session)
+        result["cards"] = [card_to_dict(card) for card in cards]
+        return jsonify(result)
+    except SessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError:
+        return jsonify({"error": "count must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/study/sessions/<session_id>", methods=["DELETE"])
+def delete_study_session(session_id):
+    """End a study session early"""
+    try:
+        if not repository.delete_session(parse_session_id(session_id)):
+            return jsonify({"error": "Study session not found"}), 404
+        return jsonify({"message": "Study session deleted"})
+    except SessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/tags", methods=["GET"])
+@versioned(data_version)
 def get_all_tags():
-    """Get all unique tags from flashcards"""
+    """Get all unique tags from flashcards, with per-tag card counts"""
     try:
-        # Use MongoDB aggregation to get all unique tags
-        pipeline = [
-            {"$unwind": "$tags"},  # Separate array elements into individual documents
-            {"$group": {"_id": "$tags"}},  # Group by tag to get unique values
-            {"$sort": {"_id": 1}},  # Sort alphabetically
-            {"$project": {"tag": "$_id", "_id": 0}},  # Rename field and exclude _id
-        ]
-
-        result = list(cards_collection.aggregate(pipeline))
-        tags = [item["tag"] for item in result]
-
-        return jsonify({"tags": tags})
+        # Counts are maintained incrementally by every write, so this reads one small table
+        tag_counts = repository.tag_counts()
+        return jsonify(
+            {"tags": [item["tag"] for item in tag_counts], "tag_counts": tag_counts}
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/tags/rebuild", methods=["POST"])
+def rebuild_tag_stats():
+    """Recompute the materialized tag counts from the cards collection"""
+    try:
+        tag_count = repository.rebuild_tag_counts()
+        data_version.bump()
+        return jsonify({"message": f"Rebuilt counts for {tag_count} tags"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/tags/check", methods=["GET"])
+def check_tag_stats():
+    """Report drift between the materialized tag counts and the cards collection"""
+    try:
+        return jsonify(repository.check_tag_counts())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/cards/by-tag/<tag>", methods=["GET"])
+@versioned(data_version)
 def get_cards_by_tag(tag):
     """Get flashcards that have a specific tag"""
     try:
-        # Case-insensitive tag search
-        cards = list(
-            cards_collection.find({"tags": {"$regex": f"^{tag}$", "$options": "i"}})
-        )
-        return jsonify([card_to_dict(card) for card in cards])
+        # Tags are stored canonically, so this is an exact tag index lookup
+        cards = repository.find(CardFilter(tags=[tag]))
+        return jsonify(lean_cards(cards))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/cards/filter", methods=["GET"])
+@versioned(data_version)
 def filter_cards():
     """Filter cards by multiple criteria including tags"""
     try:
-        tags = request.args.getlist("tags")  # Get multiple tag parameters
-        search = request.args.get("search", "").strip()
-
-        query = {}
-        conditions = []
+        card_filter = CardFilter(
+            request.args.get("search", ""),
+            request.args.getlist("tags"),  # Multiple tag parameters, matched ANY or ALL
+            request.args.get("tag_mode", "any"),
+        )
+        cards = repository.find(card_filter, sort=("created_at", -1))
+        return jsonify(lean_cards(cards))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Tag filtering
-        if tags:
-            # Match cards that have ANY of the specified tags (OR condition)
-            tag_conditions = [
-                {"tags": {"$regex": f"^{tag}$", "$options": "i"}} for tag in tags
-            ]
-            conditions.append({"$or": tag_conditions})
 
-        # Text search
-        if search:
-            conditions.append(
-                {
-                    "$or": [
-                        {"english": {"$regex": search, "$options": "i"}},
-                        {"romanian": {"$regex": search, "$options": "i"}},
-                    ]
-                }
-            )
+def masked_mongo_uri():
+    """MONGO_URI with any credentials replaced by asterisks"""
+    return masked_uri(MONGO_URI)
 
-        # Combine conditions with AND
-        if conditions:
-            query = {"$and": conditions} if len(conditions) > 1 else conditions[0]
 
-        cards = list(cards_collection.find(query).sort("created_at", -1))
-        return jsonify([card_to_dict(card) for card in cards])
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Metrics of this process in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     try:
-        # Test MongoDB connection
-        client.admin.command("ping")
+        # Test the storage connection
+        repository.ping()
         return jsonify(
-            {
-                "status": "healthy",
-                "database": "connected",
-                "mongo_uri": (
-                    MONGO_URI.replace(
-                        MONGO_URI.split("@")[0].split("//")[1] + "@", "***:***@"
-                    )
-                    if "@" in MONGO_URI
-                    else MONGO_URI
-                ),
-                "database_name": DATABASE_NAME,
-            }
+            dict({"status": "healthy", "database": "connected"}, **repository.describe())
         )
     except Exception as e:
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
 
 if __name__ == "__main__":
-    print("Starting Romanian Flashcards API...")
-    print(
-        f"MongoDB URI: {MONGO_URI.replace(MONGO_URI.split('@')[0].split('//')[1] + '@', '***:***@') if '@' in MONGO_URI else MONGO_URI}"
+    if STORAGE_ENGINE == "sqlite":
+        storage = {"sqlite_path": SQLITE_PATH}
+    else:
+        storage = {"mongo_uri": masked_mongo_uri(), "database_name": DATABASE_NAME}
+    logger.info(
+        "Starting Romanian Flashcards API",
+        extra=dict(storage, storage_engine=STORAGE_ENGINE),
     )
-    print(f"Database: {DATABASE_NAME}")
-    print("Server running on http://localhost:5000")
-    app.run(debug=True, port=5000)
+    try:
+        prepare_database()
+    except Exception as e:
+        logger.warning("Could not prepare database: %s", e)
+    logger.info("Server running on http://localhost:%s", PORT)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py).
+    # threaded keeps a long import stream from blocking other requests
+    app.run(debug=FLASK_DEBUG, port=PORT, threaded=True)
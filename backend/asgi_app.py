@@ -0,0 +1,608 @@
+"""
+ASGI variant of the API for serving many concurrent clients from one process:
+
+    uvicorn asgi_app:app --port 5000
+
+The study-facing reads and the bulk import progress stream run natively on
+asyncio with the Motor driver, so open study clients and long-lived progress
+streams wait on the event loop instead of holding threads. All other routes
+are answered by the Flask app mounted underneath (in a thread pool), so the
+routes and JSON shapes are exactly those of app.py, and both share one
+in-memory suggest index, tag counts and data version. With
+STORAGE_ENGINE=sqlite every route is answered by the Flask app.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+import json
+import logging
+import re
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Mount, Route
+
+# Importing the Flask app loads .env and sets up the shared derived state
+import app as flask_api
+from bulk_import import ImportProgress, import_cards_in_chunks_async
+from data_version import compute_etag
+from mongo_repository import (
+    CARD_PROJECTION,
+    COLLECTION_NAME,
+    DUE_CARD_PROJECTION,
+    META_COLLECTION_NAME,
+    TAG_STATS_COLLECTION_NAME,
+    filter_query,
+)
+from pagination import (
+    COUNT_MODES,
+    InvalidCursor,
+    count_cards_async,
+    decode_cursor,
+    encode_cursor,
+    keyset_condition,
+)
+from repository import SORT_FIELDS, CardFilter
+from scheduler import DUE_FIELD, due_query
+from search import build_search_query
+from serialization import (
+    JSON_MIMETYPE,
+    MSGPACK_MIMETYPE,
+    STREAM_FRAMING,
+    STREAM_MIMETYPES,
+    dumps,
+    encode_card_chunk,
+    lean_cards,
+    packb,
+    prefers_msgpack,
+    stream_format,
+)
+from tag_stats import normalize_tag, normalize_tags, tag_condition
+
+card_to_dict = flask_api.card_to_dict
+logger = logging.getLogger("flashcards.asgi")
+
+# Motor clients are bound to the event loop, so they are created on startup
+motor_client = None
+motor_db = None
+
+
+def cards(read_only=False):
+    """The cards collection; read_only routes it like the Flask app's read-only reads"""
+    collection = motor_db[COLLECTION_NAME]
+    if read_only:
+        return collection.with_options(read_preference=flask_api.READ_ONLY_PREFERENCE)
+    return collection
+
+
+def error(message, status=500):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def encoded(request, content):
+    """Card lists through the fast JSON encoder, or MessagePack when Accept prefers it"""
+    if prefers_msgpack(request.headers.get("accept")):
+        return Response(packb(content), media_type=MSGPACK_MIMETYPE)
+    return Response(dumps(content), media_type=JSON_MIMETYPE)
+
+
+async def current_version():
+    """The shared data version, read like the Flask app's (see DataVersion.current)"""
+    version = flask_api.data_version.cached()
+    if version is not None:
+        return version
+    doc = await motor_db[META_COLLECTION_NAME].find_one(
+        {"_id": flask_api.data_version.key}
+    )
+    return flask_api.data_version.remember(doc["version"] if doc else 0)
+
+
+def _etag_matches(header, etag):
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def versioned(view):
+    """Async counterpart of data_version.versioned: ETag validation with 304s"""
+
+    async def wrapper(request):
+        etag = compute_etag(
+            await current_version(),
+            request.url.path,
+            request.query_params.multi_items(),
+            request.headers.get("accept", ""),
+        )
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            response = Response(status_code=304)
+        else:
+            response = await view(request)
+            if response.status_code != 200:
+                return response
+        response.headers["ETag"] = f'"{etag}"'
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept"
+        return response
+
+    return wrapper
+
+
+@versioned
+async def get_cards(request):
+    """Get flashcards with optional pagination, sorting, and search"""
+    try:
+        args = request.query_params
+        page = max(1, int(args.get("page", 1)))
+        limit = min(100, max(1, int(args.get("limit", 10))))
+        sort_by = args.get("sort_by", "created_at")
+        sort_order = args.get("sort_order", "desc")
+        search = args.get("search", "").strip()
+        cursor_token = args.get("cursor")
+        use_cursor = cursor_token is not None or args.get("paginate") == "cursor"
+        count_mode = args.get("count", "estimated" if use_cursor else "auto")
+        if count_mode not in COUNT_MODES:
+            count_mode = "auto"
+        if sort_by not in SORT_FIELDS:
+            sort_by = "created_at"
+        sort_direction = -1 if sort_order.lower() == "desc" else 1
+
+        query = (build_search_query(search) or {}) if search else {}
+        filters = {"search": search, "sort_by": sort_by, "sort_order": sort_order}
+
+        if use_cursor:
+            result = await get_cards_page_by_cursor(
+                query, cursor_token, sort_by, sort_direction, limit, count_mode
+            )
+            result["filters"] = filters
+            return encoded(request, result)
+
+        total_count = await count_cards_async(cards(), query, count_mode)
+        total_pages = (
+            (total_count + limit - 1) // limit if total_count is not None else None
+        )
+        page_cards = (
+            await cards()
+            .find(query, CARD_PROJECTION)
+            .sort([(sort_by, sort_direction), ("_id", sort_direction)])
+            .skip((page - 1) * limit)
+            .limit(limit + 1)
+            .to_list(None)
+        )
+        has_next = len(page_cards) > limit
+        return encoded(
+            request,
+            {
+                "cards": lean_cards(page_cards[:limit]),
+                "pagination": {
+                    "current_page": page,
+                    "total_pages": total_pages,
+                    "total_count": total_count,
+                    "page_size": limit,
+                    "has_next": has_next,
+                    "has_prev": page > 1,
+                },
+                "filters": filters,
+            },
+        )
+    except InvalidCursor as e:
+        return error(str(e), 400)
+    except Exception as e:
+        return error(str(e))
+
+
+async def get_cards_page_by_cursor(query, token, sort_by, sort_direction, limit, count_mode):
+    """Fetch one keyset page (see app.get_cards_page_by_cursor)"""
+    conditions = [query] if query else []
+    direction = "next"
+    scan_direction = sort_direction
+    if token:
+        cursor = decode_cursor(token, sort_by, sort_direction)
+        direction = cursor["direction"]
+        scan_direction = sort_direction if direction == "next" else -sort_direction
+        conditions.append(
+            keyset_condition(sort_by, scan_direction, cursor["value"], cursor["id"])
+        )
+
+    keyset_query = {}
+    if conditions:
+        keyset_query = {"$and": conditions} if len(conditions) > 1 else conditions[0]
+    page_cards = (
+        await cards()
+        .find(keyset_query, CARD_PROJECTION)
+        .sort([(sort_by, scan_direction), ("_id", scan_direction)])
+        .limit(limit + 1)
+        .to_list(None)
+    )
+    has_more = len(page_cards) > limit
+    page_cards = page_cards[:limit]
+
+    if direction == "next":
+        has_next, has_prev = has_more, bool(token)
+    else:
+        page_cards.reverse()
+        has_next, has_prev = True, has_more
+
+    # Cursors are taken from the raw documents, before lean_cards renames _id
+    pagination = {
+        "page_size": limit,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": (
+            encode_cursor(page_cards[-1], sort_by, sort_direction, "next")
+            if has_next and page_cards
+            else None
+        ),
+        "prev_cursor": (
+            encode_cursor(page_cards[0], sort_by, sort_direction, "prev")
+            if has_prev and page_cards
+            else None
+        ),
+        "total_count": await count_cards_async(cards(), query, count_mode),
+        "count_mode": count_mode,
+    }
+    return {"cards": lean_cards(page_cards), "pagination": pagination}
+
+
+@versioned
+async def suggest_cards(request):
+    """Ranked search-as-you-type results served from the in-memory index"""
+    try:
+        query = request.query_params.get("q", "").strip()
+        limit = min(50, max(1, int(request.query_params.get("limit", 10))))
+        if not query:
+            return JSONResponse({"cards": [], "source": "index"})
+
+        index = flask_api.card_index
+        version = flask_api.data_version.latest()
+        # Replaying other processes' writes reads the database, so off the event loop
+        if index.reflects(version) or await run_in_threadpool(
+            index.catch_up, flask_api.repository, version
+        ):
+            return JSONResponse({"cards": index.search(query, limit), "source": "index"})
+
+        search_query = build_search_query(query)
+        found = (
+            await cards().find(search_query, CARD_PROJECTION).limit(limit).to_list(None)
+            if search_query
+            else []
+        )
+        return encoded(request, {"cards": lean_cards(found), "source": "database"})
+    except Exception as e:
+        return error(str(e))
+
+
+@versioned
+async def get_all_cards(request):
+    """Get all flashcards (for study mode), streamed as a JSON array, NDJSON or MessagePack"""
+    try:
+        fmt = stream_format(
+            request.headers.get("accept"), request.query_params.get("format")
+        )
+        cursor = (
+            cards(read_only=True)
+            .find({}, CARD_PROJECTION)
+            .sort([("created_at", -1), ("_id", -1)])
+            .batch_size(flask_api.CARDS_STREAM_BATCH_SIZE)
+        )
+        # Fetch the first batch up front so connection errors still return a 500
+        try:
+            first_card = await cursor.next()
+        except StopAsyncIteration:
+            first_card = None
+
+        return StreamingResponse(
+            stream_cards(first_card, cursor, fmt), media_type=STREAM_MIMETYPES[fmt]
+        )
+    except Exception as e:
+        return error(str(e))
+
+
+async def stream_cards(first_card, cursor, fmt):
+    """Serialize cards straight from the cursor, one encoder call per batch written"""
+    opening, separator, closing = STREAM_FRAMING[fmt]
+    if first_card is None:
+        yield b"[]" if fmt == "json" else b""
+        return
+
+    prefix = opening
+    batch = [first_card]
+    async for card in cursor:
+        batch.append(card)
+        if len(batch) >= flask_api.CARDS_STREAM_BATCH_SIZE:
+            yield prefix + encode_card_chunk(lean_cards(batch), fmt)
+            prefix = separator
+            batch = []
+    if batch:
+        yield prefix + encode_card_chunk(lean_cards(batch), fmt)
+    yield closing
+
+
+async def get_random_card(request):
+    """Get a random flashcard for studying"""
+    try:
+        sample = await cards().aggregate([{"$sample": {"size": 1}}]).to_list(1)
+        if not sample:
+            return error("No cards available", 404)
+        return JSONResponse(card_to_dict(sample[0]))
+    except Exception as e:
+        return error(str(e))
+
+
+async def get_due_cards(request):
+    """The cards most overdue for review, oldest due first"""
+    try:
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            return error("limit must be an integer", 400)
+        limit = max(1, min(limit, flask_api.MAX_DUE_LIMIT))
+        tags = normalize_tags(request.query_params.getlist("tags"))
+        now = datetime.utcnow()
+
+        query = due_query(now, tag_condition(tags, "any") if tags else None)
+        due = (
+            await cards()
+            .find(query, DUE_CARD_PROJECTION)
+            .sort([(DUE_FIELD, 1), ("_id", 1)])
+            .limit(limit)
+            .to_list(None)
+        )
+        return JSONResponse(
+            {
+                "cards": [flask_api.scheduled_card_to_dict(card) for card in due],
+                "as_of": now.isoformat(),
+            }
+        )
+    except Exception as e:
+        return error(str(e))
+
+
+@versioned
+async def get_all_tags(request):
+    """Get all unique tags from flashcards, with per-tag card counts"""
+    try:
+        docs = (
+            await motor_db[TAG_STATS_COLLECTION_NAME]
+            .with_options(read_preference=flask_api.READ_ONLY_PREFERENCE)
+            .find()
+            .sort("_id", 1)
+            .to_list(None)
+        )
+        tag_counts = [{"tag": doc["_id"], "count": doc["count"]} for doc in docs]
+        return JSONResponse(
+            {"tags": [item["tag"] for item in tag_counts], "tag_counts": tag_counts}
+        )
+    except Exception as e:
+        return error(str(e))
+
+
+@versioned
+async def get_cards_by_tag(request):
+    """Get flashcards that have a specific tag"""
+    try:
+        tag = normalize_tag(request.path_params["tag"])
+        found = (
+            await cards().find({"tags": tag}, CARD_PROJECTION).to_list(None)
+        )
+        return encoded(request, lean_cards(found))
+    except Exception as e:
+        return error(str(e))
+
+
+@versioned
+async def filter_cards(request):
+    """Filter cards by multiple criteria including tags"""
+    try:
+        args = request.query_params
+        query = filter_query(
+            CardFilter(args.get("search", ""), args.getlist("tags"), args.get("tag_mode"))
+        )
+        found = (
+            await cards()
+            .find(query, CARD_PROJECTION)
+            .sort([("created_at", -1), ("_id", -1)])
+            .to_list(None)
+        )
+        return encoded(request, lean_cards(found))
+    except Exception as e:
+        return error(str(e))
+
+
+async def add_bulk_cards_with_progress(request):
+    """Add multiple flashcards from bulk text with progress tracking"""
+    try:
+        data = await request.json()
+        if not data or "text" not in data:
+            return error("Bulk text is required", 400)
+
+        # Parsing is CPU-bound: keep it off the event loop
+        started = time.perf_counter()
+        parsed_cards = await run_in_threadpool(flask_api.parse_bulk_request, data)
+        logger.info(
+            "Parsed bulk import",
+            extra={"text_length": len(data["text"]), "cards": len(parsed_cards)},
+        )
+        if not parsed_cards:
+            return error("No valid card pairs found in text", 400)
+    except Exception as e:
+        return error(f"Import failed: {str(e)}")
+
+    skip_duplicates = data.get("skip_duplicates", True)
+    total_cards = len(parsed_cards)
+
+    async def generate_progress():
+        progress = ImportProgress(
+            total=total_cards,
+            interval_ms=data.get("progress_interval_ms"),
+            every_cards=data.get("progress_every"),
+        )
+        start = {
+            "type": "progress",
+            "current": 0,
+            "total": total_cards,
+            "percentage": 0,
+            "status": "Starting import...",
+        }
+        yield f"data: {json.dumps(start)}\n\n"
+
+        async for result in import_cards_in_chunks_async(
+            cards(), parsed_cards, skip_duplicates, data.get("chunk_size")
+        ):
+            # Tag counts and the Flask app's hooks are maintained by blocking code
+            await run_in_threadpool(
+                flask_api.repository.record_added, result.added_cards
+            )
+            await run_in_threadpool(flask_api.on_cards_added, result.added_cards)
+            progress.record(result)
+            flask_api.log_chunk(result)
+            if progress.due() and progress.current < total_cards:
+                yield f"data: {json.dumps(progress.event())}\n\n"
+        flask_api.log_import(progress.added_count, progress.skipped_count, started)
+
+        yield f"data: {json.dumps(progress.event())}\n\n"
+        complete = {
+            "type": "complete",
+            "added_count": progress.added_count,
+            "skipped_count": progress.skipped_count,
+            "total_parsed": total_cards,
+            "message": (
+                f"Import complete: {progress.added_count} added, "
+                f"{progress.skipped_count} skipped"
+            ),
+        }
+        yield f"data: {json.dumps(complete)}\n\n"
+
+    return StreamingResponse(
+        generate_progress(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+    )
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    try:
+        await motor_client.admin.command("ping")
+        return JSONResponse(
+            dict(
+                {"status": "healthy", "database": "connected"},
+                **flask_api.repository.describe(),
+            )
+        )
+    except Exception as e:
+        return JSONResponse({"status": "unhealthy", "error": str(e)}, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global motor_client, motor_db
+    if NATIVE_ROUTES:
+        # Same pool sizes and timeouts as the Flask app's client
+        database = flask_api.repository.database
+        motor_client = AsyncIOMotorClient(database.uri, **database.options)
+        motor_db = motor_client[database.name]
+    try:
+        await run_in_threadpool(flask_api.prepare_database)
+    except Exception as e:
+        logger.warning("Could not prepare database: %s", e)
+    yield
+    if motor_client is not None:
+        motor_client.close()
+    flask_api.repository.close()
+
+
+# The native routes talk to MongoDB through Motor; other storage engines are
+# served entirely by the Flask app
+NATIVE_ROUTES = flask_api.STORAGE_ENGINE == "mongo"
+
+native_routes = [
+    Route("/api/cards", get_cards, methods=["GET"]),
+    Route("/api/cards/suggest", suggest_cards, methods=["GET"]),
+    Route("/api/cards/all", get_all_cards, methods=["GET"]),
+    Route("/api/cards/random", get_random_card, methods=["GET"]),
+    Route("/api/cards/due", get_due_cards, methods=["GET"]),
+    Route("/api/cards/filter", filter_cards, methods=["GET"]),
+    Route("/api/cards/by-tag/{tag}", get_cards_by_tag, methods=["GET"]),
+    Route("/api/cards/bulk/progress", add_bulk_cards_with_progress, methods=["POST"]),
+    Route("/api/tags", get_all_tags, methods=["GET"]),
+    Route("/api/health", health_check, methods=["GET"]),
+]
+routes = (native_routes if NATIVE_ROUTES else []) + [
+    # Writes and the remaining endpoints: the Flask app, run in a thread pool
+    Mount("/", app=WSGIMiddleware(flask_api.app)),
+]
+
+
+class NativeRouteMetrics:
+    """
+    Records requests to the native routes in the Flask app's metrics; the
+    mounted Flask routes record themselves.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        # Label routes the way Flask writes them, so both servers share series
+        self.routes = [
+            (route, re.sub(r"{(\w+)}", r"<\1>", route.path)) for route in routes
+        ]
+
+    def _match(self, scope):
+        for route, label in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return label
+        return None
+
+    async def __call__(self, scope, receive, send):
+        label = self._match(scope) if scope["type"] == "http" else None
+        if label is None:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = flask_api.metrics
+        started = time.perf_counter()
+        response = {"status": 500, "sent": 0}
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["sent"] += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            metrics.in_flight.dec()
+            headers = dict(scope["headers"])
+            metrics.record(
+                scope["method"],
+                label,
+                str(response["status"]),
+                time.perf_counter() - started,
+                int(headers.get(b"content-length") or 0),
+                response["sent"],
+            )
+
+
+middleware = [
+    Middleware(
+        CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
+    )
+]
+if NATIVE_ROUTES and flask_api.METRICS_ENABLED:
+    middleware.append(Middleware(NativeRouteMetrics, routes=native_routes))
+
+app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
@@ -0,0 +1,63 @@
+"""Validation and per-card planning of batch card mutations"""
+
+from tag_stats import normalize_tags
+
+ACTIONS = ("delete", "add_tags", "remove_tags", "patch")
+PATCH_FIELDS = ("english", "romanian", "tags")
+
+# Cards one request may touch; larger clean-ups are split by the client
+MAX_BATCH_CARDS = 10000
+
+
+class InvalidMutation(ValueError):
+    """Raised for batch requests with an unknown action or malformed arguments"""
+
+
+def parse_mutation(data):
+    """Validate the action part of a batch request; returns (action, arguments)"""
+    action = data.get("action")
+    if action not in ACTIONS:
+        raise InvalidMutation(f"action must be one of {', '.join(ACTIONS)}")
+
+    if action in ("add_tags", "remove_tags"):
+        tags = normalize_tags(data.get("tags"))
+        if not tags:
+            raise InvalidMutation("tags must name at least one tag")
+        return action, tags
+
+    if action == "patch":
+        fields = data.get("fields")
+        if not isinstance(fields, dict):
+            raise InvalidMutation("fields must be an object")
+        patch = {}
+        for field in ("english", "romanian"):
+            if field in fields:
+                if not isinstance(fields[field], str) or not fields[field].strip():
+                    raise InvalidMutation(f"{field} must be a non-empty string")
+                patch[field] = fields[field].strip()
+        if "tags" in fields:
+            patch["tags"] = normalize_tags(fields["tags"])
+        if not patch:
+            raise InvalidMutation(f"fields must set one of {', '.join(PATCH_FIELDS)}")
+        return action, patch
+
+    return action, None
+
+
+def plan_update(card, action, argument):
+    """
+    Fields to change on `card` for a tag or patch action, or None when the
+    action wouldn't change the card. The storage engine adds derived fields
+    such as search tokens and the update time when it writes them.
+    """
+    if action == "add_tags":
+        changes = {"tags": normalize_tags(list(card.get("tags") or []) + argument)}
+    elif action == "remove_tags":
+        removed = set(argument)
+        changes = {"tags": [tag for tag in card.get("tags") or [] if tag not in removed]}
+    else:
+        changes = dict(argument)
+
+    if all(card.get(field) == value for field, value in changes.items()):
+        return None
+    return changes
@@ -0,0 +1 @@
+"""Benchmarks for the Romanian flashcards backend"""
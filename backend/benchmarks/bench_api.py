@@ -0,0 +1,409 @@
+"""
+API load benchmark.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_api --cards 100000 --concurrency 8 --requests 200
+
+Seeds a synthetic deck into a fresh local store (SQLite by default, or
+--engine mongo), then drives each route with concurrent clients and prints a
+JSON report with throughput and p50/p95/p99 latency per route. Requests go
+through the Flask app in-process unless --url points at a running server
+(which should be configured with the same store).
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.synthetic import ENGLISH_WORDS, ROMANIAN_WORDS, TAGS, deck_text, iter_cards
+
+# Cards written per transaction / insert_many while seeding
+SEED_CHUNK_SIZE = 10000
+
+# Pages reachable by the offset-pagination scenario
+MAX_PAGE = 50
+PAGE_SIZE = 20
+
+# `heavy` scenarios return the whole deck or write to it, so they run fewer requests
+Scenario = namedtuple("Scenario", ["name", "build", "heavy", "after"])
+Scenario.__new__.__defaults__ = (False, None)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def search_term(rng):
+    """A prefix of a deck word, as typed into the search box"""
+    word = rng.choice(ROMANIAN_WORDS + ENGLISH_WORDS)
+    return word[: rng.randint(2, len(word))]
+
+
+def get(path, **params):
+    return "GET", f"{path}?{urlencode(params, doseq=True)}" if params else path, None
+
+
+def remember_cursor(body, state):
+    """Continue the cursor walk from this page, or start over after the last one"""
+    state["cursor"] = json.loads(body)["pagination"]["next_cursor"]
+
+
+def build_scenarios(bulk_lines):
+    # Bulk decks are numbered apart so indexed lines are new cards; the
+    # repeated phrase lines still exercise duplicate skipping
+    deck_numbers = itertools.count(1)
+
+    def bulk_body(rng):
+        start = next(deck_numbers) * 10_000_000
+        return {"text": deck_text(bulk_lines, rng.randrange(1 << 30), start)}
+
+    def cards_cursor(rng, state):
+        if state.get("cursor"):
+            return get("/api/cards", cursor=state["cursor"], limit=PAGE_SIZE)
+        return get("/api/cards", paginate="cursor", limit=PAGE_SIZE)
+
+    def cards_filter(rng, state):
+        tags = rng.sample(TAGS, rng.randint(1, 2))
+        return get("/api/cards/filter", tags=tags, tag_mode=rng.choice(["any", "all"]))
+
+    return [
+        Scenario(
+            "cards_page",
+            lambda rng, state: get(
+                "/api/cards", page=rng.randint(1, MAX_PAGE), limit=PAGE_SIZE
+            ),
+        ),
+        Scenario("cards_cursor", cards_cursor, after=remember_cursor),
+        Scenario(
+            "cards_search",
+            lambda rng, state: get("/api/cards", search=search_term(rng), limit=PAGE_SIZE),
+        ),
+        Scenario(
+            "cards_suggest",
+            lambda rng, state: get("/api/cards/suggest", q=search_term(rng)),
+        ),
+        Scenario("cards_random", lambda rng, state: get("/api/cards/random")),
+        Scenario("tags", lambda rng, state: get("/api/tags")),
+        Scenario(
+            "cards_by_tag",
+            lambda rng, state: get(f"/api/cards/by-tag/{rng.choice(TAGS)}"),
+            heavy=True,
+        ),
+        Scenario("cards_filter", cards_filter, heavy=True),
+        Scenario("cards_all", lambda rng, state: get("/api/cards/all"), heavy=True),
+        # Writes run last so the read scenarios all see the seeded deck
+        Scenario(
+            "bulk_import",
+            lambda rng, state: ("POST", "/api/cards/bulk", bulk_body(rng)),
+            heavy=True,
+        ),
+        Scenario(
+            "bulk_import_progress",
+            lambda rng, state: ("POST", "/api/cards/bulk/progress", bulk_body(rng)),
+            heavy=True,
+        ),
+    ]
+
+
+class InProcessClient:
+    """Calls the Flask app directly, with one test client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        try:
+            return response.status_code, response.get_data()
+        finally:
+            # As a WSGI server would, so streamed responses finish their bookkeeping
+            response.close()
+
+
+class HTTPClient:
+    """Sends requests to a running server over one keep-alive connection per thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme == "https":
+            self.connection_class = http.client.HTTPSConnection
+        else:
+            self.connection_class = http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.connection_class(self.netloc, timeout=600)
+            self.local.connection = connection
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, self.prefix + path, payload, headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            # Reconnect on the next request
+            connection.close()
+            self.local.connection = None
+            raise
+
+
+def drive(client, scenario, requests, concurrency, seed):
+    """Send `requests` requests from `concurrency` threads; returns (latencies, errors, bytes, seconds)"""
+    tickets = itertools.count()
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{scenario.name}-{index}")
+        state = {}
+        latencies, errors, received = [], 0, 0
+        while next(tickets) < requests:
+            method, path, body = scenario.build(rng, state)
+            started = time.perf_counter()
+            try:
+                status, data = client.request(method, path, body)
+            except Exception:
+                errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if status >= 400:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            received += len(data)
+            if scenario.after is not None:
+                scenario.after(data, state)
+        return latencies, errors, received
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(worker, range(concurrency)))
+    seconds = time.perf_counter() - started
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[0])
+    errors = sum(outcome[1] for outcome in outcomes)
+    received = sum(outcome[2] for outcome in outcomes)
+    return latencies, errors, received, seconds
+
+
+def run_scenario(client, scenario, requests, concurrency, warmup, seed):
+    if warmup:
+        drive(client, scenario, warmup, 1, f"{seed}-warmup")
+    latencies, errors, received, seconds = drive(
+        client, scenario, requests, concurrency, seed
+    )
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "name": scenario.name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(seconds, 4),
+        "requests_per_second": round(len(latencies) / seconds, 2) if seconds else None,
+        "bytes_per_request": round(received / len(latencies)) if latencies else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+    }
+
+
+def load_app(engine, sqlite_path, database):
+    """Import app.py configured for the benchmark store"""
+    os.environ["STORAGE_ENGINE"] = engine
+    if engine == "sqlite":
+        os.environ["SQLITE_PATH"] = sqlite_path
+    else:
+        os.environ["DATABASE_NAME"] = database
+    # app.py reads its settings from the environment at import time
+    import app
+
+    return app
+
+
+def remove_sqlite_store(path):
+    """Delete a SQLite store with its WAL files (before anything opens it)"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def seed_store(api, cards, seed):
+    """Write `cards` synthetic cards straight through the repository and index them"""
+    api.prepare_database(build_index=False)
+    started = time.perf_counter()
+    added = 0
+    for result in api.repository.import_in_chunks(
+        iter_cards(cards, seed), skip_duplicates=False, chunk_size=SEED_CHUNK_SIZE
+    ):
+        added += len(result.added_cards)
+    api.data_version.bump()
+    seeded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    api.card_index.build(api.repository)
+    indexed = time.perf_counter() - started
+    return {
+        "cards": added,
+        "seconds": round(seeded, 4),
+        "cards_per_second": round(added / seeded) if seeded else None,
+        "index_seconds": round(indexed, 4),
+    }
+
+
+def run(args):
+    scenarios = build_scenarios(args.bulk_lines)
+    if args.scenarios:
+        wanted = args.scenarios.split(",")
+        unknown = set(wanted) - {scenario.name for scenario in scenarios}
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    store_dir = None
+    sqlite_path = args.sqlite_path
+    if args.engine == "sqlite" and not sqlite_path:
+        store_dir = tempfile.mkdtemp(prefix="bench-api-")
+        sqlite_path = os.path.join(store_dir, "flashcards.db")
+
+    report = {
+        "benchmark": "api",
+        "engine": args.engine,
+        "target": args.url or "in-process",
+        "cards": args.cards,
+        "seed": args.seed,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+    }
+    api = None
+    try:
+        if args.reset and sqlite_path:
+            remove_sqlite_store(sqlite_path)
+        if not args.no_seed or not args.url:
+            api = load_app(args.engine, sqlite_path, args.database)
+        if args.reset and args.engine == "mongo":
+            api.repository.database.client.drop_database(args.database)
+        if not args.no_seed:
+            api.prepare_database(build_index=False)
+            existing = api.repository.count(None, "estimated")
+            if existing:
+                raise SystemExit(
+                    f"The benchmark store already holds {existing} cards; "
+                    "pass --reset to clear it or --no-seed to reuse it"
+                )
+            report["seeding"] = seed_store(api, args.cards, args.seed)
+        elif api is not None:
+            api.prepare_database(build_index=False)
+            api.card_index.build(api.repository)
+
+        client = HTTPClient(args.url) if args.url else InProcessClient(api.app)
+        results = []
+        for scenario in scenarios:
+            requests = args.heavy_requests if scenario.heavy else args.requests
+            results.append(
+                run_scenario(
+                    client,
+                    scenario,
+                    requests,
+                    args.concurrency,
+                    args.warmup,
+                    args.seed,
+                )
+            )
+            print(
+                f"{scenario.name}: {results[-1]['requests_per_second']} req/s",
+                file=sys.stderr,
+            )
+    finally:
+        if api is not None:
+            api.repository.close()
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    report["results"] = results
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type=int, default=10_000, help="cards to seed")
+    parser.add_argument("--engine", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument(
+        "--sqlite-path", help="SQLite store to use (default: a temporary file)"
+    )
+    parser.add_argument(
+        "--database",
+        default="romanian_flashcards_bench",
+        help="MongoDB database to use with --engine mongo (MONGO_URI selects the server)",
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="clear the store before seeding"
+    )
+    parser.add_argument(
+        "--no-seed", action="store_true", help="benchmark the store as it is"
+    )
+    parser.add_argument(
+        "--url", help="drive a running server (e.g. http://localhost:5000) instead"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per scenario"
+    )
+    parser.add_argument(
+        "--heavy-requests",
+        type=int,
+        default=20,
+        help="requests for whole-deck reads and bulk imports",
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--bulk-lines", type=int, default=500)
+    parser.add_argument(
+        "--scenarios", help="comma-separated scenario names (default: all)"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.reset and args.no_seed:
+        # Clearing the store leaves nothing to benchmark, and with --url there
+        # is no local app to clear a MongoDB store through
+        parser.error("--reset clears the store that --no-seed reuses; pass only one")
+
+    report = run(args)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Parser throughput benchmark.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_parser --lines 1000000 --repeat 3 [--parallel]
+
+Prints a JSON report with the best-of-N lines/s for each parsing entry point.
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+
+from benchmarks.synthetic import deck_text
+from card_parser import (
+    PARSE_WORKERS,
+    iter_bulk_cards,
+    iter_stream_lines,
+    parse_bulk_cards,
+    parse_bulk_cards_parallel,
+)
+
+
+def time_best(func, repeat):
+    """Return (best seconds, last result) over `repeat` runs"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(lines, repeat, seed, parallel=False):
+    text = deck_text(lines, seed)
+    encoded = text.encode("utf-8")
+
+    cases = {
+        "parse_bulk_cards": lambda: len(parse_bulk_cards(text)),
+        "iter_bulk_cards": lambda: sum(1 for _ in iter_bulk_cards(text.split("\n"))),
+        "iter_bulk_cards_stream": lambda: sum(
+            1 for _ in iter_bulk_cards(iter_stream_lines(io.BytesIO(encoded)))
+        ),
+    }
+    if parallel:
+        # Warm the pool first so the timing excludes process startup
+        parse_bulk_cards_parallel(text[:1000], min_lines=0)
+        cases["parse_bulk_cards_parallel"] = lambda: len(
+            parse_bulk_cards_parallel(text, min_lines=0)
+        )
+
+    results = []
+    for name, func in cases.items():
+        seconds, cards = time_best(func, repeat)
+        results.append(
+            {
+                "name": name,
+                "best_seconds": round(seconds, 4),
+                "lines_per_second": round(lines / seconds),
+                "cards": cards,
+            }
+        )
+
+    return {
+        "benchmark": "parser",
+        "lines": lines,
+        "bytes": len(encoded),
+        "repeat": repeat,
+        "seed": seed,
+        "python": platform.python_version(),
+        "parse_workers": PARSE_WORKERS,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--parallel", action="store_true", help="also time the process-pool parser"
+    )
+    args = parser.parse_args(argv)
+
+    report = run(args.lines, args.repeat, args.seed, args.parallel)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
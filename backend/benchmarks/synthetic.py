@@ -0,0 +1,68 @@
+"""Deterministic synthetic Romanian/English decks for benchmarks"""
+
+import random
+
+ROMANIAN_WORDS = [
+    "casă", "masă", "apă", "pâine", "carte", "școală", "doamnă", "doamne",
+    "domn", "domni", "frate", "soră", "mâncare", "oraș", "țară", "stradă",
+    "fereastră", "ușă", "câine", "pisică", "mulțumesc", "prieten", "învățător",
+    "bucătărie", "grădină", "întrebare", "răspuns", "științe", "țăran", "lună",
+]
+ENGLISH_WORDS = [
+    "house", "table", "water", "bread", "book", "school", "lady", "ladies",
+    "sir", "gentlemen", "brother", "sister", "food", "city", "country", "street",
+    "window", "door", "dog", "cat", "thanks", "friend", "teacher",
+    "kitchen", "garden", "question", "answer", "sciences", "peasant", "moon",
+]
+PHRASES = [
+    ("Bună dimineața, doamnă!", "Good morning, madam!"),
+    ("Bine, mulțumesc", "Fine, thank you"),
+    ("Ce mai faci?", "How are you?"),
+    ("La revedere", "Goodbye"),
+    ("Bună ziua, Ana", "Good day, Ana"),
+]
+TAGS = ["food", "home", "family", "greetings", "city", "nature", "school", "verbs"]
+
+
+def deck_line(rng, index):
+    """One deck line mixing the shapes the parser handles"""
+    kind = rng.random()
+    tags = ""
+    if rng.random() < 0.3:
+        tags = " [" + ", ".join(rng.sample(TAGS, rng.randint(1, 3))) + "]"
+
+    if kind < 0.05:
+        return f"Lecția {index // 100} (vocabular)"
+    if kind < 0.15:
+        romanian, english = rng.choice(PHRASES)
+        return f"{romanian}: {english}{tags}"
+    if kind < 0.30:
+        words = rng.sample(ROMANIAN_WORDS, rng.randint(2, 3))
+        return f"{', '.join(words)}: {rng.choice(ENGLISH_WORDS)}{tags}"
+    if kind < 0.40:
+        words = rng.sample(ROMANIAN_WORDS, 2)
+        return f"{'/'.join(words)}: {rng.choice(ENGLISH_WORDS)} / {rng.choice(ENGLISH_WORDS)}{tags}"
+    return f"{rng.choice(ROMANIAN_WORDS)}{index}: {rng.choice(ENGLISH_WORDS)}{index}{tags}"
+
+
+def iter_deck_lines(count, seed=42, start=0):
+    """Yield `count` synthetic deck lines, numbered from `start`"""
+    rng = random.Random(seed)
+    for index in range(start, start + count):
+        yield deck_line(rng, index)
+
+
+def deck_text(count, seed=42, start=0):
+    """A synthetic deck of `count` lines as a single string"""
+    return "\n".join(iter_deck_lines(count, seed, start))
+
+
+def iter_cards(count, seed=42):
+    """Yield `count` unique card dicts ready for insertion"""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield {
+            "romanian": f"{rng.choice(ROMANIAN_WORDS)} {index}",
+            "english": f"{rng.choice(ENGLISH_WORDS)} {index}",
+            "tags": rng.sample(TAGS, rng.randint(0, 2)),
+        }
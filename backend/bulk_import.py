@@ -0,0 +1,250 @@
+"""Batched bulk import engine for parsed flashcards"""
+
+from datetime import datetime
+from itertools import islice
+import os
+import time
+
+from pymongo.errors import BulkWriteError
+
+from scheduler import DUE_FIELD
+from search import SEARCH_FIELD, card_search_tokens
+from sync import UPDATED_FIELD
+from tag_stats import normalize_tags
+
+# Number of parsed cards deduplicated and written per database round trip
+DEFAULT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+MAX_CHUNK_SIZE = 10000
+
+# Progress events are coalesced: at most one per interval, or one per N committed cards
+PROGRESS_INTERVAL_MS = int(os.getenv("BULK_PROGRESS_INTERVAL_MS", "250"))
+PROGRESS_EVERY_CARDS = int(os.getenv("BULK_PROGRESS_EVERY_CARDS", "0"))  # 0 = time only
+
+
+def resolve_chunk_size(requested=None):
+    """Clamp a requested chunk size to the supported range"""
+    try:
+        size = int(requested) if requested else DEFAULT_CHUNK_SIZE
+    except (TypeError, ValueError):
+        size = DEFAULT_CHUNK_SIZE
+    return min(MAX_CHUNK_SIZE, max(1, size))
+
+
+def iter_chunks(items, size):
+    """Yield lists of at most `size` items from any iterable"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ChunkResult:
+    """Outcome of importing one chunk of parsed cards"""
+
+    def __init__(self, processed, added_cards, skipped_count):
+        self.processed = processed
+        self.added_cards = added_cards
+        self.skipped_count = skipped_count
+
+
+def unique_by_romanian(chunk):
+    """First card for each Romanian text within a chunk"""
+    unique = {}
+    for card_data in chunk:
+        unique.setdefault(card_data["romanian"], card_data)
+    return unique
+
+
+def _dedupe_chunk(collection, chunk):
+    """Drop cards whose Romanian text repeats within the chunk or already exists"""
+    unique = unique_by_romanian(chunk)
+    existing = {
+        doc["romanian"]
+        for doc in collection.find(
+            {"romanian": {"$in": list(unique)}}, {"romanian": 1, "_id": 0}
+        )
+    }
+    return [card for romanian, card in unique.items() if romanian not in existing]
+
+
+def _written(documents, bwe):
+    """Documents of an unordered insert that weren't reported as failed"""
+    failed = {error["index"] for error in bwe.details.get("writeErrors", [])}
+    return [doc for i, doc in enumerate(documents) if i not in failed]
+
+
+def _insert_chunk(collection, documents):
+    """Insert documents with one unordered insert_many and return those written"""
+    if not documents:
+        return []
+    try:
+        collection.insert_many(documents, ordered=False)
+        return documents
+    except BulkWriteError as bwe:
+        # Unordered writes keep going past individual failures; report the rest
+        return _written(documents, bwe)
+
+
+def now_ms():
+    """
+    The current time at the millisecond precision MongoDB stores, so a card
+    reads back (and is indexed for suggestions) with the `created_at` it was
+    returned with when it was added
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def card_documents(cards):
+    """Card documents, with all derived fields, for parsed cards"""
+    documents = []
+    for card_data in cards:
+        tags = normalize_tags(card_data.get("tags"))
+        now = now_ms()
+        documents.append(
+            {
+                "english": card_data["english"],
+                "romanian": card_data["romanian"],
+                "tags": tags,
+                "created_at": now,
+                UPDATED_FIELD: now,
+                SEARCH_FIELD: card_search_tokens(
+                    card_data["english"], card_data["romanian"], tags
+                ),
+                DUE_FIELD: now,
+            }
+        )
+    return documents
+
+
+def import_cards_in_chunks(collection, parsed_cards, skip_duplicates=True, chunk_size=None):
+    """
+    Import parsed cards chunk by chunk, yielding a ChunkResult after each write.
+
+    Each chunk costs one `$in` lookup (when skipping duplicates) and one
+    unordered `insert_many`. Duplicates inside a chunk are removed in memory;
+    duplicates across chunks are caught by the lookup because earlier chunks
+    have already been committed by the time the next one is checked.
+    """
+    chunk_size = resolve_chunk_size(chunk_size)
+
+    for chunk in iter_chunks(parsed_cards, chunk_size):
+        to_insert = _dedupe_chunk(collection, chunk) if skip_duplicates else chunk
+        added = _insert_chunk(collection, card_documents(to_insert))
+
+        yield ChunkResult(
+            processed=len(chunk),
+            added_cards=added,
+            skipped_count=len(chunk) - len(to_insert),
+        )
+
+
+async def _dedupe_chunk_async(collection, chunk):
+    unique = unique_by_romanian(chunk)
+    cursor = collection.find(
+        {"romanian": {"$in": list(unique)}}, {"romanian": 1, "_id": 0}
+    )
+    existing = {doc["romanian"] async for doc in cursor}
+    return [card for romanian, card in unique.items() if romanian not in existing]
+
+
+async def _insert_chunk_async(collection, documents):
+    if not documents:
+        return []
+    try:
+        await collection.insert_many(documents, ordered=False)
+        return documents
+    except BulkWriteError as bwe:
+        return _written(documents, bwe)
+
+
+async def import_cards_in_chunks_async(
+    collection, parsed_cards, skip_duplicates=True, chunk_size=None
+):
+    """`import_cards_in_chunks` for an asyncio (Motor) collection"""
+    chunk_size = resolve_chunk_size(chunk_size)
+
+    for chunk in iter_chunks(parsed_cards, chunk_size):
+        if skip_duplicates:
+            to_insert = await _dedupe_chunk_async(collection, chunk)
+        else:
+            to_insert = chunk
+        added = await _insert_chunk_async(collection, card_documents(to_insert))
+
+        yield ChunkResult(
+            processed=len(chunk),
+            added_cards=added,
+            skipped_count=len(chunk) - len(to_insert),
+        )
+
+
+class ImportProgress:
+    """Track import throughput and decide when a progress event is worth sending"""
+
+    def __init__(self, total=None, interval_ms=None, every_cards=None):
+        self.total = total
+        self.interval = (
+            PROGRESS_INTERVAL_MS if interval_ms is None else max(0, int(interval_ms))
+        ) / 1000
+        self.every_cards = (
+            PROGRESS_EVERY_CARDS if every_cards is None else max(0, int(every_cards))
+        )
+        self.current = 0
+        self.added_count = 0
+        self.skipped_count = 0
+        self.started = time.monotonic()
+        self._last_emit_time = self.started
+        self._last_emit_count = 0
+
+    def record(self, result):
+        """Account for one committed ChunkResult"""
+        self.current += result.processed
+        self.added_count += len(result.added_cards)
+        self.skipped_count += result.skipped_count
+
+    def due(self):
+        """True when enough time has passed or enough cards were committed since the last event"""
+        if time.monotonic() - self._last_emit_time >= self.interval:
+            return True
+        return bool(
+            self.every_cards
+            and self.current - self._last_emit_count >= self.every_cards
+        )
+
+    def event(self):
+        """Build a progress event payload and mark it as sent"""
+        now = time.monotonic()
+        elapsed = now - self.started
+        rate = self.current / elapsed if elapsed > 0 else 0.0
+
+        percentage = None
+        eta_seconds = None
+        if self.total:
+            percentage = int((self.current / self.total) * 100)
+            if rate > 0:
+                eta_seconds = round((self.total - self.current) / rate, 1)
+
+        status = f"Imported {self.current}"
+        if self.total:
+            status += f"/{self.total}"
+        status += f" cards ({rate:,.0f} cards/s"
+        if eta_seconds is not None:
+            status += f", ETA {eta_seconds:.1f}s"
+        status += ")"
+
+        self._last_emit_time = now
+        self._last_emit_count = self.current
+        return {
+            "type": "progress",
+            "current": self.current,
+            "total": self.total,
+            "percentage": percentage,
+            "added_count": self.added_count,
+            "skipped_count": self.skipped_count,
+            "elapsed_seconds": round(elapsed, 3),
+            "rate": round(rate, 1),
+            "eta_seconds": eta_seconds,
+            "status": status,
+        }
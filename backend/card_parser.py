@@ -0,0 +1,256 @@
+"""Parsing of bulk flashcard text ("romanian: english [tags]" lines)"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import codecs
+import multiprocessing
+import os
+import re
+import threading
+
+# Bytes read from an upload stream per iteration
+READ_BLOCK_SIZE = 64 * 1024
+
+# Parallel parsing: worker processes (0 = one per CPU) and the input size below
+# which parsing stays in-process because pool round trips would cost more
+PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+PARALLEL_MIN_LINES = int(os.getenv("BULK_PARSE_PARALLEL_MIN_LINES", "50000"))
+PARALLEL_BY_DEFAULT = os.getenv("BULK_PARSE_PARALLEL", "false").lower() == "true"
+CHUNKS_PER_WORKER = 4
+
+
+# Common Romanian greeting/phrase patterns whose commas are part of the phrase
+PHRASE_PATTERNS = (
+    "bună dimineața",
+    "bună ziua",
+    "bună seara",
+    "la revedere",
+    "ce mai",
+    "și eu",
+    "bine ați",
+    "mulțumesc",
+    "și tu",
+    "bună,",  # Greetings with names
+    "salut,",  # Greetings with names
+)
+
+
+class BulkCardParser:
+    """
+    Line parser compiled once and reused for every line of every import.
+
+    All patterns are precompiled up front and the phrase list is folded into a
+    single alternation, so each line is handled in one pass without rebuilding
+    helpers or rescanning pattern lists.
+    """
+
+    def __init__(self, phrase_patterns=PHRASE_PATTERNS):
+        self.phrase_matcher = re.compile(
+            "|".join(re.escape(pattern) for pattern in phrase_patterns)
+        )
+        self.sentence_punctuation = re.compile(r"[!?.]")
+        # Last "[...]" group: tag text runs up to the last "]" with no "[" after it
+        self.tag_group = re.compile(r"\[([^\[]*)\][^\[\]]*$")
+
+    def is_separating_comma(self, romanian_text):
+        """
+        Determine if commas in the Romanian text are separating different words/phrases
+        or are part of the actual phrase (like in sentences or greetings).
+
+        Separating commas typically appear in vocabulary lists like:
+        - "doamnă, doamne: madam / lady"
+        - "domn, domni: sir / mister"
+
+        Non-separating commas appear in phrases/sentences like:
+        - "Bună dimineața, doamnă!: Good morning, madam!"
+        - "Bine, mulțumesc: Fine, thank you"
+        """
+        # Sentence punctuation or more than 2 words indicates a phrase/sentence
+        if self.sentence_punctuation.search(romanian_text):
+            return False
+        if len(romanian_text.split()) > 2:
+            return False
+
+        # Greetings and set phrases shouldn't be split
+        if self.phrase_matcher.search(romanian_text.lower()):
+            return False
+
+        comma_parts = [part.strip() for part in romanian_text.split(",")]
+
+        # Exactly 2 single words separated by a comma are vocabulary variants,
+        # unless the second one is capitalised (likely "Greeting, Name")
+        if len(comma_parts) == 2:
+            if comma_parts[1] and comma_parts[1][0].isupper():
+                return False
+            return all(len(part.split()) <= 1 for part in comma_parts)
+
+        # For lists of 3+ comma-separated items that are all single words, likely vocabulary
+        if len(comma_parts) >= 3:
+            return all(len(part.split()) == 1 for part in comma_parts)
+
+        # Default: treat commas as part of phrase
+        return False
+
+    def iter_cards(self, lines):
+        """Incrementally parse an iterable of lines, yielding card dicts as they are found"""
+        tag_group = self.tag_group
+        is_separating_comma = self.is_separating_comma
+
+        for line in lines:
+            # Lines without a colon are blank lines or section headers
+            romanian, colon, english = line.partition(":")
+            if not colon:
+                continue
+
+            original_romanian = romanian = romanian.strip()
+            original_english = english = english.strip()
+            if not romanian or not english:
+                continue
+
+            # Trailing punctuation is ignored for length checks and splitting
+            romanian = romanian.rstrip("!?.")
+            english = english.rstrip("!?.")
+            if len(romanian) < 2 or len(english) < 2:
+                continue
+
+            # Extract tags from English text if present (format: "text [tag1, tag2]")
+            tags = []
+            if "[" in english:
+                match = tag_group.search(english)
+                if match:
+                    tags = [
+                        tag.strip().lower()
+                        for tag in match.group(1).split(",")
+                        if tag.strip()
+                    ]
+                    original_english = english[: match.start()].strip()
+
+            # Slashes mark alternative forms (takes priority over comma handling),
+            # separating commas mark vocabulary variants
+            if "/" in romanian:
+                variants = original_romanian.split("/")
+            elif "," in romanian and is_separating_comma(romanian):
+                variants = romanian.split(",")
+            else:
+                variants = None
+
+            # Card for the full form (original with punctuation restored)
+            yield {
+                "romanian": original_romanian,
+                "english": original_english,
+                "tags": tags,
+            }
+
+            # Individual cards for each variant, skipping empty or very short ones
+            if variants:
+                for variant in variants:
+                    variant = variant.strip()
+                    if len(variant) >= 2:
+                        yield {
+                            "romanian": variant,
+                            "english": original_english,
+                            "tags": tags,
+                        }
+
+
+default_parser = BulkCardParser()
+
+
+def is_separating_comma(romanian_text):
+    """Determine if commas in the Romanian text separate vocabulary variants"""
+    return default_parser.is_separating_comma(romanian_text)
+
+
+def iter_bulk_cards(lines):
+    """Incrementally parse an iterable of lines, yielding card dicts as they are found"""
+    return default_parser.iter_cards(lines)
+
+
+def parse_bulk_cards(text):
+    """Parse bulk card text and extract Romanian:English pairs"""
+    return list(iter_bulk_cards(text.strip().split("\n")))
+
+
+def split_on_line_boundaries(text, parts):
+    """Split text into at most `parts` contiguous pieces, cutting only at newlines"""
+    pieces = []
+    start = 0
+    target = max(1, len(text) // parts)
+    while start < len(text):
+        end = text.find("\n", start + target)
+        if end == -1:
+            pieces.append(text[start:])
+            break
+        pieces.append(text[start:end])
+        start = end + 1
+    return pieces
+
+
+def _parse_piece(piece):
+    """Worker entry point: parse one piece of bulk text"""
+    return list(iter_bulk_cards(piece.split("\n")))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Lazily start the shared parser pool (spawned, so no MongoClient or locks are inherited)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the parse workers, e.g. when a server worker process exits"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def parse_bulk_cards_parallel(text, min_lines=None):
+    """
+    Parse bulk card text across a process pool, preserving the input order.
+
+    The text is cut into contiguous pieces on line boundaries and the parsed
+    pieces are concatenated in their original order, so the result is identical
+    to parse_bulk_cards. Inputs smaller than `min_lines` are parsed in-process.
+    """
+    min_lines = PARALLEL_MIN_LINES if min_lines is None else min_lines
+    if PARSE_WORKERS < 2 or text.count("\n") + 1 < min_lines:
+        return parse_bulk_cards(text)
+
+    pieces = split_on_line_boundaries(text, PARSE_WORKERS * CHUNKS_PER_WORKER)
+    # Executor.map yields results in submission order regardless of completion order
+    return list(chain.from_iterable(_get_pool().map(_parse_piece, pieces)))
+
+
+def iter_stream_lines(stream, encoding="utf-8-sig", block_size=READ_BLOCK_SIZE):
+    """
+    Decode a binary stream incrementally and yield it line by line.
+
+    Only one block plus the current partial line is held in memory, so arbitrarily
+    large uploads can be parsed with flat memory usage.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        pending += decoder.decode(block)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        yield from lines
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
@@ -0,0 +1,194 @@
+"""Collection data version and ETag / 304 support for read endpoints"""
+
+from functools import wraps
+import hashlib
+import logging
+import threading
+import time
+
+from flask import make_response, request
+from pymongo import ReturnDocument
+
+logger = logging.getLogger("flashcards.data_version")
+
+class DataVersion:
+    """
+    Monotonically increasing counter bumped by every write to the cards collection.
+
+    The counter lives in a small metadata document so all worker processes share
+    it. After `watch`, a change stream on that document keeps a local copy
+    current, so validating an ETag needs no database read. Without one it is
+    read on every call (one indexed lookup), because a version cached in one
+    worker would answer 304 for bodies another worker has just changed; a
+    positive `cache_ttl` then serves reads from a local copy for that many
+    seconds, which is only safe when a single process serves the app.
+    """
+
+    def __init__(self, collection, key="cards", cache_ttl=0.0):
+        self.collection = collection
+        self.key = key
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._fetched_at = 0.0
+        self._stream = None
+        self._watching = False
+
+    def remember(self, value):
+        """Store a version read from the database; returns the latest known one"""
+        with self._lock:
+            # Never move backwards if a slower read races a newer bump
+            if self._value is None or value >= self._value:
+                self._value = value
+            self._fetched_at = time.monotonic()
+            return self._value
+
+    def cached(self):
+        """The local copy while a change stream follows it or it is younger than the TTL"""
+        if self._watching:
+            return self._value
+        if self.cache_ttl <= 0:
+            return None
+        with self._lock:
+            if (
+                self._value is not None
+                and time.monotonic() - self._fetched_at < self.cache_ttl
+            ):
+                return self._value
+        return None
+
+    def latest(self):
+        """
+        The newest version this process has read or written, without a database
+        read; e.g. the one just validated by `versioned` for this request
+        """
+        with self._lock:
+            value = self._value
+        return value if value is not None else self.current()
+
+    def bump(self):
+        """Record a change and return the new version"""
+        version = self._increment()
+        self.remember(version)
+        return version
+
+    def current(self):
+        """The shared version, read from the database unless cached within the TTL"""
+        version = self.cached()
+        if version is not None:
+            return version
+        return self.remember(self._read())
+
+    def watch(self):
+        """
+        Follow the counter with a change stream in a background thread, so
+        other workers' bumps reach the local copy as they happen. Change
+        streams need a replica set; returns False (and `current` keeps reading
+        the database) when the server doesn't offer them.
+        """
+        if self._watching:
+            return True
+        try:
+            stream = self.collection.watch([{"$match": {"documentKey._id": self.key}}])
+        except Exception as e:
+            logger.info("Data version read per request; no change stream: %s", e)
+            return False
+        # Read once the stream is open, so no bump can fall between the two
+        self.remember(self._read())
+        self._stream = stream
+        self._watching = True
+        threading.Thread(
+            target=self._follow, args=(stream,), name="data-version-watch", daemon=True
+        ).start()
+        return True
+
+    def _follow(self, stream):
+        try:
+            for change in stream:
+                document = change.get("fullDocument") or change.get(
+                    "updateDescription", {}
+                ).get("updatedFields", {})
+                if "version" in document:
+                    self.remember(document["version"])
+        except Exception as e:
+            if self._stream is stream:
+                logger.warning("Data version change stream failed: %s", e)
+        finally:
+            # Dropped collections end the stream too; fall back to reading the database
+            if self._stream is stream:
+                self._stream = None
+                self._watching = False
+
+    def stop(self):
+        """Close the change stream, if any"""
+        stream, self._stream = self._stream, None
+        self._watching = False
+        if stream is not None:
+            stream.close()
+
+    # Storage of the shared counter; other storage engines override these two
+    def _increment(self):
+        doc = self.collection.find_one_and_update(
+            {"_id": self.key},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["version"]
+
+    def _read(self):
+        doc = self.collection.find_one({"_id": self.key})
+        return doc["version"] if doc else 0
+
+
+def compute_etag(version, path, args, accept):
+    """Strong ETag for a path, its (key, value) query arguments and Accept header"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(path.encode("utf-8"))
+    for key, value in sorted(args):
+        digest.update(f"\0{key}={value}".encode("utf-8"))
+    # Endpoints may negotiate the representation (e.g. NDJSON) on Accept
+    digest.update(f"\0{accept}".encode("utf-8"))
+    return f"v{version}-{digest.hexdigest()}"
+
+
+def make_etag(version):
+    """Strong ETag for the current request at a given data version"""
+    return compute_etag(
+        version,
+        request.path,
+        request.args.items(multi=True),
+        request.headers.get("Accept", ""),
+    )
+
+
+def versioned(data_version):
+    """
+    Decorate a read endpoint with ETag validation.
+
+    The version is read before the view runs, so a write racing the view can
+    only make the tag older than the body (a harmless refetch), never newer.
+    It comes from memory while a change stream follows it (see
+    `DataVersion.watch`), otherwise from one indexed read of the database.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_etag(data_version.current())
+            # If-None-Match uses the weak comparison (RFC 7232), like asgi_app
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate it on every use
+            response.headers["Cache-Control"] = "no-cache"
+            response.vary.add("Accept")
+            return response
+
+        return wrapper
+
+    return decorator
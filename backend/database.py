@@ -0,0 +1,171 @@
+"""MongoDB connection management: pooled, time-bounded clients created lazily per process"""
+
+import os
+import threading
+
+from pymongo import MongoClient
+from pymongo.read_preferences import ReadPreference, SecondaryPreferred
+
+_INT_OPTIONS = {
+    # Connection pool
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "maxConnecting": "MONGO_MAX_CONNECTING",
+    # How long a request may wait for a free pooled connection
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    # Failing fast when no suitable server is reachable
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+    # Overall deadline for each operation, retries included
+    "timeoutMS": "MONGO_TIMEOUT_MS",
+}
+
+_DEFAULTS = {
+    "maxPoolSize": 100,
+    "waitQueueTimeoutMS": 5000,
+    "serverSelectionTimeoutMS": 5000,
+    "connectTimeoutMS": 5000,
+    # Per round trip rather than timeoutMS, which would also cap long streamed cursors
+    "socketTimeoutMS": 30000,
+}
+
+
+def client_options(environ=None):
+    """MongoClient keyword options from MONGO_* environment variables"""
+    environ = os.environ if environ is None else environ
+    options = {}
+    for option, variable in _INT_OPTIONS.items():
+        value = environ.get(variable)
+        if value is None:
+            value = _DEFAULTS.get(option)
+        elif value.strip() in ("", "0", "none"):
+            # 0 / none switch a defaulted limit off
+            value = None
+        if value is not None:
+            options[option] = int(value)
+    app_name = environ.get("MONGO_APP_NAME", "learn-romanian")
+    if app_name:
+        options["appname"] = app_name
+    return options
+
+
+def masked_uri(uri):
+    """A MongoDB URI with any credentials replaced by asterisks"""
+    if "@" not in uri:
+        return uri
+    return uri.replace(uri.split("@")[0].split("//")[1] + "@", "***:***@")
+
+
+def read_only_preference(environ=None):
+    """
+    Read preference for read-only endpoints (MONGO_READ_ONLY_PREFERENCE).
+
+    Defaults to primary. Those endpoints are ETag-validated against the data
+    version, which is read from the primary, so a lagging secondary can pair a
+    pre-write body with a post-write ETag; clients then revalidate that stale
+    body with 304s until the next write. Only choose a secondary mode when that
+    is acceptable. MONGO_MAX_STALENESS_SECONDS (at least 90) bounds the lag of
+    secondaryPreferred.
+    """
+    environ = os.environ if environ is None else environ
+    mode = environ.get("MONGO_READ_ONLY_PREFERENCE", "primary")
+    if mode == "secondaryPreferred":
+        staleness = int(environ.get("MONGO_MAX_STALENESS_SECONDS", "-1"))
+        return SecondaryPreferred(max_staleness=staleness)
+    preferences = {
+        "primary": ReadPreference.PRIMARY,
+        "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+        "secondary": ReadPreference.SECONDARY,
+        "nearest": ReadPreference.NEAREST,
+    }
+    if mode not in preferences:
+        raise ValueError(f"Unknown MONGO_READ_ONLY_PREFERENCE: {mode}")
+    return preferences[mode]
+
+
+class Database:
+    """
+    A database whose MongoClient is created on first use in each process.
+
+    MongoClient must not be used across fork(), so the owning pid is recorded
+    and a forked child transparently opens its own client (and pool) instead
+    of touching the parent's sockets. The parent's client is left alone in
+    the child rather than closed, since closing it would end the parent's
+    server sessions.
+    """
+
+    def __init__(self, uri, name, **options):
+        self.uri = uri
+        self.name = name
+        self.options = options
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            # A lock held by another thread at fork time would never be released in the child
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = MongoClient(self.uri, **self.options)
+                self._pid = os.getpid()
+            return self._client
+
+    def collection(self, name, read_preference=None):
+        return LazyCollection(self, name, read_preference)
+
+    def __getitem__(self, name):
+        return self.collection(name)
+
+    def close(self):
+        """Close this process's client; it is reopened on next use"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+
+class LazyCollection:
+    """
+    Stand-in for a pymongo Collection that resolves against the current
+    process's client on every use, so it can be created at import time and
+    shared by long-lived helpers.
+    """
+
+    def __init__(self, database, name, read_preference=None):
+        self._database = database
+        self._name = name
+        self._read_preference = read_preference
+        self._client = None
+        self._collection = None
+
+    @property
+    def name(self):
+        return self._name
+
+    def _resolve(self):
+        client = self._database.client
+        if client is not self._client:
+            collection = client[self._database.name][self._name]
+            if self._read_preference is not None:
+                collection = collection.with_options(
+                    read_preference=self._read_preference
+                )
+            self._collection, self._client = collection, client
+        return self._collection
+
+    def __getattr__(self, attribute):
+        return getattr(self._resolve(), attribute)
+
+    def __repr__(self):
+        return f"LazyCollection({self._database.name}.{self._name})"
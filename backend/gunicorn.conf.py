@@ -0,0 +1,59 @@
+"""
+Gunicorn settings for serving the API in production:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Every setting can be overridden from the environment (or .env). Workers are
+threaded (gthread), so a long-running import progress stream occupies one
+thread rather than a whole worker and study traffic keeps being served.
+"""
+
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(
+    os.getenv("GUNICORN_WORKERS", str(min(multiprocessing.cpu_count() * 2, 8)))
+)
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Load the app (and run the schema preparation) once in the master before forking
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# gthread workers heartbeat from their main thread, so this only catches stuck
+# workers, not long streaming responses
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# On SIGTERM, stop accepting connections and give in-flight requests this long
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+
+def post_worker_init(worker):
+    # Each worker keeps its own in-memory suggest index, built after the fork;
+    # it replays the other workers' writes from the change feed when the data version moves
+    app_module = sys.modules["app"]
+    # Threads don't survive the fork, so each worker follows the data version itself
+    app_module.data_version.watch()
+    app_module.card_index.build_in_background(app_module.repository)
+
+
+def worker_exit(server, worker):
+    app_module = sys.modules.get("app")
+    if app_module is None:
+        return
+    from card_parser import shutdown_pool
+
+    shutdown_pool()
+    app_module.repository.close()
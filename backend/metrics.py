@@ -0,0 +1,310 @@
+"""Process-local request and MongoDB command metrics in the Prometheus text format"""
+
+import bisect
+import threading
+import time
+
+from flask import request
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; the low end resolves sub-millisecond local queries
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+# Bytes, from a single card to a streamed deck
+SIZE_BUCKETS = (
+    128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608, 33554432, 134217728,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """A named metric with one child per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._unlabeled = self.labels()
+
+    def labels(self, *values):
+        # Children are only ever added, so the lookup needs no lock
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """(suffix, label pairs, value) for every child, in the order they were created"""
+        for values, child in list(self._children.items()):
+            pairs = list(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield suffix, pairs + extra, value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, pairs, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(pairs)} {_format_number(value)}"
+            )
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def samples(self):
+        yield "", [], self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabeled.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabeled.inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabeled.dec(amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket, plus the overflow above the largest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield "_bucket", [("le", _format_number(float(bound)))], cumulative
+        yield "_sum", [], total
+        yield "_count", [], cumulative
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._unlabeled.observe(value)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener timing every command by name (find, aggregate,
+    insert, count, getMore, ...). Registered on the client, so it also sees
+    the commands behind cursors, bulk writes and the async (Motor) routes.
+    """
+
+    def __init__(self, durations, failures):
+        self.durations = durations
+        self.failures = failures
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.durations.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.durations.labels(event.command_name).observe(event.duration_micros / 1e6)
+        self.failures.labels(event.command_name).inc()
+
+
+class Metrics:
+    """
+    The app's metrics. Each process keeps its own, so with several gunicorn
+    workers every scrape reports the worker that answered it.
+    """
+
+    def __init__(self, namespace="flashcards"):
+        self.in_flight = Gauge(
+            f"{namespace}_http_requests_in_flight", "Requests currently being served"
+        )
+        self.request_duration = Histogram(
+            f"{namespace}_http_request_duration_seconds",
+            "Time to serve a request, until the last byte for streamed responses",
+            ("method", "route", "status"),
+        )
+        self.request_size = Histogram(
+            f"{namespace}_http_request_size_bytes",
+            "Request body size",
+            ("method", "route"),
+            buckets=SIZE_BUCKETS,
+        )
+        self.response_size = Histogram(
+            f"{namespace}_http_response_size_bytes",
+            "Response body size",
+            ("method", "route", "status"),
+            buckets=SIZE_BUCKETS,
+        )
+        self.command_duration = Histogram(
+            f"{namespace}_mongodb_command_duration_seconds",
+            "MongoDB command round-trip time by command",
+            ("command",),
+        )
+        self.command_failures = Counter(
+            f"{namespace}_mongodb_command_failures_total",
+            "MongoDB commands that returned an error",
+            ("command",),
+        )
+        self.command_listener = CommandMetrics(
+            self.command_duration, self.command_failures
+        )
+        self._metrics = [
+            self.in_flight,
+            self.request_duration,
+            self.request_size,
+            self.response_size,
+            self.command_duration,
+            self.command_failures,
+        ]
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+    def record(self, method, route, status, seconds, request_bytes, response_bytes):
+        self.request_duration.labels(method, route, status).observe(seconds)
+        self.request_size.labels(method, route).observe(request_bytes)
+        self.response_size.labels(method, route, status).observe(response_bytes)
+
+    def instrument(self, app):
+        """Time every request of a Flask app, labelled by its route pattern"""
+
+        @app.before_request
+        def start_timer():
+            request.environ["metrics.started"] = time.perf_counter()
+            self.in_flight.inc()
+
+        @app.after_request
+        def record_request(response):
+            started = request.environ.pop("metrics.started", None)
+            if started is None:
+                return response
+            # The rule, not the path, so card ids don't multiply the series
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            labels = (
+                request.method,
+                route,
+                str(response.status_code),
+                started,
+                request.content_length or 0,
+            )
+            if response.content_length is not None:
+                self._finish(labels, response.content_length)
+            else:
+                # Streamed: finished once the server has written (or abandoned) the last chunk
+                response.response = _CountedStream(
+                    response.iter_encoded(),
+                    lambda sent: self._finish(labels, sent),
+                )
+            return response
+
+        return app
+
+    def _finish(self, labels, response_bytes):
+        method, route, status, started, request_bytes = labels
+        self.in_flight.dec()
+        self.record(
+            method,
+            route,
+            status,
+            time.perf_counter() - started,
+            request_bytes,
+            response_bytes,
+        )
+
+
+class _CountedStream:
+    """Wraps a streamed body to count its bytes and report once it is closed"""
+
+    def __init__(self, chunks, on_close):
+        self.chunks = chunks
+        self.on_close = on_close
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        # WSGI servers call close() even when the client went away before the end
+        on_close, self.on_close = self.on_close, None
+        if hasattr(self.chunks, "close"):
+            self.chunks.close()
+        if on_close is not None:
+            on_close(self.sent)
@@ -0,0 +1,417 @@
+"""MongoDB storage engine for the card repository"""
+
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, UpdateOne
+
+from bulk_import import card_documents, import_cards_in_chunks, now_ms
+from data_version import DataVersion
+from database import masked_uri
+from pagination import count_cards, keyset_condition
+from repository import CardRepository
+from review_events import ReviewEvents, unchanged_review
+from scheduler import (
+    DUE_FIELD,
+    REVIEW_FIELD,
+    backfill_due_dates,
+    due_query,
+    schedule,
+)
+from search import (
+    SEARCH_FIELD,
+    backfill_search_tokens,
+    build_search_query,
+    card_search_tokens,
+)
+from study_sessions import StudySessions
+from sync import UPDATED_FIELD, ChangeLog, backfill_updated_at
+from tag_stats import TagStats, migrate_tags, tag_condition
+
+COLLECTION_NAME = "cards"
+META_COLLECTION_NAME = "meta"
+TAG_STATS_COLLECTION_NAME = "tag_stats"
+STUDY_SESSIONS_COLLECTION_NAME = "study_sessions"
+STUDY_ORDERS_COLLECTION_NAME = "study_session_orders"
+REVIEW_EVENTS_COLLECTION_NAME = "review_events"
+TOMBSTONES_COLLECTION_NAME = "card_tombstones"
+
+# Fields returned to clients; internal fields such as search tokens stay in the database
+CARD_PROJECTION = {"english": 1, "romanian": 1, "tags": 1, "created_at": 1}
+
+# Fields returned with the due queue: the card plus its scheduling state
+DUE_CARD_PROJECTION = dict(CARD_PROJECTION, **{DUE_FIELD: 1, REVIEW_FIELD: 1})
+
+# Attempts of a conditional read-modify-write before giving up on a contended card
+MAX_WRITE_ATTEMPTS = 10
+
+# The fields search tokens are derived from
+TEXT_FIELDS = ("english", "romanian", "tags")
+
+
+def filter_query(card_filter):
+    """Mongo query for a CardFilter: ids, tags (ANY or ALL) and text search combined"""
+    if card_filter is None:
+        return {}
+    conditions = []
+    if card_filter.ids is not None:
+        conditions.append({"_id": {"$in": card_filter.ids}})
+
+    # Tag filtering via the multikey index
+    if card_filter.tags:
+        conditions.append(tag_condition(card_filter.tags, card_filter.tag_mode))
+
+    # Diacritic-insensitive prefix search over english, romanian, and tags tokens
+    search_query = build_search_query(card_filter.search) if card_filter.search else None
+    if search_query:
+        conditions.append(search_query)
+
+    if not conditions:
+        return {}
+    return {"$and": conditions} if len(conditions) > 1 else conditions[0]
+
+
+class MongoCardRepository(CardRepository):
+    """
+    Cards in a MongoDB database, with tag counts, tombstones, study sessions
+    and review events in side collections maintained by the write methods.
+
+    Collections are resolved lazily per process (see database.Database), so a
+    repository created at import time is safe to use in forked workers.
+    """
+
+    engine = "mongo"
+
+    def __init__(
+        self,
+        database,
+        read_preference=None,
+        data_version_ttl=0.0,
+        sync_retention=timedelta(days=30),
+        sync_overlap=timedelta(seconds=5),
+        session_ttl=timedelta(hours=24),
+    ):
+        self.database = database
+        self.cards = database.collection(COLLECTION_NAME)
+        # The full-deck and tag reads, routed by MONGO_READ_ONLY_PREFERENCE
+        self.cards_read = database.collection(COLLECTION_NAME, read_preference)
+        self.data_version = DataVersion(
+            database[META_COLLECTION_NAME], cache_ttl=data_version_ttl
+        )
+        self.tag_stats = TagStats(
+            database[TAG_STATS_COLLECTION_NAME],
+            read_collection=database.collection(
+                TAG_STATS_COLLECTION_NAME, read_preference
+            ),
+        )
+        self.change_log = ChangeLog(
+            database[TOMBSTONES_COLLECTION_NAME],
+            retention=sync_retention,
+            overlap=sync_overlap,
+        )
+        self.study_sessions = StudySessions(
+            database[STUDY_SESSIONS_COLLECTION_NAME],
+            database[STUDY_ORDERS_COLLECTION_NAME],
+            ttl=session_ttl,
+        )
+        self.review_events = ReviewEvents(database[REVIEW_EVENTS_COLLECTION_NAME])
+
+    def ensure_indexes(self):
+        """Create the indexes the queries rely on (idempotent)"""
+        # Keyset pagination walks (sort field, _id) ranges; the romanian index also
+        # serves the duplicate lookups of bulk imports
+        for field in ("created_at", "english", "romanian"):
+            self.cards.create_index([(field, 1), ("_id", 1)])
+        # Multikey indexes: folded tokens back the prefix search, tags the tag filters
+        self.cards.create_index(SEARCH_FIELD)
+        self.cards.create_index("tags")
+        # Due queue: the oldest due cards come first off a range scan, overall or per tag
+        self.cards.create_index([(DUE_FIELD, 1), ("_id", 1)])
+        self.cards.create_index([("tags", 1), (DUE_FIELD, 1)])
+        self.change_log.ensure_indexes(self.cards)
+        self.study_sessions.ensure_indexes()
+        self.review_events.ensure_indexes()
+
+    def prepare(self):
+        """Create indexes and bring older documents up to the current schema"""
+        notes = []
+        self.ensure_indexes()
+        backfilled = backfill_search_tokens(self.cards)
+        if backfilled:
+            notes.append(f"Added search tokens to {backfilled} existing cards")
+        stamped = backfill_updated_at(self.cards)
+        if stamped:
+            notes.append(f"Added updated_at to {stamped} existing cards")
+        scheduled = backfill_due_dates(self.cards)
+        if scheduled:
+            notes.append(f"Scheduled {scheduled} existing cards for review")
+
+        # One-off migration of tags stored before they were canonicalized
+        meta = self.database[META_COLLECTION_NAME]
+        schema = meta.find_one({"_id": "schema"}) or {}
+        rebuild_tags = self.tag_stats.collection.estimated_document_count() == 0
+        if not schema.get("tags_normalized"):
+            migrated = migrate_tags(self.cards)
+            if migrated:
+                notes.append(f"Normalized tags on {migrated} existing cards")
+                rebuild_tags = True
+            meta.update_one(
+                {"_id": "schema"}, {"$set": {"tags_normalized": True}}, upsert=True
+            )
+
+        # Materialized tag counts are (re)built from the cards when missing or after a migration
+        if rebuild_tags:
+            self.tag_stats.rebuild(self.cards)
+        return notes
+
+    def ping(self):
+        self.database.client.admin.command("ping")
+
+    def describe(self):
+        return {
+            "storage_engine": self.engine,
+            "mongo_uri": masked_uri(self.database.uri),
+            "database_name": self.database.name,
+        }
+
+    def close(self):
+        self.data_version.stop()
+        self.database.close()
+
+    def count(self, card_filter, mode):
+        # Estimated from collection metadata when unfiltered
+        return count_cards(self.cards, filter_query(card_filter), mode)
+
+    def find(self, card_filter=None, sort=None, skip=0, limit=None, after=None):
+        query = filter_query(card_filter)
+        if after is not None:
+            # With the (sort field, _id) index this is one range scan however deep the page
+            keyset = keyset_condition(sort[0], sort[1], after[0], after[1])
+            query = {"$and": [query, keyset]} if query else keyset
+        cursor = self.cards.find(query, CARD_PROJECTION)
+        if sort is not None:
+            cursor = cursor.sort([(sort[0], sort[1]), ("_id", sort[1])])
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    def stream(self, batch_size, read_only=False):
+        # _id breaks created_at ties so cards imported together keep their order;
+        # both keys are covered by the (created_at, _id) index so nothing is sorted in memory
+        collection = self.cards_read if read_only else self.cards
+        return (
+            collection.find({}, CARD_PROJECTION)
+            .sort([("created_at", -1), ("_id", -1)])
+            .batch_size(batch_size)
+        )
+
+    def random_card(self):
+        cards = list(self.cards.aggregate([{"$sample": {"size": 1}}]))
+        return cards[0] if cards else None
+
+    def due(self, now, tags, limit):
+        # Walks the (next_due, _id) index from its start, so the cost is the page size
+        query = due_query(now, tag_condition(tags, "any") if tags else None)
+        return list(
+            self.cards.find(query, DUE_CARD_PROJECTION)
+            .sort([(DUE_FIELD, 1), ("_id", 1)])
+            .limit(limit)
+        )
+
+    def record_added(self, cards):
+        """Count the tags of cards inserted outside this repository (async imports)"""
+        self.tag_stats.record_added(cards)
+
+    def insert(self, card_data):
+        card = card_documents([card_data])[0]
+        card["_id"] = self.cards.insert_one(card).inserted_id
+        self.tag_stats.record_added([card])
+        return card
+
+    def import_in_chunks(self, parsed_cards, skip_duplicates=True, chunk_size=None):
+        for result in import_cards_in_chunks(
+            self.cards, parsed_cards, skip_duplicates, chunk_size
+        ):
+            self.tag_stats.record_added(result.added_cards)
+            yield result
+
+    def update(self, card_id, fields):
+        fields = dict(fields, **{UPDATED_FIELD: datetime.utcnow()})
+        if all(field in fields for field in TEXT_FIELDS):
+            # Full edits (what the UI sends) carry everything the tokens derive from
+            fields[SEARCH_FIELD] = card_search_tokens(
+                fields["english"], fields["romanian"], fields["tags"]
+            )
+            previous_card = self.cards.find_one_and_update(
+                {"_id": card_id},
+                {"$set": fields},
+                return_document=ReturnDocument.BEFORE,
+            )
+        else:
+            previous_card = self._update_partial(card_id, fields)
+        if previous_card is None:
+            return None
+        # The previous version is needed to adjust tag counts; the new one is
+        # the same document with the fields applied
+        updated_card = dict(previous_card, **fields)
+
+        self.tag_stats.record_changes(
+            [(previous_card.get("tags"), updated_card.get("tags"))]
+        )
+        return previous_card, updated_card
+
+    def _update_partial(self, card_id, fields):
+        """
+        Apply a partial edit with search tokens derived from the merged text.
+        The write only lands if the text it was derived from is still current,
+        so a concurrent edit can't leave tokens that don't match the card.
+        """
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            current = self.cards.find_one({"_id": card_id}, dict.fromkeys(TEXT_FIELDS, 1))
+            if current is None:
+                return None
+            merged = dict(current, **fields)
+            guarded = dict(fields)
+            guarded[SEARCH_FIELD] = card_search_tokens(
+                merged["english"], merged["romanian"], merged.get("tags", [])
+            )
+            previous_card = self.cards.find_one_and_update(
+                dict({"_id": card_id}, **{field: current.get(field) for field in TEXT_FIELDS}),
+                {"$set": guarded},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if previous_card is not None:
+                fields[SEARCH_FIELD] = guarded[SEARCH_FIELD]
+                return previous_card
+        raise RuntimeError(f"Card {card_id} kept changing; edit not applied")
+
+    def update_many(self, changes):
+        # Each write only lands on a card still holding the text and tags it was
+        # planned from: a concurrent edit isn't overwritten, and a card deleted
+        # since the read isn't counted, tallied or re-indexed as updated
+        now = now_ms()
+        writes, planned = [], []
+        for card, fields in changes:
+            merged = dict(card, **fields)
+            fields = dict(fields)
+            fields[SEARCH_FIELD] = card_search_tokens(
+                merged["english"], merged["romanian"], merged.get("tags", [])
+            )
+            fields[UPDATED_FIELD] = now
+            writes.append(
+                UpdateOne(
+                    dict({"_id": card["_id"]}, **{field: card.get(field) for field in TEXT_FIELDS}),
+                    {"$set": fields},
+                )
+            )
+            planned.append((card, dict(card, **fields)))
+        if not writes:
+            return []
+        result = self.cards.bulk_write(writes, ordered=False)
+        applied = planned
+        if result.matched_count < len(writes):
+            applied = self._stamped(planned, now)
+        self.tag_stats.record_changes(
+            (card.get("tags"), updated.get("tags")) for card, updated in applied
+        )
+        return applied
+
+    def _stamped(self, planned, stamp):
+        """
+        The planned (previous, updated) pairs whose write landed. The bulk
+        result only counts matches, so they are the cards now holding the
+        planned text and tags with the update time the batch stamped (at the
+        stored millisecond precision).
+        """
+        current = {
+            card["_id"]: card
+            for card in self.cards.find(
+                {"_id": {"$in": [card["_id"] for card, _ in planned]}, UPDATED_FIELD: stamp},
+                dict.fromkeys(TEXT_FIELDS, 1),
+            )
+        }
+        return [
+            (card, updated)
+            for card, updated in planned
+            if card["_id"] in current
+            and all(
+                current[card["_id"]].get(field) == updated.get(field) for field in TEXT_FIELDS
+            )
+        ]
+
+    def delete(self, card_id):
+        card = self.cards.find_one_and_delete({"_id": card_id}, projection={"tags": 1})
+        if card is not None:
+            self._record_deleted([card])
+        return card
+
+    def delete_many(self, cards):
+        if not cards:
+            return []
+        ids = [card["_id"] for card in cards]
+        # One bulk delete; the cards it removed are those present just before it
+        # and gone after, so cards deleted since the caller's read aren't recorded
+        present = list(self.cards.find({"_id": {"$in": ids}}, {"tags": 1}))
+        if not present:
+            return []
+        present_ids = {"_id": {"$in": [card["_id"] for card in present]}}
+        self.cards.delete_many(present_ids)
+        remaining = {card["_id"] for card in self.cards.find(present_ids, {"_id": 1})}
+        deleted = [card for card in present if card["_id"] not in remaining]
+        if deleted:
+            self._record_deleted(deleted)
+        return deleted
+
+    def _record_deleted(self, cards):
+        self.tag_stats.record_removed(cards)
+        self.change_log.record_deleted(cards)
+
+    def review(self, card_id, quality, now):
+        # Written only if no other answer landed since the read (two tabs, or a
+        # batch of review events), otherwise scheduled again from the new state
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            card = self.cards.find_one({"_id": card_id}, {REVIEW_FIELD: 1, DUE_FIELD: 1})
+            if not card:
+                return None
+            review, next_due = schedule(card.get(REVIEW_FIELD), quality, now)
+            updated = self.cards.find_one_and_update(
+                unchanged_review(card_id, card.get(REVIEW_FIELD)),
+                {"$set": {REVIEW_FIELD: review, DUE_FIELD: next_due}},
+                projection=DUE_CARD_PROJECTION,
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated is not None:
+                return updated
+        raise RuntimeError(f"Card {card_id} kept changing; review not applied")
+
+    def ingest_reviews(self, events):
+        return self.review_events.ingest(self.cards, events)
+
+    def start_token(self):
+        return self.change_log.start_token()
+
+    def changes(self, token, limit):
+        return self.change_log.changes(self.cards, token, limit, CARD_PROJECTION)
+
+    def tag_counts(self):
+        # Counts are maintained incrementally by every write, so this reads one small collection
+        return self.tag_stats.counts()
+
+    def rebuild_tag_counts(self):
+        return self.tag_stats.rebuild(self.cards)
+
+    def check_tag_counts(self):
+        return self.tag_stats.check(self.cards)
+
+    def create_session(self, card_filter):
+        return self.study_sessions.create(self.cards, filter_query(card_filter))
+
+    def get_session(self, session_id):
+        return self.study_sessions.get(session_id)
+
+    def next_in_session(self, session_id, count):
+        return self.study_sessions.next(session_id, self.cards, count, CARD_PROJECTION)
+
+    def delete_session(self, session_id):
+        return self.study_sessions.delete(session_id)
@@ -0,0 +1,97 @@
+"""Keyset (cursor) pagination helpers for card listings"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import json
+
+from bson import ObjectId
+
+COUNT_MODES = ("auto", "exact", "estimated", "none")
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination token cannot be decoded or doesn't match the request"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"d": value.isoformat()}
+    return {"s": value}
+
+
+def _decode_value(encoded):
+    if "d" in encoded:
+        return datetime.fromisoformat(encoded["d"])
+    return encoded["s"]
+
+
+def encode_cursor(card, sort_by, sort_direction, direction):
+    """Build an opaque token pointing just past `card` in the given direction"""
+    payload = {
+        "f": sort_by,
+        "o": sort_direction,
+        "v": _encode_value(card.get(sort_by)),
+        "i": str(card["_id"]),
+        "d": direction,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, sort_by, sort_direction):
+    """Decode a token and check it was issued for the same sort"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+        cursor = {
+            "value": _decode_value(payload["v"]),
+            "id": ObjectId(payload["i"]),
+            "direction": payload["d"],
+        }
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+
+    if payload.get("f") != sort_by or payload.get("o") != sort_direction:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    if cursor["direction"] not in ("next", "prev"):
+        raise InvalidCursor("Invalid pagination cursor")
+    return cursor
+
+
+def keyset_condition(sort_by, sort_direction, value, last_id):
+    """
+    Match documents strictly after (value, _id) in the (sort_by, _id) order.
+
+    With a compound index on (sort_by, _id) this is a single index range scan,
+    so every page costs the same no matter how deep it is.
+    """
+    op = "$lt" if sort_direction == -1 else "$gt"
+    return {
+        "$or": [
+            {sort_by: {op: value}},
+            {sort_by: value, "_id": {op: last_id}},
+        ]
+    }
+
+
+def count_cards(collection, query, mode):
+    """Total matching cards for the requested count mode, or None when skipped"""
+    if mode == "none":
+        return None
+    if mode == "estimated" or (mode == "auto" and not query):
+        # Collection metadata only; accurate when no filter is applied
+        if not query:
+            return collection.estimated_document_count()
+        return None
+    return collection.count_documents(query)
+
+
+async def count_cards_async(collection, query, mode):
+    """`count_cards` for an asyncio (Motor) collection"""
+    if mode == "none":
+        return None
+    if mode == "estimated" or (mode == "auto" and not query):
+        if not query:
+            return await collection.estimated_document_count()
+        return None
+    return await collection.count_documents(query)
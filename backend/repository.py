@@ -0,0 +1,171 @@
+"""Storage-engine-neutral access to cards and the state derived from them"""
+
+from search import tokenize
+from tag_stats import normalize_tags
+
+STORAGE_ENGINES = ("mongo", "sqlite")
+
+# Sort fields offered by card listings; every engine indexes them together with the id
+SORT_FIELDS = ("created_at", "english", "romanian")
+
+
+class CardFilter:
+    """
+    Which cards a read or batch operation applies to: a text search, tags
+    matched ANY (default) or ALL, and/or explicit card ids (ObjectIds).
+
+    Engines translate it into their own query language, so routes never build
+    database queries themselves.
+    """
+
+    def __init__(self, search="", tags=None, tag_mode="any", ids=None):
+        self.search = (search or "").strip()
+        self.tags = normalize_tags(tags)
+        self.tag_mode = "all" if (tag_mode or "any").lower() == "all" else "any"
+        self.ids = list(ids) if ids is not None else None
+
+    @property
+    def search_tokens(self):
+        """Unique folded tokens of the search, each of which must prefix a card token"""
+        return list(dict.fromkeys(tokenize(self.search))) if self.search else []
+
+    def is_empty(self):
+        """True when the filter selects every card"""
+        return self.ids is None and not self.tags and not self.search_tokens
+
+
+class CardRepository:
+    """
+    Cards plus everything stored alongside them: tag counts, deletion
+    tombstones, study sessions, review events and the data version.
+
+    Card documents are dicts with `_id` (an ObjectId), `english`, `romanian`,
+    `tags` and `created_at`; scheduling reads add `next_due` and `review`.
+    Write methods keep the engine's own derived state (tag counts, search
+    index, tombstones) current; process-local state such as the suggest index
+    and the data version bump is left to the caller.
+    """
+
+    engine = None
+    data_version = None
+
+    # Lifecycle
+    def prepare(self):
+        """Create the schema and indexes and migrate older data; returns notes to log"""
+        raise NotImplementedError
+
+    def ping(self):
+        """Raise if the storage can't be reached"""
+        raise NotImplementedError
+
+    def describe(self):
+        """Connection details for the health check, without credentials"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release this process's connections; they are reopened on next use"""
+        raise NotImplementedError
+
+    # Reads
+    def count(self, card_filter, mode):
+        """Matching cards for a pagination COUNT_MODES mode, or None when skipped"""
+        raise NotImplementedError
+
+    def find(self, card_filter=None, sort=None, skip=0, limit=None, after=None):
+        """
+        Cards matching `card_filter`. `sort` is a (field, direction) pair, ties
+        broken by `_id` in the same direction; `after` is a (value, _id) keyset
+        position to continue strictly after in that order.
+        """
+        raise NotImplementedError
+
+    def stream(self, batch_size, read_only=False):
+        """
+        Iterate over every card, newest first, fetching `batch_size` at a time.
+        The yielded documents belong to the caller, which may modify them.
+        """
+        raise NotImplementedError
+
+    def random_card(self):
+        raise NotImplementedError
+
+    def due(self, now, tags, limit):
+        """Cards due at `now` (any of `tags`, if given), oldest due first, with schedules"""
+        raise NotImplementedError
+
+    # Writes
+    def insert(self, card_data):
+        """Store one parsed card ({english, romanian, tags}) and return its document"""
+        raise NotImplementedError
+
+    def import_in_chunks(self, parsed_cards, skip_duplicates=True, chunk_size=None):
+        """Import parsed cards, yielding a bulk_import.ChunkResult per committed chunk"""
+        raise NotImplementedError
+
+    def update(self, card_id, fields):
+        """Apply field changes to one card; returns (previous, updated) or None"""
+        raise NotImplementedError
+
+    def update_many(self, changes):
+        """
+        Apply (card, fields) changes in one write, each only if the card's text
+        and tags are still those of the given document; returns the (previous,
+        updated) document pairs of the cards actually changed
+        """
+        raise NotImplementedError
+
+    def delete(self, card_id):
+        """Delete one card; returns its document or None"""
+        raise NotImplementedError
+
+    def delete_many(self, cards):
+        """
+        Delete the given card documents; returns the documents this call
+        actually deleted (cards already gone are skipped)
+        """
+        raise NotImplementedError
+
+    # Reviews
+    def review(self, card_id, quality, now):
+        """Schedule a card after one answer; returns it with its schedule, or None"""
+        raise NotImplementedError
+
+    def ingest_reviews(self, events):
+        """Record and apply a batch of review events (see review_events.ReviewEvents)"""
+        raise NotImplementedError
+
+    # Delta sync
+    def start_token(self):
+        raise NotImplementedError
+
+    def changes(self, token, limit):
+        """Cards upserted and ids deleted since a sync token (see sync.ChangeLog)"""
+        raise NotImplementedError
+
+    # Tags
+    def tag_counts(self):
+        """All tags with their card counts, sorted alphabetically"""
+        raise NotImplementedError
+
+    def rebuild_tag_counts(self):
+        """Recompute the stored tag counts from the cards; returns the number of tags"""
+        raise NotImplementedError
+
+    def check_tag_counts(self):
+        """Compare the stored tag counts with the cards and report any drift"""
+        raise NotImplementedError
+
+    # Study sessions
+    def create_session(self, card_filter):
+        """Start a shuffled pass over the matching cards; returns the session"""
+        raise NotImplementedError
+
+    def get_session(self, session_id):
+        raise NotImplementedError
+
+    def next_in_session(self, session_id, count):
+        """Claim the next `count` cards of a session: (session, cards)"""
+        raise NotImplementedError
+
+    def delete_session(self, session_id):
+        raise NotImplementedError
@@ -0,0 +1,257 @@
+"""Batched, idempotent ingestion of study review events"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from scheduler import DUE_FIELD, REVIEW_FIELD, InvalidGrade, parse_grade, schedule
+
+MAX_BATCH_SIZE = 1000
+MAX_KEY_LENGTH = 128
+# Rounds of re-reading and re-applying cards whose review changed under a batch
+MAX_APPLY_ATTEMPTS = 10
+# Key of the last event applied to a card, kept in its review state
+LAST_EVENT_FIELD = "event"
+
+_DUPLICATE_KEY = 11000
+
+
+class InvalidEvent(ValueError):
+    """Raised for a review event that is missing fields or has malformed ones"""
+
+
+def parse_timestamp(value, now):
+    """Event time from an ISO 8601 string or epoch milliseconds, as naive UTC"""
+    if value is None:
+        return now
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        moment = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    elif isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise InvalidEvent("reviewed_at must be ISO 8601 or epoch milliseconds")
+    else:
+        raise InvalidEvent("reviewed_at must be ISO 8601 or epoch milliseconds")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    # Clients with fast clocks can't schedule reviews from the future
+    return min(moment, now)
+
+
+def parse_event(event, now):
+    """Validate one client event into a review_events document"""
+    if not isinstance(event, dict):
+        raise InvalidEvent("event must be an object")
+    key = event.get("key")
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        raise InvalidEvent(
+            f"key must be a non-empty string of at most {MAX_KEY_LENGTH} characters"
+        )
+    card_id = event.get("card_id")
+    if not isinstance(card_id, str) or not ObjectId.is_valid(card_id):
+        raise InvalidEvent("card_id must be a card ID")
+    try:
+        quality = parse_grade(event.get("outcome", event.get("grade")))
+    except InvalidGrade as e:
+        raise InvalidEvent(str(e))
+    response_ms = event.get("response_ms")
+    if response_ms is not None and (
+        not isinstance(response_ms, (int, float)) or response_ms < 0
+    ):
+        raise InvalidEvent("response_ms must be a non-negative number")
+
+    return {
+        "_id": key,
+        "card_id": ObjectId(card_id),
+        "quality": quality,
+        "response_ms": response_ms,
+        "reviewed_at": parse_timestamp(event.get("reviewed_at"), now),
+        "received_at": now,
+    }
+
+
+def parse_events(events, now):
+    """
+    Validate a batch into (documents, rejected), where `rejected` lists the
+    index and error of each invalid event. Repeated keys are dropped.
+    """
+    documents, rejected, seen = [], [], set()
+    for index, event in enumerate(events):
+        try:
+            document = parse_event(event, now)
+        except InvalidEvent as e:
+            rejected.append({"index": index, "error": str(e)})
+            continue
+        # The same key twice in one batch is a duplicate as well
+        if document["_id"] in seen:
+            continue
+        seen.add(document["_id"])
+        documents.append(document)
+    return documents, rejected
+
+
+def replay(review, documents):
+    """
+    Apply one card's new events to its review state in time order; returns
+    (review, next due time), the latter None when no event was applied.
+    """
+    next_due = None
+    last_reviewed = (review or {}).get("reviewed_at")
+    for document in sorted(documents, key=lambda d: d["reviewed_at"]):
+        # Events delivered after a newer review are kept in the log only
+        if last_reviewed and document["reviewed_at"] < last_reviewed:
+            continue
+        review, next_due = schedule(review, document["quality"], document["reviewed_at"])
+        last_reviewed = document["reviewed_at"]
+    return review, next_due
+
+
+def unchanged_review(card_id, review):
+    """
+    Query matching a card only while its review state is still the one read
+    (identified by its `reviewed_at`), for conditional read-modify-writes
+    """
+    return {"_id": card_id, f"{REVIEW_FIELD}.reviewed_at": (review or {}).get("reviewed_at")}
+
+
+def _newest(documents):
+    """Key of a card's newest event, the marker its update is stamped with"""
+    return max(documents, key=lambda d: d["reviewed_at"])["_id"]
+
+
+def ingest_summary(events, rejected, claimed, cards_updated):
+    return {
+        "accepted": len(claimed),
+        "duplicates": len(events) - len(rejected) - len(claimed),
+        "rejected": rejected,
+        "cards_updated": cards_updated,
+    }
+
+
+class ReviewEvents:
+    """
+    Append-only log of review answers keyed by client-generated idempotency keys.
+
+    A batch is first claimed by inserting its events with the key as `_id`;
+    keys that already exist are duplicates of an earlier delivery and are
+    skipped. The remaining events are replayed through the scheduler in time
+    order and every affected card is updated in a single `bulk_write`.
+
+    Each update only applies if the card's review is still the one the replay
+    started from, so a live review answered meanwhile is never overwritten;
+    cards that changed are re-read and replayed again.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("card_id", 1), ("reviewed_at", 1)])
+
+    def _claim(self, documents):
+        """Insert new events and return those that weren't recorded before"""
+        if not documents:
+            return []
+        try:
+            self.collection.insert_many(documents, ordered=False)
+            return documents
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != _DUPLICATE_KEY for error in errors):
+                raise
+            duplicates = {error["index"] for error in errors}
+            return [doc for i, doc in enumerate(documents) if i not in duplicates]
+
+    def ingest(self, cards_collection, events, now=None):
+        """
+        Record and apply a batch of events; returns a summary dict with the
+        number accepted, duplicates, rejected events and cards rescheduled.
+        """
+        documents, rejected = parse_events(events, now or datetime.utcnow())
+        claimed = self._claim(documents)
+        try:
+            updated = self._apply(cards_collection, claimed)
+        except Exception:
+            # Release the claims that didn't land so the client's retry applies
+            # them instead of dropping them; the rest would be applied twice
+            keys = self._unapplied(cards_collection, claimed)
+            if keys:
+                self.collection.delete_many({"_id": {"$in": keys}})
+            raise
+
+        return ingest_summary(events, rejected, claimed, updated)
+
+    @staticmethod
+    def _by_card(documents):
+        by_card = defaultdict(list)
+        for document in documents:
+            by_card[document["card_id"]].append(document)
+        return by_card
+
+    def _unapplied(self, cards_collection, documents):
+        """Keys of events whose card doesn't carry their batch's marker"""
+        by_card = self._by_card(documents)
+        landed = {
+            card["_id"]
+            for card in cards_collection.find(
+                {"_id": {"$in": list(by_card)}}, {f"{REVIEW_FIELD}.{LAST_EVENT_FIELD}": 1}
+            )
+            if (card.get(REVIEW_FIELD) or {}).get(LAST_EVENT_FIELD)
+            == _newest(by_card[card["_id"]])
+        }
+        return [
+            document["_id"]
+            for card_id, card_documents in by_card.items()
+            if card_id not in landed
+            for document in card_documents
+        ]
+
+    def _apply(self, cards_collection, documents):
+        by_card = self._by_card(documents)
+
+        updated = 0
+        pending = list(by_card)
+        for _ in range(MAX_APPLY_ATTEMPTS):
+            if not pending:
+                return updated
+            cards = cards_collection.find(
+                {"_id": {"$in": pending}}, {REVIEW_FIELD: 1, DUE_FIELD: 1}
+            )
+            updates, markers = [], {}
+            for card in cards:
+                previous = card.get(REVIEW_FIELD)
+                review, next_due = replay(previous, by_card[card["_id"]])
+                if next_due is None:
+                    continue
+                # The newest event was applied (older ones may have been skipped)
+                marker = _newest(by_card[card["_id"]])
+                review[LAST_EVENT_FIELD] = marker
+                markers[card["_id"]] = marker
+                updates.append(
+                    UpdateOne(
+                        unchanged_review(card["_id"], previous),
+                        {"$set": {REVIEW_FIELD: review, DUE_FIELD: next_due}},
+                    )
+                )
+            if not updates:
+                return updated
+
+            result = cards_collection.bulk_write(updates, ordered=False)
+            updated += result.matched_count
+            if result.matched_count == len(updates):
+                return updated
+            # Some cards changed since they were read: retry those our write missed
+            landed = cards_collection.find(
+                {"_id": {"$in": list(markers)}}, {f"{REVIEW_FIELD}.{LAST_EVENT_FIELD}": 1}
+            )
+            pending = [
+                card["_id"]
+                for card in landed
+                if (card.get(REVIEW_FIELD) or {}).get(LAST_EVENT_FIELD)
+                != markers[card["_id"]]
+            ]
+        raise RuntimeError("Cards kept changing; review events not applied")
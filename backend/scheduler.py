@@ -0,0 +1,127 @@
+"""SM-2 spaced-repetition scheduling with an indexed due queue"""
+
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+# Field holding when a card is next due; indexed so due cards come off a range scan
+DUE_FIELD = "next_due"
+REVIEW_FIELD = "review"
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Failed cards come back in the same sitting instead of a day later
+RELEARN_DELAY = timedelta(minutes=10)
+
+# Answer buttons (and plain right/wrong outcomes) mapped onto SM-2 quality grades (0-5)
+GRADES = {
+    "again": 1,
+    "hard": 3,
+    "good": 4,
+    "easy": 5,
+    "incorrect": 1,
+    "correct": 4,
+}
+
+_GRADE_ERROR = "grade must be one of again, hard, good, easy, correct, incorrect or 0-5"
+
+
+class InvalidGrade(ValueError):
+    """Raised for answers that aren't a known grade name or a 0-5 quality"""
+
+
+def parse_grade(value):
+    """SM-2 quality (0-5) for a grade name such as "good" or a number"""
+    if isinstance(value, str) and value.lower() in GRADES:
+        return GRADES[value.lower()]
+    try:
+        quality = int(value)
+    except (TypeError, ValueError):
+        raise InvalidGrade(_GRADE_ERROR)
+    if not 0 <= quality <= 5:
+        raise InvalidGrade(_GRADE_ERROR)
+    return quality
+
+
+def new_review():
+    return {
+        "ease": DEFAULT_EASE,
+        "interval": 0,
+        "repetitions": 0,
+        "lapses": 0,
+        "reviewed_at": None,
+    }
+
+
+def schedule(review, quality, now):
+    """
+    Apply one SM-2 answer to a card's review state.
+
+    Returns (new review state, next due time). Intervals are in days; a
+    failed answer (quality < 3) resets the repetition streak and brings the
+    card back after RELEARN_DELAY.
+    """
+    review = dict(new_review(), **(review or {}))
+    ease = review["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    review["ease"] = round(max(MIN_EASE, ease), 3)
+    review["reviewed_at"] = now
+
+    if quality < 3:
+        review["repetitions"] = 0
+        review["interval"] = 0
+        review["lapses"] += 1
+        return review, now + RELEARN_DELAY
+
+    review["repetitions"] += 1
+    if review["repetitions"] == 1:
+        review["interval"] = 1
+    elif review["repetitions"] == 2:
+        review["interval"] = 6
+    else:
+        review["interval"] = round(review["interval"] * review["ease"])
+    return review, now + timedelta(days=review["interval"])
+
+
+def due_query(now, extra=None):
+    """Condition for cards due at `now`, optionally combined with another filter"""
+    condition = {DUE_FIELD: {"$lte": now}}
+    return {"$and": [extra, condition]} if extra else condition
+
+
+def backfill_due_dates(collection, batch_size=1000):
+    """Make cards created before scheduling existed due from their creation time"""
+    updated = 0
+    batch = []
+    cursor = collection.find(
+        {DUE_FIELD: {"$exists": False}}, {"created_at": 1}
+    ).batch_size(batch_size)
+
+    for card in cursor:
+        due = card.get("created_at") or datetime.utcnow()
+        batch.append(UpdateOne({"_id": card["_id"]}, {"$set": {DUE_FIELD: due}}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def schedule_to_dict(card):
+    """Public view of a card's scheduling state"""
+    review = dict(new_review(), **(card.get(REVIEW_FIELD) or {}))
+    due = card.get(DUE_FIELD)
+    return {
+        "next_due": due.isoformat() if isinstance(due, datetime) else due,
+        "ease": review["ease"],
+        "interval": review["interval"],
+        "repetitions": review["repetitions"],
+        "lapses": review["lapses"],
+        "reviewed_at": (
+            review["reviewed_at"].isoformat()
+            if isinstance(review["reviewed_at"], datetime)
+            else review["reviewed_at"]
+        ),
+    }
@@ -0,0 +1,80 @@
+"""Diacritic-insensitive, index-backed card search"""
+
+import re
+import unicodedata
+
+from pymongo import UpdateOne
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Field holding the folded tokens of english, romanian and tags (multikey-indexed)
+SEARCH_FIELD = "search_tokens"
+
+
+def fold_text(text):
+    """
+    Lowercase text and strip diacritics, so "Mulțumesc" and "multumesc" compare equal.
+
+    Both the comma-below (ș, ț) and the legacy cedilla (ş, ţ) forms decompose to
+    a base letter plus a combining mark, as do ă, â and î.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Folded word tokens of a piece of text"""
+    return TOKEN_PATTERN.findall(fold_text(text))
+
+
+def card_search_tokens(english, romanian, tags=()):
+    """Sorted unique folded tokens for a card's searchable fields"""
+    tokens = set(tokenize(english))
+    tokens.update(tokenize(romanian))
+    for tag in tags:
+        tokens.update(tokenize(tag))
+    return sorted(tokens)
+
+
+def build_search_query(search):
+    """
+    Mongo condition matching cards where every search token prefixes a card token.
+
+    Each token becomes an anchored, escaped regex on the multikey-indexed token
+    array, which Mongo answers with an index range scan instead of a collection
+    scan. Returns None when the search contains no word characters.
+    """
+    tokens = tokenize(search)
+    if not tokens:
+        return None
+    conditions = [
+        {SEARCH_FIELD: {"$regex": "^" + re.escape(token)}}
+        for token in dict.fromkeys(tokens)
+    ]
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def backfill_search_tokens(collection, batch_size=1000):
+    """Add search tokens to cards created before they existed; returns the count updated"""
+    updated = 0
+    batch = []
+    cursor = collection.find(
+        {SEARCH_FIELD: {"$exists": False}},
+        {"english": 1, "romanian": 1, "tags": 1},
+    ).batch_size(batch_size)
+
+    for card in cursor:
+        tokens = card_search_tokens(
+            card.get("english", ""), card.get("romanian", ""), card.get("tags", [])
+        )
+        batch.append(UpdateOne({"_id": card["_id"]}, {"$set": {SEARCH_FIELD: tokens}}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
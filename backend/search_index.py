@@ -0,0 +1,259 @@
+"""In-process trigram index for instant search-as-you-type"""
+
+from collections import Counter, defaultdict
+from datetime import datetime
+import heapq
+import math
+import threading
+
+from search import tokenize
+
+# Share of query n-grams a card must contain to be returned as a fuzzy match
+FUZZY_MIN_OVERLAP = 0.6
+
+_EMPTY = frozenset()
+
+
+def document_grams(tokens):
+    """N-grams indexed for a card: every trigram of each padded token plus its leading bigram"""
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.add(padded[:2])
+        for i in range(len(padded) - 2):
+            grams.add(padded[i : i + 3])
+    return grams
+
+
+def query_grams(tokens):
+    """
+    N-grams for a query. Tokens are only padded at the front because the last
+    one is usually still being typed, so "multu" must match "multumesc".
+    """
+    grams = set()
+    for token in tokens:
+        padded = f" {token}"
+        if len(padded) < 3:
+            grams.add(padded)
+        for i in range(len(padded) - 2):
+            grams.add(padded[i : i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Inverted n-gram index over the folded english, romanian and tags of every card.
+
+    Cards are kept as compact tuples so search results can be returned without a
+    database round trip. The index is per process: it is built once at startup,
+    updated directly by the write paths of this process, and brought up to date
+    with the writes of other processes by `catch_up`, which replays the sync
+    change feed since the data version the index last reflected.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # One thread at a time replays the change feed; others use the database
+        self._sync_lock = threading.Lock()
+        self._synced_version = None  # data version the index reflects
+        self._sync_token = None  # change feed position to replay from
+        self._postings = defaultdict(set)
+        self._doc_ids = {}  # card id -> internal int id
+        self._docs = {}  # internal int id -> (card tuple, folded tokens)
+        self._next_doc_id = 0
+        self._building = False
+        self._removed_while_building = set()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, card):
+        """Index a card document, replacing any previous version of it"""
+        card_id = str(card["_id"])
+        tags = card.get("tags", [])
+        tokens = tokenize(f"{card['romanian']} {card['english']} {' '.join(tags)}")
+        created_at = card.get("created_at")
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        entry = (
+            (card_id, card["english"], card["romanian"], list(tags), created_at),
+            tuple(dict.fromkeys(tokens)),
+        )
+
+        with self._lock:
+            self._remove_locked(card_id)
+            doc_id = self._next_doc_id
+            self._next_doc_id += 1
+            self._doc_ids[card_id] = doc_id
+            self._docs[doc_id] = entry
+            for gram in document_grams(entry[1]):
+                self._postings[gram].add(doc_id)
+
+    def add_many(self, cards):
+        for card in cards:
+            self.add(card)
+
+    def remove(self, card_id):
+        """Drop a card from the index"""
+        with self._lock:
+            self._remove_locked(str(card_id))
+            if self._building:
+                self._removed_while_building.add(str(card_id))
+
+    def _remove_locked(self, card_id):
+        doc_id = self._doc_ids.pop(card_id, None)
+        if doc_id is None:
+            return
+        _, tokens = self._docs.pop(doc_id)
+        for gram in document_grams(tokens):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def build(self, repository, batch_size=5000):
+        """Load every card from the card repository; writes made meanwhile are kept"""
+        # Taken before the scan: anything written after them is replayed by catch_up
+        version = repository.data_version.current()
+        token = repository.start_token()
+        with self._lock:
+            self.ready = False
+            self._building = True
+            self._removed_while_building.clear()
+            self._postings.clear()
+            self._doc_ids.clear()
+            self._docs.clear()
+
+        try:
+            for card in repository.stream(batch_size):
+                with self._lock:
+                    # Don't resurrect cards deleted after the cursor started
+                    if str(card["_id"]) in self._removed_while_building:
+                        continue
+                    if str(card["_id"]) not in self._doc_ids:
+                        self.add(card)
+        finally:
+            with self._lock:
+                self._building = False
+                self._removed_while_building.clear()
+        self._synced_version = version
+        self._sync_token = token
+        self.ready = True
+
+    def reflects(self, version):
+        """Whether the index is ready and already includes every write up to `version`"""
+        return (
+            self.ready
+            and self._synced_version is not None
+            and version <= self._synced_version
+        )
+
+    def catch_up(self, repository, version, page_size=1000):
+        """
+        Apply the changes made by any process up to data `version`, read through
+        `repository.changes`. Returns True when the index reflects `version`, and
+        False while it can't answer for it yet (building, or another thread is
+        catching up); callers then search the database instead.
+        """
+        if not self.ready:
+            return False
+        if self.reflects(version):
+            return True
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            token = self._sync_token
+            while True:
+                changes = repository.changes(token, page_size)
+                if changes["reset"]:
+                    # Idle past the tombstone retention: deletions may be lost
+                    self.ready = False
+                    self.build_in_background(repository)
+                    return False
+                # Upserts first: a card deleted while the page was read stays deleted
+                self.add_many(changes["upserted"])
+                for card_id in changes["deleted"]:
+                    self.remove(card_id)
+                token = changes["next_token"]
+                if not changes["has_more"]:
+                    break
+            self._sync_token = token
+            # `version` was read before the feed, so nothing it covers was missed
+            self._synced_version = version
+            return True
+        finally:
+            self._sync_lock.release()
+
+    def build_in_background(self, repository):
+        thread = threading.Thread(
+            target=self.build, args=(repository,), name="card-index-build", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def search(self, query, limit=10):
+        """Return up to `limit` ranked card dicts matching the query"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        grams = query_grams(tokens)
+
+        with self._lock:
+            postings = sorted(
+                (self._postings.get(gram, _EMPTY) for gram in grams), key=len
+            )
+            # Exact n-gram match: intersect starting from the rarest gram
+            candidates = {}
+            if postings[0]:
+                matches = set(postings[0])
+                for posting in postings[1:]:
+                    matches &= posting
+                    if not matches:
+                        break
+                candidates = dict.fromkeys(matches, 1.0)
+
+            # Not enough exact hits: admit cards sharing most of the query grams
+            if len(candidates) < limit and len(grams) > 2:
+                needed = math.ceil(len(grams) * FUZZY_MIN_OVERLAP)
+                overlap = Counter()
+                for posting in postings:
+                    overlap.update(posting)
+                for doc_id, count in overlap.items():
+                    if count >= needed and doc_id not in candidates:
+                        candidates[doc_id] = count / len(grams)
+
+            docs = self._docs
+            ranked = heapq.nlargest(
+                limit,
+                candidates.items(),
+                key=lambda item: self._score(docs[item[0]], tokens, item[1]),
+            )
+            results = [docs[doc_id][0] for doc_id, _ in ranked]
+
+        return [
+            {
+                "id": card_id,
+                "english": english,
+                "romanian": romanian,
+                "tags": tags,
+                "created_at": created_at,
+            }
+            for card_id, english, romanian, tags, created_at in results
+        ]
+
+    @staticmethod
+    def _score(entry, query_tokens, overlap):
+        """Rank by n-gram overlap, then whole-word and prefix matches, then brevity"""
+        card, card_tokens = entry
+        score = overlap
+        if all(token in card_tokens for token in query_tokens):
+            score += 2
+        elif all(
+            any(card_token.startswith(token) for card_token in card_tokens)
+            for token in query_tokens
+        ):
+            score += 1
+        # Shorter cards first among equals (e.g. "casă" before "casă de bani")
+        return (score, -len(card[2]))
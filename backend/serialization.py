@@ -0,0 +1,164 @@
+"""
+Response encoding: JSON through orjson when it is installed (stdlib json
+otherwise), and MessagePack for clients that ask for it in Accept.
+
+Card documents from the repositories are encoded as they come: ObjectIds and
+datetimes are converted by the encoder itself instead of building a new dict
+per card first.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import uuid
+
+from bson import ObjectId
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are only offered when installed
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+NDJSON_MIMETYPE = "application/x-ndjson"
+MSGPACK_MIMETYPE = "application/msgpack"
+# Older clients still send the unregistered x- type
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, "application/x-msgpack")
+
+# Streamed card formats: (opening, separator between chunks, closing)
+STREAM_FRAMING = {
+    "json": (b"[", b",", b"]"),
+    "ndjson": (b"", b"\n", b"\n"),
+    "msgpack": (b"", b"", b""),
+}
+STREAM_MIMETYPES = {
+    "json": JSON_MIMETYPE,
+    "ndjson": NDJSON_MIMETYPE,
+    "msgpack": MSGPACK_MIMETYPE,
+}
+
+
+def _default(value):
+    """Values neither encoder handles natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(value):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        value, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(value):
+    """MessagePack bytes; datetimes are sent as ISO 8601 strings, as in JSON"""
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def _best_match(accept_header, offers):
+    if not accept_header:
+        return JSON_MIMETYPE
+    if msgpack is not None:
+        offers += MSGPACK_MIMETYPES
+    # Ties (including */*) go to JSON, the first offer
+    return parse_accept_header(accept_header, MIMEAccept).best_match(offers)
+
+
+def prefers_msgpack(accept_header):
+    """Whether an Accept header ranks MessagePack above JSON"""
+    return _best_match(accept_header, (JSON_MIMETYPE,)) in MSGPACK_MIMETYPES
+
+
+def stream_format(accept_header, format_arg):
+    """json, ndjson or msgpack for a streamed card list, from ?format= or Accept"""
+    if format_arg == "ndjson" or (format_arg == "msgpack" and msgpack is not None):
+        return format_arg
+    best = _best_match(accept_header, (JSON_MIMETYPE, NDJSON_MIMETYPE))
+    if best == NDJSON_MIMETYPE:
+        return "ndjson"
+    if best in MSGPACK_MIMETYPES:
+        return "msgpack"
+    return "json"
+
+
+def lean_cards(cards):
+    """
+    Put repository card documents in the API's card shape, in place.
+
+    Only the id is renamed (and stringified); `created_at` is left as a
+    datetime for the encoder. The documents must come from a card projection,
+    since every field present is sent.
+    """
+    for card in cards:
+        card["id"] = str(card.pop("_id"))
+        if "tags" not in card:
+            # Older cards were stored without tags
+            card["tags"] = []
+    return cards
+
+
+def encode_card_chunk(cards, fmt):
+    """
+    A batch of lean cards as one chunk of a stream: comma-separated JSON
+    objects (the array brackets are added by the framing), NDJSON lines or
+    back-to-back MessagePack maps
+    """
+    if fmt == "json":
+        # One encoder call per batch; the slice drops the batch's own brackets
+        return dumps(cards)[1:-1]
+    if fmt == "ndjson":
+        return b"\n".join([dumps(card) for card in cards])
+    return b"".join([packb(card) for card in cards])
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson, so every `jsonify` response is
+    fast, and answering in MessagePack when the request's Accept prefers it.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Explicit stdlib options (indent, sort_keys, ...) keep stdlib behaviour
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if has_request_context() and prefers_msgpack(request.headers.get("Accept")):
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(
+                dumps(obj) + b"\n", mimetype=self.mimetype
+            )
+        if msgpack is not None:
+            response.vary.add("Accept")
+        return response
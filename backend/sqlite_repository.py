@@ -0,0 +1,904 @@
+"""Embedded SQLite storage engine: FTS5 search, WAL journaling, no external service"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import sqlite3
+import threading
+import weakref
+
+from bson import ObjectId
+
+from bulk_import import (
+    ChunkResult,
+    card_documents,
+    iter_chunks,
+    resolve_chunk_size,
+    unique_by_romanian,
+)
+from data_version import DataVersion
+from repository import SORT_FIELDS, CardFilter, CardRepository
+from review_events import ingest_summary, parse_events, replay
+from scheduler import DUE_FIELD, REVIEW_FIELD, schedule
+from search import SEARCH_FIELD, card_search_tokens
+from study_sessions import (
+    ORDER_CHUNK_SIZE,
+    SessionNotFound,
+    pack_ids,
+    unpack_range,
+)
+from sync import UPDATED_FIELD, ChangeLog
+from tag_stats import drift_report
+
+# Derived tables (search index, tag postings and counts, the card count and
+# tombstones) are maintained by triggers, so every write path keeps them exact.
+# Timestamps are fixed-width ISO 8601 text with milliseconds, like BSON dates,
+# so they sort in time order.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    english TEXT NOT NULL,
+    romanian TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    search_tokens TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    next_due TEXT NOT NULL,
+    review TEXT
+);
+CREATE INDEX IF NOT EXISTS cards_created_at ON cards (created_at, id);
+CREATE INDEX IF NOT EXISTS cards_english ON cards (english, id);
+CREATE INDEX IF NOT EXISTS cards_romanian ON cards (romanian, id);
+CREATE INDEX IF NOT EXISTS cards_updated_at ON cards (updated_at, id);
+CREATE INDEX IF NOT EXISTS cards_next_due ON cards (next_due, id);
+
+-- Folded tokens are indexed as-is; prefix indexes answer short prefixes directly
+CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+    search_tokens,
+    content='cards',
+    content_rowid='seq',
+    tokenize="unicode61 remove_diacritics 0 tokenchars '_'",
+    prefix='1 2 3'
+);
+
+CREATE TABLE IF NOT EXISTS card_tags (
+    tag TEXT NOT NULL,
+    card_seq INTEGER NOT NULL,
+    PRIMARY KEY (tag, card_seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS card_tags_card ON card_tags (card_seq);
+
+CREATE TABLE IF NOT EXISTS tag_stats (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO counters (name, value) VALUES ('cards', 0), ('data_version', 0);
+
+CREATE TABLE IF NOT EXISTS card_tombstones (
+    id TEXT PRIMARY KEY,
+    deleted_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS card_tombstones_deleted_at ON card_tombstones (deleted_at, id);
+
+CREATE TABLE IF NOT EXISTS study_sessions (
+    id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    last_used_at TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS study_sessions_expires_at ON study_sessions (expires_at);
+CREATE TABLE IF NOT EXISTS study_session_orders (
+    session_id TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    ids BLOB NOT NULL,
+    PRIMARY KEY (session_id, chunk)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS review_events (
+    key TEXT PRIMARY KEY,
+    card_id TEXT NOT NULL,
+    quality INTEGER NOT NULL,
+    response_ms REAL,
+    reviewed_at TEXT NOT NULL,
+    received_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS review_events_card ON review_events (card_id, reviewed_at);
+
+CREATE TRIGGER IF NOT EXISTS cards_inserted AFTER INSERT ON cards BEGIN
+    INSERT INTO cards_fts (rowid, search_tokens) VALUES (new.seq, new.search_tokens);
+    INSERT OR IGNORE INTO card_tags (tag, card_seq)
+        SELECT value, new.seq FROM json_each(new.tags);
+    UPDATE counters SET value = value + 1 WHERE name = 'cards';
+END;
+
+CREATE TRIGGER IF NOT EXISTS cards_deleted AFTER DELETE ON cards BEGIN
+    INSERT INTO cards_fts (cards_fts, rowid, search_tokens)
+        VALUES ('delete', old.seq, old.search_tokens);
+    DELETE FROM card_tags WHERE card_seq = old.seq;
+    UPDATE counters SET value = value - 1 WHERE name = 'cards';
+    INSERT OR REPLACE INTO card_tombstones (id, deleted_at)
+        VALUES (old.id, strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS cards_search_updated AFTER UPDATE OF search_tokens ON cards
+WHEN old.search_tokens IS NOT new.search_tokens BEGIN
+    INSERT INTO cards_fts (cards_fts, rowid, search_tokens)
+        VALUES ('delete', old.seq, old.search_tokens);
+    INSERT INTO cards_fts (rowid, search_tokens) VALUES (new.seq, new.search_tokens);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cards_tags_updated AFTER UPDATE OF tags ON cards
+WHEN old.tags IS NOT new.tags BEGIN
+    DELETE FROM card_tags WHERE card_seq = old.seq;
+    INSERT OR IGNORE INTO card_tags (tag, card_seq)
+        SELECT value, new.seq FROM json_each(new.tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS card_tags_inserted AFTER INSERT ON card_tags BEGIN
+    INSERT INTO tag_stats (tag, count) VALUES (new.tag, 1)
+        ON CONFLICT (tag) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS card_tags_deleted AFTER DELETE ON card_tags BEGIN
+    UPDATE tag_stats SET count = count - 1 WHERE tag = old.tag;
+    DELETE FROM tag_stats WHERE tag = old.tag AND count <= 0;
+END;
+"""
+
+_CARD_COLUMNS = "id, english, romanian, tags, created_at"
+_SCHEDULED_COLUMNS = _CARD_COLUMNS + ", next_due, review"
+
+_TAG_COUNTS_FROM_CARDS = (
+    "SELECT value AS tag, count(DISTINCT seq) AS count"
+    " FROM cards, json_each(cards.tags) GROUP BY value"
+)
+
+
+def to_text(moment):
+    """Fixed-width ISO 8601 text with milliseconds, which sorts in time order"""
+    return f"{moment:%Y-%m-%dT%H:%M:%S}.{moment.microsecond // 1000:03d}"
+
+
+def from_text(text):
+    return datetime.fromisoformat(text) if text else None
+
+
+def _truncate(moment):
+    """A time at the millisecond precision it is stored with"""
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def _json_list(values):
+    return json.dumps(list(values), ensure_ascii=False)
+
+
+def _dump_review(review):
+    if review is None:
+        return None
+    reviewed_at = review.get("reviewed_at")
+    return json.dumps(
+        dict(review, reviewed_at=to_text(reviewed_at) if reviewed_at else None)
+    )
+
+
+def _load_review(text):
+    if text is None:
+        return None
+    review = json.loads(text)
+    review["reviewed_at"] = from_text(review.get("reviewed_at"))
+    return review
+
+
+def _card(row):
+    return {
+        "_id": ObjectId(row["id"]),
+        "english": row["english"],
+        "romanian": row["romanian"],
+        "tags": json.loads(row["tags"]),
+        "created_at": from_text(row["created_at"]),
+    }
+
+
+def _scheduled_card(row):
+    card = _card(row)
+    card[DUE_FIELD] = from_text(row["next_due"])
+    card[REVIEW_FIELD] = _load_review(row["review"])
+    return card
+
+
+def _where(card_filter):
+    """SQL conditions and their parameters for a CardFilter"""
+    clauses, params = [], []
+    if card_filter is None:
+        return clauses, params
+    if card_filter.ids is not None:
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(_json_list(str(card_id) for card_id in card_filter.ids))
+
+    tags = card_filter.tags
+    if tags and card_filter.tag_mode == "all" and len(tags) > 1:
+        clauses.append(
+            "seq IN (SELECT card_seq FROM card_tags"
+            " WHERE tag IN (SELECT value FROM json_each(?))"
+            " GROUP BY card_seq HAVING count(*) = ?)"
+        )
+        params.extend([_json_list(tags), len(tags)])
+    elif tags:
+        clauses.append(
+            "seq IN (SELECT card_seq FROM card_tags"
+            " WHERE tag IN (SELECT value FROM json_each(?)))"
+        )
+        params.append(_json_list(tags))
+
+    # Every search token must prefix a card token; tokens are \w+, so quoting is safe
+    tokens = card_filter.search_tokens
+    if tokens:
+        clauses.append("seq IN (SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?)")
+        params.append(" ".join(f'"{token}"*' for token in tokens))
+    return clauses, params
+
+
+def _where_sql(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def _sql_value(value):
+    return to_text(value) if isinstance(value, datetime) else value
+
+
+class _CounterVersion(DataVersion):
+    """The data version kept in the `counters` table"""
+
+    def __init__(self, repository, cache_ttl):
+        super().__init__(None, key="data_version", cache_ttl=cache_ttl)
+        self._repository = repository
+
+    def _increment(self):
+        with self._repository._transaction() as connection:
+            connection.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = ?", (self.key,)
+            )
+            return self._repository._counter(connection, self.key)
+
+    def _read(self):
+        return self._repository._counter(self._repository._connection(), self.key)
+
+    def watch(self):
+        # No change streams; reading the counter row is an in-process page cache lookup
+        return False
+
+
+class _TombstoneLog(ChangeLog):
+    """Delta sync over the `updated_at` index and the trigger-written tombstones"""
+
+    def __init__(self, repository, retention, overlap):
+        super().__init__(None, retention=retention, overlap=overlap)
+        self._repository = repository
+
+    @staticmethod
+    def _after(field, position):
+        moment, last_id = position
+        if last_id is None:
+            return f"{field} >= ?", [to_text(moment)]
+        return f"({field}, id) > (?, ?)", [to_text(moment), str(last_id)]
+
+    def _upserted(self, cards_collection, position, limit, projection=None):
+        clause, params = self._after("updated_at", position)
+        rows = self._repository._connection().execute(
+            f"SELECT {_CARD_COLUMNS}, updated_at FROM cards WHERE {clause}"
+            " ORDER BY updated_at, id LIMIT ?",
+            params + [limit],
+        )
+        cards = []
+        for row in rows:
+            card = _card(row)
+            card[UPDATED_FIELD] = from_text(row["updated_at"])
+            cards.append(card)
+        return cards
+
+    def _deleted(self, position, limit):
+        clause, params = self._after("deleted_at", position)
+        rows = self._repository._connection().execute(
+            f"SELECT id, deleted_at FROM card_tombstones WHERE {clause}"
+            " ORDER BY deleted_at, id LIMIT ?",
+            params + [limit],
+        )
+        return [
+            {"_id": ObjectId(row["id"]), "deleted_at": from_text(row["deleted_at"])}
+            for row in rows
+        ]
+
+
+class _ThreadConnection:
+    """A thread's connection, held in its thread-local so it dies with the thread"""
+
+    __slots__ = ("connection", "pid", "__weakref__")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.pid = os.getpid()
+
+
+class SQLiteCardRepository(CardRepository):
+    """
+    Cards in a single SQLite file, for single-node deployments and for
+    benchmarks and CI without a database server.
+
+    The database runs in WAL mode, so readers never block the writer and
+    several worker processes can share the file. Each thread of each process
+    opens its own connection; writes run in short `BEGIN IMMEDIATE`
+    transactions and wait up to `busy_timeout` seconds for another writer.
+    Text search is an FTS5 prefix query over the same folded tokens the
+    MongoDB engine indexes, so both engines return the same matches.
+    """
+
+    engine = "sqlite"
+
+    def __init__(
+        self,
+        path,
+        busy_timeout=5.0,
+        cache_size_mb=64,
+        data_version_ttl=0.0,
+        sync_retention=timedelta(days=30),
+        sync_overlap=timedelta(seconds=5),
+        session_ttl=timedelta(hours=24),
+    ):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cache_size_mb = cache_size_mb
+        self.session_ttl = session_ttl
+        self.data_version = _CounterVersion(self, data_version_ttl)
+        self.change_log = _TombstoneLog(self, sync_retention, sync_overlap)
+        self._random = random.SystemRandom()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._schema_pid = None
+        if hasattr(os, "register_at_fork"):
+            # A lock held by another thread at fork time would never be released in the child
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,  # transactions are explicit
+            check_same_thread=False,  # used by one thread, but closed by close()
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode = WAL")
+        # Durable across application crashes; WAL makes NORMAL safe from corruption
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA cache_size = {-int(self.cache_size_mb * 1024)}")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        with self._lock:
+            if self._schema_pid != os.getpid():
+                connection.executescript(SCHEMA)
+                self._schema_pid = os.getpid()
+            self._connections.append((os.getpid(), connection))
+        return connection
+
+    def _release(self, owner, connection):
+        """Close a connection whose thread has exited"""
+        if owner != os.getpid():
+            # Inherited across a fork; closing it here would checkpoint the parent's WAL
+            return
+        with self._lock:
+            self._connections = [
+                entry for entry in self._connections if entry[1] is not connection
+            ]
+        connection.close()
+
+    def _connection(self):
+        """This thread's connection; a forked child opens new ones instead of sharing"""
+        local = self._local
+        holder = getattr(local, "holder", None)
+        if holder is None or holder.pid != os.getpid():
+            holder = local.holder = _ThreadConnection(self._connect())
+            # Thread-local values are dropped when their thread exits, so
+            # short-lived threads (one per request under the threaded dev
+            # server, executor workers) don't each keep a connection open
+            weakref.finalize(holder, self._release, holder.pid, holder.connection)
+        return holder.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        # Take the write lock up front so read-then-write sequences are atomic
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _counter(connection, name):
+        row = connection.execute(
+            "SELECT value FROM counters WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def prepare(self):
+        """Create the schema and drop expired tombstones and study sessions"""
+        now = datetime.utcnow()
+        with self._transaction() as connection:
+            self._purge_tombstones(connection, now)
+            self._purge_sessions(connection, now)
+        # Refresh the query planner's statistics where they are stale
+        self._connection().execute("PRAGMA optimize")
+        return []
+
+    def ping(self):
+        self._connection().execute("SELECT 1").fetchone()
+
+    def describe(self):
+        return {"storage_engine": self.engine, "database_path": os.path.abspath(self.path)}
+
+    def close(self):
+        with self._lock:
+            pid = os.getpid()
+            for owner, connection in self._connections:
+                if owner == pid:
+                    connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def count(self, card_filter, mode):
+        if mode == "none":
+            return None
+        if card_filter is None or card_filter.is_empty():
+            # Maintained by triggers, so exact and free
+            return self._counter(self._connection(), "cards")
+        if mode == "estimated":
+            return None
+        clauses, params = _where(card_filter)
+        return (
+            self._connection()
+            .execute("SELECT count(*) FROM cards" + _where_sql(clauses), params)
+            .fetchone()[0]
+        )
+
+    def find(self, card_filter=None, sort=None, skip=0, limit=None, after=None):
+        clauses, params = _where(card_filter)
+        order = ""
+        if sort is not None:
+            field, direction = sort
+            if field not in SORT_FIELDS:
+                raise ValueError(f"Cannot sort cards by {field}")
+            keyword = "DESC" if direction == -1 else "ASC"
+            if after is not None:
+                # A row-value comparison is one range scan of the (field, id) index
+                clauses.append(f"({field}, id) {'<' if direction == -1 else '>'} (?, ?)")
+                params.extend([_sql_value(after[0]), str(after[1])])
+            order = f" ORDER BY {field} {keyword}, id {keyword}"
+
+        sql = f"SELECT {_CARD_COLUMNS} FROM cards" + _where_sql(clauses) + order
+        if limit is not None or skip:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, skip])
+        return [_card(row) for row in self._connection().execute(sql, params)]
+
+    def stream(self, batch_size, read_only=False):
+        # Keyset batches instead of one long-lived cursor: no snapshot is held
+        # open while the response is written, and any thread may continue it
+        position = None
+        while True:
+            cards = self.find(sort=("created_at", -1), limit=batch_size, after=position)
+            if len(cards) == batch_size:
+                # Taken before yielding: callers may reshape the cards they receive
+                position = (cards[-1]["created_at"], cards[-1]["_id"])
+            for card in cards:
+                yield card
+            if len(cards) < batch_size:
+                return
+
+    def random_card(self):
+        connection = self._connection()
+        low, high = connection.execute("SELECT min(seq), max(seq) FROM cards").fetchone()
+        if low is None:
+            return None
+        # Two rowid lookups; cards just after gaps left by deletions are slightly favoured
+        row = connection.execute(
+            f"SELECT {_CARD_COLUMNS} FROM cards WHERE seq >= ? ORDER BY seq LIMIT 1",
+            (self._random.randint(low, high),),
+        ).fetchone()
+        return _card(row) if row else None
+
+    def due(self, now, tags, limit):
+        clauses, params = _where(CardFilter(tags=tags))
+        clauses.append("next_due <= ?")
+        params.extend([to_text(now), limit])
+        rows = self._connection().execute(
+            f"SELECT {_SCHEDULED_COLUMNS} FROM cards{_where_sql(clauses)}"
+            " ORDER BY next_due, id LIMIT ?",
+            params,
+        )
+        return [_scheduled_card(row) for row in rows]
+
+    def _documents(self, parsed_cards):
+        documents = card_documents(parsed_cards)
+        for document in documents:
+            document["_id"] = ObjectId()
+            for field in ("created_at", UPDATED_FIELD, DUE_FIELD):
+                document[field] = _truncate(document[field])
+        return documents
+
+    @staticmethod
+    def _insert(connection, documents):
+        connection.executemany(
+            "INSERT INTO cards (id, english, romanian, tags, search_tokens,"
+            " created_at, updated_at, next_due) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    str(document["_id"]),
+                    document["english"],
+                    document["romanian"],
+                    _json_list(document["tags"]),
+                    " ".join(document[SEARCH_FIELD]),
+                    to_text(document["created_at"]),
+                    to_text(document[UPDATED_FIELD]),
+                    to_text(document[DUE_FIELD]),
+                )
+                for document in documents
+            ],
+        )
+
+    def insert(self, card_data):
+        card = self._documents([card_data])[0]
+        with self._transaction() as connection:
+            self._insert(connection, [card])
+        return card
+
+    def import_in_chunks(self, parsed_cards, skip_duplicates=True, chunk_size=None):
+        """
+        Import parsed cards one transaction per chunk. The duplicate lookup
+        runs inside the chunk's transaction, so concurrent imports can't both
+        insert the same Romanian text.
+        """
+        for chunk in iter_chunks(parsed_cards, resolve_chunk_size(chunk_size)):
+            with self._transaction() as connection:
+                if skip_duplicates:
+                    unique = unique_by_romanian(chunk)
+                    existing = {
+                        row[0]
+                        for row in connection.execute(
+                            "SELECT romanian FROM cards"
+                            " WHERE romanian IN (SELECT value FROM json_each(?))",
+                            (_json_list(unique),),
+                        )
+                    }
+                    to_insert = [
+                        card for romanian, card in unique.items() if romanian not in existing
+                    ]
+                else:
+                    to_insert = chunk
+                documents = self._documents(to_insert)
+                self._insert(connection, documents)
+
+            yield ChunkResult(
+                processed=len(chunk),
+                added_cards=documents,
+                skipped_count=len(chunk) - len(to_insert),
+            )
+
+    @staticmethod
+    def _write_update(connection, card, fields, now):
+        """Write the merged card with fresh search tokens; returns the new version"""
+        updated = dict(card, **fields)
+        tokens = card_search_tokens(updated["english"], updated["romanian"], updated["tags"])
+        updated[SEARCH_FIELD] = tokens
+        updated[UPDATED_FIELD] = now
+        connection.execute(
+            "UPDATE cards SET english = ?, romanian = ?, tags = ?, search_tokens = ?,"
+            " updated_at = ? WHERE id = ?",
+            (
+                updated["english"],
+                updated["romanian"],
+                _json_list(updated["tags"]),
+                " ".join(tokens),
+                to_text(now),
+                str(card["_id"]),
+            ),
+        )
+        return updated
+
+    def update(self, card_id, fields):
+        now = _truncate(datetime.utcnow())
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT {_CARD_COLUMNS} FROM cards WHERE id = ?", (str(card_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            previous_card = _card(row)
+            return previous_card, self._write_update(connection, previous_card, fields, now)
+
+    def update_many(self, changes):
+        if not changes:
+            return []
+        now = _truncate(datetime.utcnow())
+        ids = _json_list(str(card["_id"]) for card, _ in changes)
+        applied = []
+        with self._transaction() as connection:
+            # Re-read under the write lock: cards deleted or edited since the
+            # caller's read are skipped rather than resurrected or overwritten
+            current = {
+                row["id"]: _card(row)
+                for row in connection.execute(
+                    f"SELECT {_CARD_COLUMNS} FROM cards"
+                    " WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids,),
+                )
+            }
+            for card, fields in changes:
+                previous_card = current.get(str(card["_id"]))
+                if previous_card is None or any(
+                    previous_card[field] != card.get(field)
+                    for field in ("english", "romanian", "tags")
+                ):
+                    continue
+                applied.append(
+                    (previous_card, self._write_update(connection, previous_card, fields, now))
+                )
+        return applied
+
+    def delete(self, card_id):
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT {_CARD_COLUMNS} FROM cards WHERE id = ?", (str(card_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("DELETE FROM cards WHERE id = ?", (str(card_id),))
+            self._purge_tombstones(connection, datetime.utcnow())
+        return _card(row)
+
+    def delete_many(self, cards):
+        if not cards:
+            return []
+        ids = _json_list(str(card["_id"]) for card in cards)
+        with self._transaction() as connection:
+            # The write lock is held, so the cards still present are the ones deleted
+            present = {
+                row["id"]
+                for row in connection.execute(
+                    "SELECT id FROM cards WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids,),
+                )
+            }
+            connection.execute(
+                "DELETE FROM cards WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+            )
+            self._purge_tombstones(connection, datetime.utcnow())
+        return [card for card in cards if str(card["_id"]) in present]
+
+    def _purge_tombstones(self, connection, now):
+        # Clients with older tokens are told to reset (see sync.ChangeLog)
+        connection.execute(
+            "DELETE FROM card_tombstones WHERE deleted_at < ?",
+            (to_text(now - self.change_log.retention),),
+        )
+
+    def review(self, card_id, quality, now):
+        now = _truncate(now)
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT {_SCHEDULED_COLUMNS} FROM cards WHERE id = ?", (str(card_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            card = _scheduled_card(row)
+            review, next_due = schedule(card[REVIEW_FIELD], quality, now)
+            connection.execute(
+                "UPDATE cards SET review = ?, next_due = ? WHERE id = ?",
+                (_dump_review(review), to_text(next_due), str(card_id)),
+            )
+        card[REVIEW_FIELD], card[DUE_FIELD] = review, next_due
+        return card
+
+    def ingest_reviews(self, events):
+        """
+        Record and apply a batch of review events in one transaction: keys
+        already in `review_events` are duplicates, the rest are replayed
+        through the scheduler like review_events.ReviewEvents does.
+        """
+        documents, rejected = parse_events(events, datetime.utcnow())
+        with self._transaction() as connection:
+            claimed = [
+                document
+                for document in documents
+                if connection.execute(
+                    "INSERT OR IGNORE INTO review_events (key, card_id, quality,"
+                    " response_ms, reviewed_at, received_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        document["_id"],
+                        str(document["card_id"]),
+                        document["quality"],
+                        document["response_ms"],
+                        to_text(document["reviewed_at"]),
+                        to_text(document["received_at"]),
+                    ),
+                ).rowcount
+            ]
+
+            by_card = defaultdict(list)
+            for document in claimed:
+                by_card[str(document["card_id"])].append(document)
+            rows = connection.execute(
+                "SELECT id, review FROM cards WHERE id IN (SELECT value FROM json_each(?))",
+                (_json_list(by_card),),
+            ).fetchall()
+            updates = []
+            for row in rows:
+                review, next_due = replay(_load_review(row["review"]), by_card[row["id"]])
+                if next_due is not None:
+                    updates.append((_dump_review(review), to_text(next_due), row["id"]))
+            connection.executemany(
+                "UPDATE cards SET review = ?, next_due = ? WHERE id = ?", updates
+            )
+
+        return ingest_summary(events, rejected, claimed, len(updates))
+
+    def start_token(self):
+        return self.change_log.start_token()
+
+    def changes(self, token, limit):
+        return self.change_log.changes(self, token, limit)
+
+    def tag_counts(self):
+        rows = self._connection().execute("SELECT tag, count FROM tag_stats ORDER BY tag")
+        return [{"tag": row["tag"], "count": row["count"]} for row in rows]
+
+    def rebuild_tag_counts(self):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM tag_stats")
+            connection.execute(
+                f"INSERT INTO tag_stats (tag, count) {_TAG_COUNTS_FROM_CARDS}"
+            )
+            return connection.execute("SELECT count(*) FROM tag_stats").fetchone()[0]
+
+    def check_tag_counts(self):
+        connection = self._connection()
+        expected = dict(connection.execute(_TAG_COUNTS_FROM_CARDS).fetchall())
+        stored = dict(connection.execute("SELECT tag, count FROM tag_stats").fetchall())
+        return drift_report(expected, stored)
+
+    def create_session(self, card_filter):
+        """Shuffle the ids of the matching cards into a new session (see StudySessions)"""
+        clauses, params = _where(card_filter)
+        ids = [
+            ObjectId(row[0])
+            for row in self._connection().execute(
+                "SELECT id FROM cards" + _where_sql(clauses), params
+            )
+        ]
+        self._random.shuffle(ids)
+
+        now = _truncate(datetime.utcnow())
+        session = {
+            "_id": ObjectId(),
+            "total": len(ids),
+            "position": 0,
+            "created_at": now,
+            "expires_at": now + self.session_ttl,
+        }
+        with self._transaction() as connection:
+            self._purge_sessions(connection, now)
+            connection.execute(
+                "INSERT INTO study_sessions (id, total, position, created_at, expires_at)"
+                " VALUES (?, ?, 0, ?, ?)",
+                (
+                    str(session["_id"]),
+                    session["total"],
+                    to_text(now),
+                    to_text(session["expires_at"]),
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO study_session_orders (session_id, chunk, ids) VALUES (?, ?, ?)",
+                [
+                    (str(session["_id"]), chunk, pack_ids(ids[start : start + ORDER_CHUNK_SIZE]))
+                    for chunk, start in enumerate(range(0, len(ids), ORDER_CHUNK_SIZE))
+                ],
+            )
+        return session
+
+    @staticmethod
+    def _purge_sessions(connection, now):
+        expired = (to_text(now),)
+        connection.execute(
+            "DELETE FROM study_session_orders WHERE session_id IN"
+            " (SELECT id FROM study_sessions WHERE expires_at <= ?)",
+            expired,
+        )
+        connection.execute("DELETE FROM study_sessions WHERE expires_at <= ?", expired)
+
+    @staticmethod
+    def _session(row):
+        return {
+            "_id": ObjectId(row["id"]),
+            "total": row["total"],
+            "position": row["position"],
+            "created_at": from_text(row["created_at"]),
+            "expires_at": from_text(row["expires_at"]),
+        }
+
+    def get_session(self, session_id):
+        row = (
+            self._connection()
+            .execute(
+                "SELECT * FROM study_sessions WHERE id = ? AND expires_at > ?",
+                (str(session_id), to_text(datetime.utcnow())),
+            )
+            .fetchone()
+        )
+        if row is None:
+            raise SessionNotFound("Study session not found or expired")
+        return self._session(row)
+
+    def next_in_session(self, session_id, count):
+        """
+        Claim the next `count` positions of a session and return (session after
+        the claim, cards in shuffled order); deleted cards are skipped.
+        """
+        now = _truncate(datetime.utcnow())
+        expires_at = now + self.session_ttl
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT * FROM study_sessions WHERE id = ? AND expires_at > ?",
+                (str(session_id), to_text(now)),
+            ).fetchone()
+            if row is None:
+                raise SessionNotFound("Study session not found or expired")
+            connection.execute(
+                "UPDATE study_sessions SET position = position + ?, expires_at = ?,"
+                " last_used_at = ? WHERE id = ?",
+                (count, to_text(expires_at), to_text(now), str(session_id)),
+            )
+            session = self._session(row)
+            start = min(session["position"], session["total"])
+            end = min(start + count, session["total"])
+            ids = []
+            if start < end:
+                first, last = start // ORDER_CHUNK_SIZE, (end - 1) // ORDER_CHUNK_SIZE
+                chunks = connection.execute(
+                    "SELECT ids FROM study_session_orders"
+                    " WHERE session_id = ? AND chunk BETWEEN ? AND ? ORDER BY chunk",
+                    (str(session_id), first, last),
+                )
+                ids = unpack_range((chunk[0] for chunk in chunks), first, start, end)
+
+        session.update(position=end, expires_at=expires_at)
+        if not ids:
+            return session, []
+        found = {card["_id"]: card for card in self.find(CardFilter(ids=ids))}
+        return session, [found[card_id] for card_id in ids if card_id in found]
+
+    def delete_session(self, session_id):
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM study_session_orders WHERE session_id = ?", (str(session_id),)
+            )
+            return (
+                connection.execute(
+                    "DELETE FROM study_sessions WHERE id = ?", (str(session_id),)
+                ).rowcount
+                > 0
+            )
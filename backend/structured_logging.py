@@ -0,0 +1,213 @@
+"""
+Leveled, structured logging that never blocks a request on I/O.
+
+Records are formatted (as JSON lines by default) in the calling thread and
+handed to a bounded queue; a background listener thread writes them out.
+When the queue is full, records are dropped and counted rather than making
+the request wait. Every record carries the current request's correlation id.
+"""
+
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from flask import request
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text" for reading in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records buffered for the writer thread before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-item debug logs (e.g. one per imported chunk) keep 1 record in this many
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Accepted from clients as-is; anything else is replaced so ids can't forge log lines
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+_RECORD_ATTRIBUTES = set(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id", "taskName"}
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def _extra_fields(record):
+    return {
+        key: value
+        for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+    }
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the correlation id of the request being served"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id and extras"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines, with extras appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        if getattr(record, "request_id", None):
+            line += f" request_id={record.request_id}"
+        for key, value in _extra_fields(record).items():
+            line += f" {key}={value}"
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues formatted records without ever waiting for room in the queue"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SampledLogger:
+    """
+    Passes through 1 in `every` calls, for logs that would otherwise be
+    written per item. Disabled levels cost a single check.
+    """
+
+    def __init__(self, logger, every=None):
+        self.logger = logger
+        self.every = max(1, every if every is not None else LOG_SAMPLE_EVERY)
+        self._calls = itertools.count()
+
+    def log(self, level, message, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        if next(self._calls) % self.every:
+            return
+        if self.every > 1:
+            kwargs["extra"] = dict(kwargs.get("extra") or {}, sampled_every=self.every)
+        self.logger.log(level, message, *args, **kwargs)
+
+    def debug(self, message, *args, **kwargs):
+        self.log(logging.DEBUG, message, *args, **kwargs)
+
+    def info(self, message, *args, **kwargs):
+        self.log(logging.INFO, message, *args, **kwargs)
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def _start_listener():
+    global _listener
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stderr)
+    # Records arrive fully formatted from DroppingQueueHandler.prepare
+    output.setFormatter(logging.Formatter("%(message)s"))
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The writer thread doesn't survive fork(); the child gets its own queue and thread
+    global _lock
+    _lock = threading.Lock()
+    if _handler is not None:
+        _start_listener()
+
+
+def _stop_listener():
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+
+
+def configure_logging(level=None, log_format=None):
+    """Route the root logger through the queue (idempotent)"""
+    global _handler
+    with _lock:
+        if _handler is not None:
+            return _handler
+        _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(RequestIdFilter())
+        _handler.setFormatter(
+            TextFormatter() if (log_format or LOG_FORMAT) == "text" else JsonFormatter()
+        )
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        root.setLevel(level or LOG_LEVEL)
+        _start_listener()
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        return _handler
+
+
+def install_request_ids(app):
+    """Give every request of a Flask app a correlation id, echoed in X-Request-ID"""
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        if not _VALID_REQUEST_ID.match(incoming):
+            incoming = uuid.uuid4().hex
+        # Left set after the request so streamed bodies still log under it;
+        # the next request served by this thread replaces it
+        _request_id.set(incoming)
+
+    @app.after_request
+    def send_request_id(response):
+        request_id = _request_id.get()
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+    return app
@@ -0,0 +1,174 @@
+"""Server-side shuffled study sessions delivered in batches"""
+
+from datetime import datetime, timedelta
+import random
+
+from bson import Binary, ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+# Card ids stored per order document; 4096 packed ObjectIds are 48 KiB
+ORDER_CHUNK_SIZE = 4096
+
+_ID_SIZE = 12
+
+
+def unpack_range(chunks, first_chunk, start, end):
+    """
+    Ids at positions start..end of a permutation, from its consecutive packed
+    order chunks beginning with chunk number `first_chunk`.
+    """
+    data = b"".join(bytes(chunk) for chunk in chunks)
+    offset = first_chunk * ORDER_CHUNK_SIZE
+    return unpack_ids(data[(start - offset) * _ID_SIZE : (end - offset) * _ID_SIZE])
+
+
+class SessionNotFound(LookupError):
+    """Raised when a session id is unknown or the session has expired"""
+
+
+def pack_ids(ids):
+    """Concatenate ObjectIds into 12 bytes per id"""
+    return b"".join(card_id.binary for card_id in ids)
+
+
+def unpack_ids(data):
+    return [
+        ObjectId(bytes(data[offset : offset + _ID_SIZE]))
+        for offset in range(0, len(data), _ID_SIZE)
+    ]
+
+
+class StudySessions:
+    """
+    Shuffled passes over a deck, stored so clients can fetch them piece by piece.
+
+    Creating a session reads only the matching card ids, shuffles them once with
+    Fisher–Yates (`random.shuffle`) and stores the permutation as packed 12-byte
+    ObjectIds split over order documents of ORDER_CHUNK_SIZE ids. Each `next`
+    call advances the session's position atomically and loads just the cards of
+    that batch, so concurrent tabs never receive the same slice twice.
+
+    Sessions expire after `ttl` of inactivity through TTL indexes on
+    `expires_at`. Order documents carry their own expiry, refreshed once half of
+    it has elapsed so that an active session never loses its permutation.
+    """
+
+    def __init__(self, collection, orders_collection, ttl=timedelta(hours=24)):
+        self.collection = collection
+        self.orders = orders_collection
+        self.ttl = ttl
+        self._random = random.SystemRandom()
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.orders.create_index("expires_at", expireAfterSeconds=0)
+        self.orders.create_index([("session_id", ASCENDING), ("chunk", ASCENDING)])
+
+    def create(self, cards_collection, query=None):
+        """Shuffle the ids of the matching cards into a new session document"""
+        ids = [card["_id"] for card in cards_collection.find(query or {}, {"_id": 1})]
+        self._random.shuffle(ids)
+
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        session = {
+            "_id": ObjectId(),
+            "total": len(ids),
+            "position": 0,
+            "created_at": now,
+            "expires_at": expires_at,
+            "orders_expire_at": expires_at,
+        }
+        orders = [
+            {
+                "session_id": session["_id"],
+                "chunk": chunk,
+                "ids": Binary(pack_ids(ids[start : start + ORDER_CHUNK_SIZE])),
+                "expires_at": expires_at,
+            }
+            for chunk, start in enumerate(range(0, len(ids), ORDER_CHUNK_SIZE))
+        ]
+        if orders:
+            self.orders.insert_many(orders, ordered=False)
+        self.collection.insert_one(session)
+        return session
+
+    def get(self, session_id):
+        session = self.collection.find_one(
+            {"_id": session_id, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        if session is None:
+            raise SessionNotFound("Study session not found or expired")
+        return session
+
+    def next(self, session_id, cards_collection, count, projection=None):
+        """
+        Claim the next `count` positions of a session and return
+        (session after the claim, cards in shuffled order).
+
+        Cards deleted since the session was created are skipped, so a batch may
+        hold fewer than `count` cards before the end of the deck.
+        """
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        previous = self.collection.find_one_and_update(
+            {"_id": session_id, "expires_at": {"$gt": now}},
+            {
+                "$inc": {"position": count},
+                "$set": {"expires_at": expires_at, "last_used_at": now},
+            },
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            raise SessionNotFound("Study session not found or expired")
+
+        start = min(previous["position"], previous["total"])
+        end = min(start + count, previous["total"])
+        session = dict(previous, position=end, expires_at=expires_at)
+        self._keep_orders_alive(previous, expires_at, now)
+
+        ids = self._ids_between(session_id, start, end)
+        if not ids:
+            return session, []
+        found = {
+            card["_id"]: card
+            for card in cards_collection.find({"_id": {"$in": ids}}, projection)
+        }
+        return session, [found[card_id] for card_id in ids if card_id in found]
+
+    def delete(self, session_id):
+        self.orders.delete_many({"session_id": session_id})
+        return self.collection.delete_one({"_id": session_id}).deleted_count > 0
+
+    def _ids_between(self, session_id, start, end):
+        if start >= end:
+            return []
+        first, last = start // ORDER_CHUNK_SIZE, (end - 1) // ORDER_CHUNK_SIZE
+        chunks = self.orders.find(
+            {"session_id": session_id, "chunk": {"$gte": first, "$lte": last}}
+        ).sort("chunk", ASCENDING)
+        return unpack_range((chunk["ids"] for chunk in chunks), first, start, end)
+
+    def _keep_orders_alive(self, session, expires_at, now):
+        # Refresh the order documents' expiry only when half of it has been used up
+        remaining = session.get("orders_expire_at", now) - now
+        if remaining > self.ttl / 2:
+            return
+        self.orders.update_many(
+            {"session_id": session["_id"]}, {"$set": {"expires_at": expires_at}}
+        )
+        self.collection.update_one(
+            {"_id": session["_id"]}, {"$set": {"orders_expire_at": expires_at}}
+        )
+
+
+def session_to_dict(session):
+    """Public view of a session document"""
+    return {
+        "session_id": str(session["_id"]),
+        "total": session["total"],
+        "position": min(session["position"], session["total"]),
+        "remaining": max(session["total"] - session["position"], 0),
+        "done": session["position"] >= session["total"],
+        "expires_at": session["expires_at"].isoformat(),
+    }
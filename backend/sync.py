@@ -0,0 +1,195 @@
+"""Delta sync: cards changed or deleted since a client's sync token"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+import json
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+UPDATED_FIELD = "updated_at"
+
+
+class InvalidSyncToken(ValueError):
+    """Raised when a sync token cannot be decoded"""
+
+
+def encode_token(cards_position, tombstones_position):
+    """
+    Opaque token holding a (time, last _id) position in both change streams.
+    The _id is None when the next read starts at the time itself.
+    """
+    payload = {
+        "c": [cards_position[0].isoformat(), _str_or_none(cards_position[1])],
+        "d": [tombstones_position[0].isoformat(), _str_or_none(tombstones_position[1])],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_token(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+        return tuple(
+            (
+                datetime.fromisoformat(payload[key][0]),
+                ObjectId(payload[key][1]) if payload[key][1] else None,
+            )
+            for key in ("c", "d")
+        )
+    except Exception:
+        raise InvalidSyncToken("Invalid sync token")
+
+
+def _str_or_none(value):
+    return str(value) if value is not None else None
+
+
+def _after(field, position):
+    moment, last_id = position
+    if last_id is None:
+        return {field: {"$gte": moment}}
+    return {
+        "$or": [
+            {field: {"$gt": moment}},
+            {field: moment, "_id": {"$gt": last_id}},
+        ]
+    }
+
+
+class ChangeLog:
+    """
+    Serves the cards upserted and deleted after a point in time.
+
+    Every write path stamps cards with `updated_at` and every delete leaves a
+    tombstone, both indexed with `_id`, so a sync reads two index ranges whose
+    size is the number of changes rather than the deck. Tombstones are removed
+    by a TTL index after `retention`; clients whose token is older than that
+    are told to reset, i.e. reload the full deck.
+
+    A finished sync hands out a token `overlap` before the time it started, so
+    writes still in flight when it ran are picked up next time; clients apply
+    changes idempotently, so the small overlap only repeats a few cards.
+    """
+
+    def __init__(
+        self,
+        tombstones_collection,
+        retention=timedelta(days=30),
+        overlap=timedelta(seconds=5),
+    ):
+        self.tombstones = tombstones_collection
+        self.retention = retention
+        self.overlap = overlap
+
+    def ensure_indexes(self, cards_collection):
+        cards_collection.create_index([(UPDATED_FIELD, 1), ("_id", 1)])
+        self.tombstones.create_index(
+            "deleted_at", expireAfterSeconds=int(self.retention.total_seconds())
+        )
+        self.tombstones.create_index([("deleted_at", 1), ("_id", 1)])
+
+    def record_deleted(self, cards):
+        """Leave tombstones for deleted card documents"""
+        if not cards:
+            return
+        now = datetime.utcnow()
+        self.tombstones.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": card["_id"]}, {"$set": {"deleted_at": now}}, upsert=True
+                )
+                for card in cards
+            ],
+            ordered=False,
+        )
+
+    def start_token(self, now=None):
+        """Token for a client about to load the full deck"""
+        since = (now or datetime.utcnow()) - self.overlap
+        return encode_token((since, None), (since, None))
+
+    def changes(self, cards_collection, token, limit, projection=None):
+        """
+        Changes after `token`: a dict with `upserted` card documents, `deleted`
+        ids, `next_token`, `has_more` and `reset` (token beyond retention).
+        """
+        now = datetime.utcnow()
+        cards_position, tombstones_position = decode_token(token)
+        if min(cards_position[0], tombstones_position[0]) < now - self.retention:
+            return {
+                "upserted": [],
+                "deleted": [],
+                "next_token": self.start_token(now),
+                "has_more": False,
+                "reset": True,
+            }
+
+        upserted = self._upserted(cards_collection, cards_position, limit + 1, projection)
+        deleted = self._deleted(tombstones_position, limit + 1)
+        has_more = len(upserted) > limit or len(deleted) > limit
+        upserted, deleted = upserted[:limit], deleted[:limit]
+
+        if has_more:
+            # Continue each stream from its last returned document
+            next_token = encode_token(
+                self._last_position(upserted, UPDATED_FIELD, cards_position),
+                self._last_position(deleted, "deleted_at", tombstones_position),
+            )
+        else:
+            next_token = self.start_token(now)
+
+        return {
+            "upserted": upserted,
+            "deleted": [str(doc["_id"]) for doc in deleted],
+            "next_token": next_token,
+            "has_more": has_more,
+            "reset": False,
+        }
+
+    # Reads of the two change streams; other storage engines override these
+    def _upserted(self, cards_collection, position, limit, projection=None):
+        """Cards stamped after `position`, in (updated_at, _id) order"""
+        if projection is not None:
+            # The stamp is needed to continue from the last returned card
+            projection = dict(projection, **{UPDATED_FIELD: 1})
+        return list(
+            cards_collection.find(_after(UPDATED_FIELD, position), projection)
+            .sort([(UPDATED_FIELD, 1), ("_id", 1)])
+            .limit(limit)
+        )
+
+    def _deleted(self, position, limit):
+        """Tombstones ({_id, deleted_at}) after `position`, in (deleted_at, _id) order"""
+        return list(
+            self.tombstones.find(_after("deleted_at", position))
+            .sort([("deleted_at", 1), ("_id", 1)])
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _last_position(documents, field, position):
+        if not documents:
+            return position
+        return documents[-1][field], documents[-1]["_id"]
+
+
+def backfill_updated_at(collection, batch_size=1000):
+    """Stamp cards written before updated_at existed with their creation time"""
+    updated = 0
+    batch = []
+    cursor = collection.find(
+        {UPDATED_FIELD: {"$exists": False}}, {"created_at": 1}
+    ).batch_size(batch_size)
+
+    for card in cursor:
+        stamp = card.get("created_at") or datetime.utcnow()
+        batch.append(UpdateOne({"_id": card["_id"]}, {"$set": {UPDATED_FIELD: stamp}}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
@@ -0,0 +1,159 @@
+"""Tag normalization and materialized per-tag card counts"""
+
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from sync import UPDATED_FIELD
+
+
+def normalize_tag(tag):
+    """Canonical form of a tag: trimmed, lowercased, inner whitespace collapsed"""
+    return " ".join(tag.split()).lower()
+
+
+def normalize_tags(tags):
+    """Canonical, de-duplicated tag list from a list or a comma-separated string"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    normalized = (normalize_tag(tag) for tag in tags if isinstance(tag, str))
+    # Remove duplicates while preserving order
+    return list(dict.fromkeys(tag for tag in normalized if tag))
+
+
+def tag_condition(tags, mode="any"):
+    """Exact tag filter matching ANY (default) or ALL of the given canonical tags"""
+    return {"tags": {"$all" if mode == "all" else "$in": tags}}
+
+
+def migrate_tags(cards_collection, batch_size=1000):
+    """Rewrite stored tags into canonical form; returns the number of cards changed"""
+    changed = 0
+    batch = []
+    cursor = cards_collection.find(
+        {"tags.0": {"$exists": True}}, {"tags": 1}
+    ).batch_size(batch_size)
+
+    for card in cursor:
+        tags = normalize_tags(card["tags"])
+        if tags == card["tags"]:
+            continue
+        batch.append(
+            UpdateOne(
+                {"_id": card["_id"]},
+                {"$set": {"tags": tags, UPDATED_FIELD: datetime.utcnow()}},
+            )
+        )
+        if len(batch) >= batch_size:
+            changed += cards_collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        changed += cards_collection.bulk_write(batch, ordered=False).modified_count
+    return changed
+
+
+def _count_tags(cards):
+    """Tag -> number of cards carrying it (each card counts once per tag)"""
+    counts = Counter()
+    for card in cards:
+        counts.update(set(card.get("tags") or []))
+    return counts
+
+
+class TagStats:
+    """
+    Per-tag card counts kept in a side collection ({_id: tag, count: n}).
+
+    Write paths apply small $inc deltas instead of re-aggregating the whole cards
+    collection, so listing tags is a read of one tiny collection. `rebuild` and
+    `check` recompute the counts from scratch for repairs and audits.
+    `counts` reads through `read_collection` when given, e.g. the same
+    collection routed to secondaries.
+    """
+
+    def __init__(self, collection, read_collection=None):
+        self.collection = collection
+        self.read_collection = read_collection or collection
+
+    def apply(self, deltas):
+        """Apply a Counter of tag -> change in card count"""
+        deltas = {tag: delta for tag, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        self.collection.bulk_write(
+            [
+                UpdateOne({"_id": tag}, {"$inc": {"count": delta}}, upsert=True)
+                for tag, delta in deltas.items()
+            ],
+            ordered=False,
+        )
+        if any(delta < 0 for delta in deltas.values()):
+            self.collection.delete_many({"count": {"$lte": 0}})
+
+    def record_added(self, cards):
+        self.apply(_count_tags(cards))
+
+    def record_removed(self, cards):
+        deltas = Counter()
+        deltas.subtract(_count_tags(cards))
+        self.apply(deltas)
+
+    def record_changes(self, changes):
+        """Apply the net tag deltas of many (old tags, new tags) pairs at once"""
+        deltas = Counter()
+        for old_tags, new_tags in changes:
+            old_tags, new_tags = set(old_tags or []), set(new_tags or [])
+            deltas.update(new_tags - old_tags)
+            deltas.subtract(old_tags - new_tags)
+        self.apply(deltas)
+
+    def counts(self):
+        """All tags with their card counts, sorted alphabetically"""
+        return [
+            {"tag": doc["_id"], "count": doc["count"]}
+            for doc in self.read_collection.find().sort("_id", 1)
+        ]
+
+    @staticmethod
+    def _aggregate_pipeline():
+        return [
+            # Count each card once per tag even if a tag was stored twice
+            {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        ]
+
+    def rebuild(self, cards_collection):
+        """Recompute every count from the cards collection, replacing the stored ones"""
+        pipeline = self._aggregate_pipeline() + [{"$out": self.collection.name}]
+        list(cards_collection.aggregate(pipeline))
+        return self.collection.count_documents({})
+
+    def check(self, cards_collection):
+        """Compare stored counts with a fresh aggregation and report any drift"""
+        expected = {
+            doc["_id"]: doc["count"]
+            for doc in cards_collection.aggregate(self._aggregate_pipeline())
+        }
+        stored = {doc["_id"]: doc["count"] for doc in self.collection.find()}
+        return drift_report(expected, stored)
+
+
+def drift_report(expected, stored):
+    """Differences between freshly counted and stored tag -> count mappings"""
+    mismatched = {
+        tag: {"stored": stored.get(tag, 0), "expected": count}
+        for tag, count in expected.items()
+        if stored.get(tag, 0) != count
+    }
+    unexpected = {tag: count for tag, count in stored.items() if tag not in expected}
+    return {
+        "consistent": not mismatched and not unexpected,
+        "tag_count": len(expected),
+        "mismatched": mismatched,
+        "unexpected": unexpected,
+    }
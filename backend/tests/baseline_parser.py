@@ -0,0 +1,180 @@
+"""
+Frozen copy of parse_bulk_cards as it was before the compiled parser
+(card_parser.py) replaced it. Tests compare the current parsers against it;
+do not change it.
+"""
+
+
+def parse_bulk_cards(text):
+    """Parse bulk card text and extract Romanian:English pairs"""
+    cards = []
+    lines = text.strip().split("\n")
+
+    def is_separating_comma(romanian_text):
+        """
+        Determine if commas in the Romanian text are separating different words/phrases
+        or are part of the actual phrase (like in sentences or greetings).
+
+        Separating commas typically appear in vocabulary lists like:
+        - "doamnă, doamne: madam / lady"
+        - "domn, domni: sir / mister"
+
+        Non-separating commas appear in phrases/sentences like:
+        - "Bună dimineața, doamnă!: Good morning, madam!"
+        - "Bine, mulțumesc: Fine, thank you"
+        """
+        # If the text contains sentence punctuation (! ? .), treat commas as part of the phrase
+        if any(punct in romanian_text for punct in ["!", "?", "."]):
+            return False
+
+        # If the text has multiple words AND common greeting/phrase patterns, likely a sentence
+        words = romanian_text.strip().split()
+        if len(words) > 2:  # More than 2 words usually indicates a phrase/sentence
+            return False
+
+        # Check for common Romanian greeting/phrase patterns that shouldn't be split
+        phrase_patterns = [
+            "bună dimineața",
+            "bună ziua",
+            "bună seara",
+            "la revedere",
+            "ce mai",
+            "și eu",
+            "bine ați",
+            "mulțumesc",
+            "și tu",
+            "bună,",  # Greetings with names
+            "salut,",  # Greetings with names
+        ]
+
+        text_lower = romanian_text.lower()
+        for pattern in phrase_patterns:
+            if pattern in text_lower:
+                return False
+
+        # If we have exactly 2 words separated by comma, likely vocabulary variants
+        comma_parts = [part.strip() for part in romanian_text.split(",")]
+        if len(comma_parts) == 2:
+            # Check if second part starts with capital letter (likely a name)
+            if comma_parts[1] and comma_parts[1][0].isupper():
+                return False  # Likely "Greeting, Name" format
+
+            # Both parts should be relatively short (single words or short phrases)
+            # and both should be lowercase words (not names)
+            if all(len(part.split()) <= 2 for part in comma_parts):
+                # Additional check: if either part contains multiple words, less likely to be vocabulary variants
+                if any(len(part.split()) > 1 for part in comma_parts):
+                    return False
+                return True
+
+        # For lists of 3+ comma-separated items that are all short, likely vocabulary
+        if len(comma_parts) >= 3:
+            if all(len(part.split()) == 1 for part in comma_parts):  # All single words
+                return True
+
+        # Default: treat commas as part of phrase
+        return False
+
+    for line in lines:
+        line = line.strip()
+
+        # Skip empty lines
+        if not line:
+            continue
+
+        # Skip section headers (lines that don't contain ':' or are in parentheses)
+        if ":" not in line:
+            continue
+
+        # Skip lines that are just section titles (contain parentheses but no colon before them)
+        if "(" in line and ")" in line and line.find(":") == -1:
+            continue
+
+        # Split on the first colon
+        parts = line.split(":", 1)
+        if len(parts) != 2:
+            continue
+
+        romanian = parts[0].strip()
+        english = parts[1].strip()
+
+        # Skip if either part is empty
+        if not romanian or not english:
+            continue
+
+        # Store original for potential restoration
+        original_romanian = romanian
+        original_english = english
+
+        # Remove any trailing punctuation that might interfere with parsing
+        romanian = romanian.rstrip("!?.")
+        english = english.rstrip("!?.")
+
+        # Skip very short entries (likely parsing errors)
+        if len(romanian) < 2 or len(english) < 2:
+            continue
+
+        # Extract tags from English text if present (format: "text [tag1, tag2]")
+        tags = []
+        if "[" in english and "]" in english:
+            # Extract tags from square brackets
+            tag_start = english.rfind("[")
+            tag_end = english.rfind("]")
+            if tag_start < tag_end:
+                tag_text = english[tag_start + 1 : tag_end]
+                tags = [
+                    tag.strip().lower() for tag in tag_text.split(",") if tag.strip()
+                ]
+                # Remove tags from English text
+                english = english[:tag_start].strip()
+                original_english = english
+
+        # Handle slashes as alternative forms (takes priority over comma handling)
+        if "/" in romanian:
+            # Create card for the full form (original with punctuation restored)
+            cards.append(
+                {
+                    "romanian": original_romanian,
+                    "english": original_english,
+                    "tags": tags,
+                }
+            )
+
+            # Create individual cards for each alternative form
+            alternatives = [alt.strip() for alt in original_romanian.split("/")]
+            for alt in alternatives:
+                alt = alt.strip()
+                if alt and len(alt) >= 2:  # Skip empty or very short alternatives
+                    cards.append(
+                        {"romanian": alt, "english": original_english, "tags": tags}
+                    )
+        # Check if Romanian side has comma-separated vocabulary items vs phrases with commas
+        elif "," in romanian and is_separating_comma(romanian):
+            # Create card for the full form (original with punctuation restored)
+            cards.append(
+                {
+                    "romanian": original_romanian,
+                    "english": original_english,
+                    "tags": tags,
+                }
+            )
+
+            # Create individual cards for each vocabulary word/phrase
+            romanian_words = [word.strip() for word in romanian.split(",")]
+            for word in romanian_words:
+                word = word.strip()
+                if word and len(word) >= 2:  # Skip empty or very short words
+                    cards.append(
+                        {"romanian": word, "english": original_english, "tags": tags}
+                    )
+        else:
+            # Single phrase/sentence or phrase with non-separating commas - keep as one card
+            cards.append(
+                {
+                    "romanian": original_romanian,
+                    "english": original_english,
+                    "tags": tags,
+                }
+            )
+
+    return cards
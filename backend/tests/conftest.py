@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The backend is a flat set of modules run from this directory (see run_app.py)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ENGINES = ["sqlite", "mongo"]
+
+
+@pytest.fixture(params=ENGINES)
+def repository(request, tmp_path, monkeypatch):
+    """An empty, prepared card repository for each storage engine"""
+    if request.param == "sqlite":
+        from sqlite_repository import SQLiteCardRepository
+
+        repository = SQLiteCardRepository(str(tmp_path / "cards.db"))
+    else:
+        # The MongoDB engine runs against an in-memory mongomock server
+        mongomock = pytest.importorskip("mongomock")
+        import database
+        from mongo_repository import MongoCardRepository
+
+        monkeypatch.setattr(database, "MongoClient", mongomock.MongoClient)
+        repository = MongoCardRepository(database.Database("mongodb://test", "cards"))
+    repository.prepare()
+    yield repository
+    repository.close()
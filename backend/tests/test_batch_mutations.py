@@ -0,0 +1,48 @@
+"""Batch writes planned from a read only apply to cards unchanged since that read"""
+
+from batch_mutations import plan_update
+from repository import CardFilter
+
+
+def add(repository, english, romanian, tags):
+    return repository.insert({"english": english, "romanian": romanian, "tags": tags})
+
+
+def test_update_skips_cards_changed_since_the_read(repository):
+    cards = [
+        add(repository, "apples", "mere", ["fruit"]),
+        add(repository, "pears", "pere", ["fruit"]),
+        add(repository, "plums", "prune", ["fruit"]),
+    ]
+    deleted, edited, untouched = cards
+    repository.delete(deleted["_id"])
+    repository.update(edited["_id"], {"tags": ["fruit", "autumn"]})
+
+    changes = [(card, plan_update(card, "add_tags", ["extra"])) for card in cards]
+    applied = repository.update_many(changes)
+
+    assert [previous["_id"] for previous, _ in applied] == [untouched["_id"]]
+    assert applied[0][1]["tags"] == ["fruit", "extra"]
+    assert repository.find(CardFilter(ids=[edited["_id"]]))[0]["tags"] == ["fruit", "autumn"]
+    assert repository.check_tag_counts()["consistent"]
+    assert {row["tag"]: row["count"] for row in repository.tag_counts()} == {
+        "autumn": 1,
+        "extra": 1,
+        "fruit": 2,
+    }
+
+
+def test_delete_returns_only_the_cards_it_removed(repository):
+    cards = [
+        add(repository, "apples", "mere", ["fruit"]),
+        add(repository, "pears", "pere", ["fruit"]),
+    ]
+    repository.delete(cards[0]["_id"])
+
+    deleted = repository.delete_many(cards)
+
+    assert [card["_id"] for card in deleted] == [cards[1]["_id"]]
+    assert repository.count(None, "exact") == 0
+    assert repository.tag_counts() == []
+    assert repository.check_tag_counts()["consistent"]
+
@@ -0,0 +1,88 @@
+"""The compiled and process-pool parsers must match the original parser exactly"""
+
+import io
+import random
+
+import pytest
+
+import card_parser
+from card_parser import iter_bulk_cards, iter_stream_lines, parse_bulk_cards
+from baseline_parser import parse_bulk_cards as baseline_parse_bulk_cards
+
+SAMPLE = """
+Saluturi (Greetings)
+# comments and headers have no colon and are skipped
+Bună dimineața, doamnă!: Good morning, madam! [greetings, Polite]
+Bine, mulțumesc: Fine, thank you
+doamnă, doamne: madam / lady [nouns]
+domn, domni: sir / mister
+unu, doi, trei: one, two, three [numbers]
+Ion, Maria: names
+casă/case: house/houses [nouns, home]
+a / b: too short alternatives
+x: y
+câine:   dog   [ animals ,  , Pets ]
+pisică: cat [broken
+mere: apples [a] extra]
+ora: 10:30 [time]
+: no romanian
+no english:
+   \t
+Ce mai faci?: How are you? [questions]
+salut, Andrei: hi, Andrei
+\r
+carte: book\r
+"""
+
+
+def test_sample_matches_baseline():
+    assert parse_bulk_cards(SAMPLE) == baseline_parse_bulk_cards(SAMPLE)
+
+
+@pytest.mark.parametrize("line", [line for line in SAMPLE.split("\n") if line.strip()])
+def test_each_line_matches_baseline(line):
+    assert parse_bulk_cards(line) == baseline_parse_bulk_cards(line)
+
+
+def test_random_lines_match_baseline():
+    rng = random.Random(4)
+    alphabet = ["a", "ă", "b", "ș", " ", ",", "/", ":", "!", "?", ".", "[", "]", "Z", "\t"]
+    lines = [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24)))
+        for _ in range(5000)
+    ]
+    text = "\n".join(lines)
+    assert parse_bulk_cards(text) == baseline_parse_bulk_cards(text)
+
+
+def test_streamed_upload_matches_baseline():
+    text = SAMPLE * 50
+    # A tiny block size splits lines and multi-byte characters across reads
+    lines = iter_stream_lines(io.BytesIO(text.encode("utf-8")), block_size=7)
+    assert list(iter_bulk_cards(lines)) == baseline_parse_bulk_cards(text)
+
+
+@pytest.fixture
+def parallel_workers(monkeypatch):
+    monkeypatch.setattr(card_parser, "PARSE_WORKERS", 3)
+    yield
+    card_parser.shutdown_pool()
+
+
+def test_parallel_matches_baseline_across_chunk_boundaries(parallel_workers):
+    # Blank lines, comments and multi-card lines land on the piece boundaries
+    text = "\n".join(SAMPLE.split("\n") * 40)
+    pieces = card_parser.split_on_line_boundaries(text, 12)
+    assert len(pieces) > 1
+    assert "\n".join(pieces) == text
+    assert card_parser.parse_bulk_cards_parallel(
+        text, min_lines=0
+    ) == baseline_parse_bulk_cards(text)
+    assert card_parser._pool is not None
+
+
+def test_parallel_small_input_stays_in_process(parallel_workers):
+    assert card_parser.parse_bulk_cards_parallel(SAMPLE) == baseline_parse_bulk_cards(
+        SAMPLE
+    )
+    assert card_parser._pool is None
@@ -0,0 +1,91 @@
+"""Batched review events are applied once, in time order, however often they are sent"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def make_card(repository):
+    return repository.insert({"english": "house", "romanian": "casă", "tags": []})
+
+
+def event(key, card, grade="good", minutes_ago=0):
+    reviewed_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    return {
+        "key": key,
+        "card_id": str(card["_id"]),
+        "grade": grade,
+        "reviewed_at": reviewed_at.isoformat(),
+    }
+
+
+def repetitions(repository, card):
+    due = repository.due(datetime.utcnow() + timedelta(days=365), [], 10)
+    return {str(c["_id"]): c["review"]["repetitions"] for c in due}[str(card["_id"])]
+
+
+def test_resent_batch_is_applied_once(repository):
+    card = make_card(repository)
+    batch = [event("a", card, minutes_ago=3), event("b", card, minutes_ago=2)]
+
+    first = repository.ingest_reviews(batch)
+    assert first == {"accepted": 2, "duplicates": 0, "rejected": [], "cards_updated": 1}
+    assert repetitions(repository, card) == 2
+
+    # The client didn't see the response and sends everything again, plus one more
+    second = repository.ingest_reviews(batch + [event("c", card, minutes_ago=1)])
+    assert second["accepted"] == 1
+    assert second["duplicates"] == 2
+    assert repetitions(repository, card) == 3
+
+
+def test_repeated_key_in_one_batch_is_a_duplicate(repository):
+    card = make_card(repository)
+    summary = repository.ingest_reviews([event("a", card), event("a", card)])
+    assert summary["accepted"] == 1
+    assert summary["duplicates"] == 1
+    assert repetitions(repository, card) == 1
+
+
+def test_invalid_events_are_rejected_by_index(repository):
+    card = make_card(repository)
+    summary = repository.ingest_reviews(
+        [event("ok", card), {"key": "bad", "card_id": "nope", "grade": "good"}]
+    )
+    assert summary["accepted"] == 1
+    assert [item["index"] for item in summary["rejected"]] == [1]
+
+
+def test_events_older_than_the_last_review_are_only_logged(repository):
+    card = make_card(repository)
+    repository.ingest_reviews([event("new", card, minutes_ago=1)])
+
+    # Delivered late: the card was already reviewed after it
+    late = repository.ingest_reviews([event("old", card, grade="again", minutes_ago=5)])
+    assert late["accepted"] == 1
+    assert late["cards_updated"] == 0
+    assert repetitions(repository, card) == 1
+
+
+def test_failed_batch_keeps_the_claims_that_landed(repository, monkeypatch):
+    if repository.engine != "mongo":
+        pytest.skip("SQLite applies a batch in one transaction")
+    cards = [make_card(repository), make_card(repository)]
+    batch = [event("a", cards[0]), event("b", cards[1])]
+
+    # The bulk write fails after updating only the first card
+    bulk_write = repository.cards.bulk_write
+
+    def partial_bulk_write(requests, **kwargs):
+        bulk_write(requests[:1], **kwargs)
+        raise ConnectionError("connection lost")
+
+    monkeypatch.setattr(repository.cards, "bulk_write", partial_bulk_write)
+    with pytest.raises(ConnectionError):
+        repository.ingest_reviews(batch)
+    monkeypatch.undo()
+
+    resent = repository.ingest_reviews(batch)
+    assert resent["accepted"] == 1
+    assert resent["duplicates"] == 1
+    assert [repetitions(repository, card) for card in cards] == [1, 1]
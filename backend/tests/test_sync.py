@@ -0,0 +1,71 @@
+"""Delta sync tokens: every change after a token is returned exactly as it stands"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from sync import InvalidSyncToken, decode_token, encode_token
+
+
+def add(repository, english, romanian):
+    return repository.insert({"english": english, "romanian": romanian, "tags": []})
+
+
+def collect(repository, token, limit):
+    """Follow next_token until has_more is false; returns (upserted, deleted, token)"""
+    upserted, deleted = {}, set()
+    while True:
+        changes = repository.changes(token, limit)
+        assert not changes["reset"]
+        for card in changes["upserted"]:
+            upserted[str(card["_id"])] = card
+        deleted.update(changes["deleted"])
+        token = changes["next_token"]
+        if not changes["has_more"]:
+            return upserted, deleted, token
+
+
+def test_token_round_trip():
+    moment = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    position = (moment, None)
+    assert decode_token(encode_token(position, position)) == (position, position)
+
+
+def test_invalid_token_is_rejected(repository):
+    with pytest.raises(InvalidSyncToken):
+        repository.changes("not a token", 10)
+
+
+def test_changes_after_token(repository):
+    edited = add(repository, "cat", "pisică")
+    removed = add(repository, "house", "casă")
+    token = repository.start_token()
+
+    added = add(repository, "apple", "măr")
+    repository.update(edited["_id"], {"english": "kitten"})
+    repository.delete(removed["_id"])
+
+    upserted, deleted, _ = collect(repository, token, 1000)
+    assert str(added["_id"]) in upserted
+    assert upserted[str(edited["_id"])]["english"] == "kitten"
+    assert str(removed["_id"]) not in upserted
+    assert deleted == {str(removed["_id"])}
+
+
+def test_small_pages_return_every_change(repository):
+    token = repository.start_token()
+    cards = [add(repository, f"word {i}", f"cuvânt {i}") for i in range(7)]
+    repository.delete(cards[0]["_id"])
+    repository.delete(cards[1]["_id"])
+
+    upserted, deleted, _ = collect(repository, token, 2)
+    assert set(upserted) == {str(card["_id"]) for card in cards[2:]}
+    assert deleted == {str(cards[0]["_id"]), str(cards[1]["_id"])}
+
+
+def test_token_beyond_retention_resets(repository):
+    old = (datetime.utcnow() - timedelta(days=365), None)
+    changes = repository.changes(encode_token(old, old), 10)
+    assert changes["reset"] is True
+    assert changes["upserted"] == [] and changes["deleted"] == []
+    assert not repository.changes(changes["next_token"], 10)["reset"]
@@ -0,0 +1,20 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+import logging
+
+from app import app, prepare_database
+
+logger = logging.getLogger("flashcards.wsgi")
+
+# Runs once in the gunicorn master when the app is preloaded; workers build
+# their own in-memory search index after forking
+try:
+    prepare_database(build_index=False)
+except Exception as e:
+    logger.warning("Could not prepare database: %s", e)
+
+application = app
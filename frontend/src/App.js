@@ -498,8 +498,13 @@ function App() {
   const initializeShuffledDeck = () => {
     if (cards.length === 0) return;
     
-    // Shuffle all cards
-    const shuffled = [...cards].sort(() => Math.random() - 0.5);
+    // Fisher–Yates shuffle: every ordering is equally likely, unlike sorting
+    // with a random comparator
+    const shuffled = [...cards];
+    for (let i = shuffled.length - 1; i > 0; i--) {
+      const j = Math.floor(Math.random() * (i + 1));
+      [shuffled[i], shuffled[j]] = [shuffled[j], shuffled[i]];
+    }
     setRemainingCards(shuffled);
     setCompletedCards([]);
     setDeckProgress(0);
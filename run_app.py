@@ -119,6 +119,13 @@ def check_mongodb():
         return False
 
 
+def storage_engine():
+    """Which storage engine the backend uses: STORAGE_ENGINE, "mongo" by default"""
+    env_vars = load_env_vars()
+    engine = os.environ.get("STORAGE_ENGINE") or env_vars.get("STORAGE_ENGINE", "mongo")
+    return engine.lower()
+
+
 def install_backend_deps():
     """Install Python dependencies"""
     print("\n📦 Installing Python dependencies...")
@@ -162,21 +169,66 @@ def install_frontend_deps():
         return True
 
 
-def run_backend():
-    """Start the Flask backend"""
+def backend_server():
+    """
+    Which server runs the backend: "gunicorn" with --production or
+    APP_ENV=production, "asgi" (uvicorn) with --asgi or APP_SERVER=asgi,
+    otherwise the Flask development server ("dev").
+    """
+    env_vars = load_env_vars()
+    app_env = os.environ.get("APP_ENV") or env_vars.get("APP_ENV", "")
+    app_server = os.environ.get("APP_SERVER") or env_vars.get("APP_SERVER", "")
+    if "--asgi" in sys.argv[1:] or app_server.lower() == "asgi":
+        return "asgi"
+    if "--production" in sys.argv[1:] or app_env.lower() == "production":
+        return "gunicorn"
+    return "dev"
+
+
+def run_backend(server="dev"):
+    """Start the backend with gunicorn, uvicorn (ASGI) or the Flask dev server"""
     backend_path = Path(__file__).parent / "backend"
     env = os.environ.copy()
 
+    if server == "gunicorn" and platform.system() == "Windows":
+        print("⚠️  gunicorn does not run on Windows; using the development server")
+        server = "dev"
+
+    if server == "gunicorn":
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "wsgi:application",
+        ]
+    elif server == "asgi":
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "asgi_app:app",
+            "--host",
+            "0.0.0.0",
+            "--port",
+            env.get("PORT", "5000"),
+        ]
+    else:
+        command = [sys.executable, "app.py"]
+        # Keep the debugger and reloader for local development
+        env.setdefault("FLASK_DEBUG", "true")
+
     if platform.system() == "Windows":
         return subprocess.Popen(
-            [sys.executable, "app.py"],
+            command,
             cwd=backend_path,
             env=env,
             creationflags=subprocess.CREATE_NEW_PROCESS_GROUP,
         )
     else:
         return subprocess.Popen(
-            [sys.executable, "app.py"], cwd=backend_path, env=env, preexec_fn=os.setsid
+            command, cwd=backend_path, env=env, preexec_fn=os.setsid
         )
 
 
@@ -265,8 +317,8 @@ def main():
     if not install_frontend_deps():
         return 1
 
-    # Check MongoDB connection
-    if not check_mongodb():
+    # Check MongoDB connection (the SQLite engine needs no database server)
+    if storage_engine() == "mongo" and not check_mongodb():
         return 1
 
     print("\n🚀 Starting services...")
@@ -275,8 +327,14 @@ def main():
 
     try:
         # Start backend
-        print("Starting Flask backend...")
-        backend_process = run_backend()
+        server = backend_server()
+        if server == "gunicorn":
+            print("Starting backend with gunicorn (production mode)...")
+        elif server == "asgi":
+            print("Starting async (ASGI) backend with uvicorn...")
+        else:
+            print("Starting Flask backend...")
+        backend_process = run_backend(server)
         processes["Backend"] = backend_process
 
         # Wait a bit for backend to start